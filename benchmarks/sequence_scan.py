@@ -0,0 +1,60 @@
+# coding=utf-8
+"""Compares sequence scanning with and without os.scandir() on a synthetic
+directory. Usage:
+
+    python benchmarks/sequence_scan.py [number of files]
+"""
+from __future__ import absolute_import, print_function
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+from synchronizer import utils
+
+
+def build_directory(files_number):
+    """Creates a temporary directory with files_number empty frames spread
+    over ten sequences, plus a few files that aren't part of any sequence.
+    """
+    dir_path = tempfile.mkdtemp(prefix="synchronizer_bench_")
+    frames_per_sequence = files_number // 10
+    for sequence in range(10):
+        for frame in range(frames_per_sequence):
+            file_name = "C_shot_{:02d}__beauty.{:06d}.exr".format(
+                sequence, frame + 1001
+            )
+            open(os.path.join(dir_path, file_name), "w").close()
+    for each in range(10):
+        open(os.path.join(dir_path, "notes_{}.txt".format(chr(97 + each))), "w").close()
+    return dir_path
+
+
+def time_scan(dir_path, repeat=3):
+    """Returns the best time of a few scan_sequences() runs."""
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        utils.scan_sequences(dir_path)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    files_number = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    dir_path = build_directory(files_number)
+    try:
+        scandir = utils.scandir
+        utils.scandir = None
+        listdir_time = time_scan(dir_path)
+        utils.scandir = scandir
+        scandir_time = time_scan(dir_path)
+        print("Files: {}".format(files_number))
+        print("os.listdir + realpath + isfile: {:.3f}s".format(listdir_time))
+        print("os.scandir + DirEntry:          {:.3f}s".format(scandir_time))
+        print("Speedup: {:.1f}x".format(listdir_time / scandir_time))
+    finally:
+        shutil.rmtree(dir_path)
@@ -1,8 +1,9 @@
 from __future__ import absolute_import, print_function
 
+import json
 import argparse
 
-from synchronizer import copier, logger
+from synchronizer import copier, copyplan, bisync, logger
 
 
 def build_parser():
@@ -63,6 +64,88 @@ def build_parser():
         help="If set to False, it'll skip trying to find sequence files for "
         "given src_path. default: True"
     )
+    parser.add_argument(
+        "--incremental",
+        action='store_true',
+        help="If src_path is a directory and trg_path exists, only copies files "
+        "whose size or last modification differ instead of emptying trg_path."
+    )
+    parser.add_argument(
+        "--delete_orphans",
+        action='store_true',
+        help="When syncing incrementally, removes trg_path files and directories "
+        "that don't exist in src_path."
+    )
+    parser.add_argument(
+        "--overwrite",
+        choices=["if_changed"],
+        default=None,
+        help="if_changed: existing target files are only overwritten if their "
+        "size or last modification differ from the source, whatever "
+        "force_overwrite is."
+    )
+    parser.add_argument(
+        "--compare_content",
+        choices=["full", "quick"],
+        default=None,
+        help="With --overwrite if_changed, compares size and content hash "
+        "instead of size and last modification."
+    )
+    parser.add_argument(
+        "--verify",
+        choices=["stream", "readback"],
+        default=None,
+        help="Hashes files while they're copied. stream trusts that hash, "
+        "readback also reads targets back to check them."
+    )
+    parser.add_argument(
+        "--checksums_path",
+        default=None,
+        help="With --verify, writes the digests of copied files to this "
+        "checksum file, in b2sum format."
+    )
+    parser.add_argument(
+        "--write_manifest",
+        action='store_true',
+        help="Writes a manifest of every file written at trg_path, so "
+        "syncstatus --use_manifest can check it later without comparing "
+        "both sides."
+    )
+    parser.add_argument(
+        "--resumable",
+        action='store_true',
+        help="Copies big files in chunks that can be resumed if the copy is "
+        "interrupted, instead of starting over."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of threads used to copy sequence files concurrently. "
+        "Default: files are copied one after another."
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="Number of processes used to copy directories when trg_path is "
+        "emptied. Useful for trees of many small files. "
+        "Default: a single process."
+    )
+    parser.add_argument(
+        "--dry_run",
+        action='store_true',
+        help="Prints the copy plan as JSON instead of copying: every delete, "
+        "mkdir, copy, overwrite and skip operation with its size, and totals. "
+        "Targets are compared the same way a real run does."
+    )
+    parser.add_argument(
+        "--two_way",
+        action='store_true',
+        help="Syncs both directories both ways instead: newer files win and "
+        "deletions since the last two-way sync are propagated. Conflicts are "
+        "left untouched and listed."
+    )
     parser.add_argument(
         "--log",
         action='store_true',
@@ -96,6 +179,36 @@ def str_to_bool(value):
         raise argparse.ArgumentTypeError('Boolean value expected.')
 
 
+def two_way_sync(src_path, trg_path, workers, log_bool):
+    """Runs a two-way sync between src_path and trg_path and prints
+    conflicts and failed paths.
+
+    Arguments:
+        ``src_path`` {str} -- Path to a directory
+        ``trg_path`` {str} -- Path to a directory
+        ``workers`` {int} -- Number of threads copying files
+        ``log_bool`` {bool} -- Whether logging was enabled
+    """
+    state = bisync.SyncState()
+    results = dict()
+    try:
+        plan, result = bisync.sync(
+            src_path, trg_path, state, workers=workers, results=results
+        )
+    finally:
+        state.close()
+    for item in plan:
+        if item.action == bisync.CONFLICT:
+            print("Conflict: {}".format(item.rel_path))
+    for rel_path in sorted(results):
+        if not results[rel_path]["success"]:
+            print("Failed: {}".format(rel_path))
+    if not result:
+        print("There was a problem processing your request.")
+        if not log_bool:
+            print("Try again with --log option to debug.")
+
+
 if __name__ == "__main__":
     parser = build_parser()
     args = parser.parse_args()
@@ -107,24 +220,61 @@ if __name__ == "__main__":
         include_tx = args.include_tx
         only_tx = args.only_tx
         find_sequence = args.find_sequence
+        workers = args.workers
+        processes = args.processes
+        incremental = args.incremental
+        delete_orphans = args.delete_orphans
+        resumable = args.resumable
+        verify = args.verify
+        checksums_path = args.checksums_path
+        write_manifest = args.write_manifest
+        overwrite = args.overwrite
+        compare_content = args.compare_content
+        two_way = args.two_way
+        dry_run = args.dry_run
         log_bool = args.log
 
         if log_bool:
             logger.init_logger()
 
-        result = copier.process_paths(
-            src_path, trg_path, force_overwrite,
-            include_tx=include_tx,
-            only_tx=only_tx,
-            find_sequence=find_sequence
-        )
-        if result and force_overwrite:
-            print("Copied {} to {}".format(src_path, trg_path))
-        elif result and not force_overwrite:
-            print("force_overwrite was set to False. Nothing was copied.")
-            if not log_bool:
-                print("Try again with --log option to debug.")
+        if dry_run:
+            plan = copyplan.plan_copy(
+                src_path, trg_path, force_overwrite,
+                include_tx=include_tx,
+                only_tx=only_tx,
+                find_sequence=find_sequence,
+                incremental=incremental,
+                delete_orphans=delete_orphans,
+                overwrite=overwrite,
+                compare_content=compare_content
+            )
+            print(json.dumps(plan.to_dict(), indent=4))
+        elif two_way:
+            two_way_sync(src_path, trg_path, workers, log_bool)
         else:
-            print("There was a problem processing your request.")
-            if not log_bool:
-                print("Try again with --log option to debug.")
+            result = copier.process_paths(
+                src_path, trg_path, force_overwrite,
+                include_tx=include_tx,
+                only_tx=only_tx,
+                find_sequence=find_sequence,
+                workers=workers,
+                processes=processes,
+                incremental=incremental,
+                delete_orphans=delete_orphans,
+                resumable=resumable,
+                verify=verify,
+                checksums_path=checksums_path,
+                write_manifest=write_manifest,
+                overwrite=overwrite,
+                compare_content=compare_content
+            )
+            if result and (force_overwrite or overwrite):
+                print("Copied {} to {}".format(src_path, trg_path))
+            elif result and not force_overwrite:
+                print("force_overwrite was set to False. Nothing was copied.")
+                if not log_bool:
+                    print("Try again with --log option to debug.")
+            else:
+                print("There was a problem processing your request.")
+                if not log_bool:
+                    print("Try again with --log option to debug.")
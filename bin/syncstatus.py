@@ -1,8 +1,10 @@
 from __future__ import absolute_import, print_function
 
+import sys
+import json
 import argparse
 
-from synchronizer import syncstatus, logger
+from synchronizer import syncstatus, snapshot, hashing, logger
 
 
 def build_parser():
@@ -49,6 +51,61 @@ def build_parser():
         "Default stat used for comparison is st_mtime which is: Time of most recent "
         "content modification."
     )
+    parser.add_argument(
+        "--recursive",
+        action="store_true",
+        help="Used with --get_most_recent, directories are compared by the most "
+        "recent stat time of anything inside them."
+    )
+    parser.add_argument(
+        "--diff_trees",
+        action="store_true",
+        help="Walks two directories and prints the status of every file found "
+        "in either of them as a JSON line, as soon as it's known: "
+        "{\"path\": relative path, \"status\": added, removed, changed or same}"
+    )
+    parser.add_argument(
+        "--stop_at_first_difference",
+        action="store_true",
+        help="Used with --diff_trees, stops after the first file that's not the same."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Used with --diff_trees and --recursive, number of threads used "
+        "to stat files. "
+        "Default: 8"
+    )
+    parser.add_argument(
+        "--snapshot",
+        action="store_true",
+        help="Used with --get_sync_status and --diff_trees, keeps a snapshot of "
+        "stats in the user folder so next runs only stat files again in "
+        "directories that changed."
+    )
+    parser.add_argument(
+        "--compare_content",
+        choices=["full", "quick"],
+        default=None,
+        help="Used with --get_sync_status and --diff_trees, files with the same "
+        "content are in sync even if written at different times. Hashes are "
+        "cached in the user folder so unchanged files aren't read again. "
+        "'quick' only hashes the size and a few sampled blocks of every file."
+    )
+    parser.add_argument(
+        "--escalate_content",
+        action="store_true",
+        help="Used with --compare_content quick, files whose samples match "
+        "are confirmed with a full hash."
+    )
+    parser.add_argument(
+        "--use_manifest",
+        action="store_true",
+        help="Used with --get_sync_status, checks the source against the "
+        "manifest written at trg_path by synccopier --write_manifest instead "
+        "of comparing both sides."
+    )
     parser.add_argument(
         "--log",
         action="store_true",
@@ -68,18 +125,52 @@ if __name__ == "__main__":
         sync_stat = args.get_sync_status
         ignore_name = args.ignore_name
         get_most_recent = args.get_most_recent
+        recursive = args.recursive
+        diff_trees = args.diff_trees
+        stop_at_first_difference = args.stop_at_first_difference
+        workers = args.workers
+        use_snapshot = args.snapshot
+        compare_content = args.compare_content
+        escalate_content = args.escalate_content
+        use_manifest = args.use_manifest
         log_bool = args.log
 
         if log_bool:
             logger.init_logger()
 
+        stat_snapshot = None
+        if use_snapshot:
+            stat_snapshot = snapshot.StatSnapshot()
+
+        hash_cache = None
+        if compare_content:
+            hash_cache = hashing.HashCache()
+
         if sync_stat:
             print(syncstatus.get_sync_status(
-                src_path, trg_path, ignore_name)[1]
+                src_path, trg_path, ignore_name, snapshot=stat_snapshot,
+                compare_content=compare_content, hash_cache=hash_cache,
+                escalate_content=escalate_content,
+                use_manifest=use_manifest)[1]
             )
 
         if get_most_recent is not None:
-            print("Most recent by {}: {}".format(
-                get_most_recent,
-                syncstatus.get_most_recent(src_path, trg_path, get_most_recent))
+            most_recent = syncstatus.get_most_recent(
+                src_path, trg_path, get_most_recent,
+                recursive=recursive, workers=workers
             )
+            print("Most recent by {}: {}".format(get_most_recent, most_recent))
+
+        if diff_trees:
+            for rel_path, status in syncstatus.diff_trees(
+                    src_path, trg_path, workers=workers,
+                    stop_at_first_difference=stop_at_first_difference,
+                    snapshot=stat_snapshot, compare_content=compare_content,
+                    hash_cache=hash_cache, escalate_content=escalate_content):
+                print(json.dumps({"path": rel_path, "status": status}))
+                sys.stdout.flush()
+
+        if stat_snapshot is not None:
+            stat_snapshot.close()
+        if hash_cache is not None:
+            hash_cache.close()
@@ -34,7 +34,8 @@ setup(
     install_requires=['six'],
     extras_require={
         'dev': ['pytest', 'pytest-cov', 'pytest-datafiles', 'python-coveralls', 'flake8'],
-        'docs': ['sphinx', 'sphinx-rtd-theme']
+        'docs': ['sphinx', 'sphinx-rtd-theme'],
+        'batch': ['numpy']
     },
     package_data={'': ['cfg/config.json']}
 )
@@ -10,6 +10,12 @@
 # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 # GNU General Public License for more details.
 
+from synchronizer.bisync import SyncState, plan_sync, execute_plan
 from synchronizer.copier import process_paths
-from synchronizer.syncstatus import get_sync_status, get_dir_size, get_most_recent, compare_stats
-from synchronizer.utils import get_sequence_files, is_sequence, is_sequence_complete, get_sequence_files, get_sequence_name_pattern, create_dir
+from synchronizer.copyplan import CopyPlan, plan_copy
+from synchronizer.engine import copy_file
+from synchronizer.hashing import HashCache, get_file_hash, get_sample_hash, hash_files
+from synchronizer.merkle import get_tree_digests
+from synchronizer.snapshot import StatSnapshot
+from synchronizer.syncstatus import get_sync_status, get_dir_size, get_most_recent, compare_stats, compare_stats_batch, diff_trees, get_sequence_sync_status
+from synchronizer.utils import get_sequence_files, is_sequence, is_sequence_complete, get_sequence_files, get_sequence_name_pattern, create_dir, scan_sequences, get_missing_frames, get_frame_set, FrameSet, get_tx_path, get_tx_files
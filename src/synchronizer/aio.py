@@ -0,0 +1,164 @@
+# coding=utf-8
+
+# Copyright (C) 2019 - Chris Granados
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License, or any
+# later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# asyncio API. Python 3.7+ only, so it's not imported by the package
+# __init__ and must be imported explicitly: from synchronizer import aio
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from synchronizer import copier, syncstatus
+
+
+# Max number of threads of the default executor, shared by all async calls
+DEFAULT_MAX_WORKERS = 32
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Returns the executor async calls use when none is given. It's created
+    on first use with DEFAULT_MAX_WORKERS threads, so any number of
+    concurrent jobs share the same bounded set of threads.
+
+    Returns:
+        [concurrent.futures.Executor] -- Default executor
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=DEFAULT_MAX_WORKERS,
+                thread_name_prefix="synchronizer"
+            )
+        return _executor
+
+
+def set_executor(executor):
+    """Replaces the default executor, e.g. with one sized for the host. The
+    previous one is not shut down.
+
+    Arguments:
+        ``executor`` {concurrent.futures.Executor} -- New default executor,
+        or None to create a new one on next use
+    """
+    global _executor
+    with _executor_lock:
+        _executor = executor
+
+
+def shutdown_executor(wait=True):
+    """Shuts the default executor down. A new one is created on next use.
+
+    Keyword Arguments:
+        ``wait`` {bool} -- Waits for running jobs to finish (default: {True})
+    """
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+async def run_blocking(func, *args, executor=None, limiter=None, **kwargs):
+    """Runs a blocking function in an executor without blocking the event
+    loop. Cancelling the awaiting task drops the call if it didn't start yet,
+    a call already running keeps going in its thread until it returns.
+
+    Arguments:
+        ``func`` {callable} -- Blocking function
+
+        Any other argument is passed to func.
+
+    Keyword Arguments:
+        ``executor`` {concurrent.futures.Executor} -- Executor to run func in
+        (default: {get_executor()})
+
+        ``limiter`` {asyncio.Semaphore} -- If given, func waits for it before
+        being scheduled. Share one between calls to cap how many of them run
+        at once (default: {None})
+
+    Returns:
+        [object] -- What func returns
+    """
+    if limiter is None:
+        return await _run_in_executor(func, args, kwargs, executor)
+    async with limiter:
+        return await _run_in_executor(func, args, kwargs, executor)
+
+
+async def aprocess_paths(
+        src_path, trg_path, force_overwrite=True,
+        executor=None, limiter=None, **kwargs):
+    """Async copier.process_paths(). Takes the same arguments, plus executor
+    and limiter, see run_blocking().
+
+    If the awaiting task is cancelled, files not started yet are skipped
+    through process_paths() cancel_event and CancelledError is raised right
+    away. Files being copied finish in the background.
+
+    Arguments:
+        ``src_path`` {str} -- Path to a file or directory
+
+        ``trg_path`` {str} -- Path to a directory
+
+    Keyword Arguments:
+        ``force_overwrite`` {bool} -- See copier.process_paths()
+        (default: {True})
+
+    Returns:
+        [bool] -- If files were processed correctly, True is returned.
+        False otherwise.
+    """
+    cancel_event = threading.Event()
+    kwargs["cancel_event"] = cancel_event
+    try:
+        return await run_blocking(
+            copier.process_paths, src_path, trg_path, force_overwrite,
+            executor=executor, limiter=limiter, **kwargs
+        )
+    except asyncio.CancelledError:
+        cancel_event.set()
+        raise
+
+
+async def aget_sync_status(
+        src_path, trg_path, executor=None, limiter=None, **kwargs):
+    """Async syncstatus.get_sync_status(). Takes the same arguments, plus
+    executor and limiter, see run_blocking().
+
+    Arguments:
+        ``src_path`` {str} -- Source path, file or directory
+
+        ``trg_path`` {str} -- Target path, file or directory
+
+    Returns:
+        [tuple] -- See syncstatus.get_sync_status()
+    """
+    return await run_blocking(
+        syncstatus.get_sync_status, src_path, trg_path,
+        executor=executor, limiter=limiter, **kwargs
+    )
+
+
+async def _run_in_executor(func, args, kwargs, executor):
+    """Schedules func on given executor or the default one.
+
+    Not meant to be used directly, use run_blocking() instead.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor or get_executor(), functools.partial(func, *args, **kwargs)
+    )
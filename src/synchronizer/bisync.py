@@ -0,0 +1,388 @@
+# coding=utf-8
+
+# Copyright (C) 2019 - Chris Granados
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License, or any
+# later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+from __future__ import absolute_import, print_function
+
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+
+from synchronizer.logger import logger, get_config_dir
+from synchronizer import engine, utils, manifest
+from synchronizer.snapshot import StatSnapshot
+
+
+# Default last-sync state database name, inside logger.get_config_dir()
+SYNC_STATE_DB_NAME = "synchronizer_bisync.db"
+
+# Actions in a two-way sync plan
+LEFT_TO_RIGHT = "left_to_right"
+RIGHT_TO_LEFT = "right_to_left"
+DELETE_LEFT = "delete_left"
+DELETE_RIGHT = "delete_right"
+CONFLICT = "conflict"
+SKIP = "skip"
+
+# One file of a two-way sync plan. left and right are (st_size, st_mtime)
+# as found while planning, None if the file doesn't exist on that side
+PlanItem = namedtuple('PlanItem', ('rel_path', 'action', 'left', 'right'))
+
+
+class SyncState(object):
+    """Persistent record of what every file looked like, on both sides, after
+    the last two-way sync of a pair of directories, backed by SQLite. It's
+    what tells a file deleted on one side apart from a file created on the
+    other one.
+
+    Keyword Arguments:
+        ``db_path`` {str} -- Path to the SQLite database, or ':memory:'. If
+        not given, it's stored in the same user folder log files use.
+        (default: {None})
+    """
+    def __init__(self, db_path=None):
+        if db_path is None:
+            db_path = os.path.join(get_config_dir(), SYNC_STATE_DB_NAME)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "pair TEXT, rel_path TEXT, size INTEGER, mtime REAL, "
+                "PRIMARY KEY (pair, rel_path))"
+            )
+            self._connection.commit()
+
+    def get(self, left_path, right_path):
+        """Reads the last sync state of a pair of directories.
+
+        Arguments:
+            ``left_path`` {str} -- Left directory
+
+            ``right_path`` {str} -- Right directory
+
+        Returns:
+            [dict] -- {relative file path: (st_size, st_mtime)}
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                "SELECT rel_path, size, mtime FROM files WHERE pair=?",
+                (_get_pair_key(left_path, right_path),)
+            )
+            return dict((row[0], (row[1], row[2])) for row in cursor)
+
+    def update(self, left_path, right_path, synced, removed):
+        """Records files in sync after a sync.
+
+        Arguments:
+            ``left_path`` {str} -- Left directory
+
+            ``right_path`` {str} -- Right directory
+
+            ``synced`` {dict} -- {relative file path: (st_size, st_mtime)}
+            of files now equal on both sides
+
+            ``removed`` {list} -- Relative paths of files now gone from
+            both sides
+        """
+        pair_key = _get_pair_key(left_path, right_path)
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                [(pair_key, rel_path, size, mtime)
+                 for rel_path, (size, mtime) in synced.items()]
+            )
+            self._connection.executemany(
+                "DELETE FROM files WHERE pair=? AND rel_path=?",
+                [(pair_key, rel_path) for rel_path in removed]
+            )
+            self._connection.commit()
+
+    def close(self):
+        """Closes the database connection."""
+        with self._lock:
+            self._connection.close()
+
+
+def plan_sync(left_path, right_path, state=None, snapshot=None, newest_wins=True):
+    """Plans a two-way sync between two directories. Each side is walked and
+    stat'ed once and every file gets one action:
+
+        -'left_to_right' / 'right_to_left': Copy the file over\n
+        -'delete_left' / 'delete_right': The file was deleted on the other
+        side since the last sync and is unchanged on this one\n
+        -'conflict': Both sides changed and it can't be decided, or one side
+        changed and the other one deleted it\n
+        -'skip': Size and mtime are the same on both sides
+
+    A file is changed if its size or mtime differ from the last sync state.
+    If it changed on one side only, that side wins. If it changed on both
+    sides, or there's no state yet, the most recent mtime wins, same as
+    syncstatus.get_most_recent() does.
+
+    Arguments:
+        ``left_path`` {str} -- Left directory
+
+        ``right_path`` {str} -- Right directory
+
+    Keyword Arguments:
+        ``state`` {SyncState} -- Last sync state. Without it, deletions can't
+        be detected and files only found on one side are copied to the other.
+        (default: {None})
+
+        ``snapshot`` {snapshot.StatSnapshot} -- Snapshot used to walk both
+        sides, so unchanged directories aren't stat'ed again. If not given,
+        an in-memory one is used (default: {None})
+
+        ``newest_wins`` {bool} -- Files changed on both sides since the last
+        sync are copied from the most recent one. If False, they're conflicts
+        (default: {True})
+
+    Returns:
+        [list] -- PlanItem for every file found on either side or in state,
+        sorted by relative path
+    """
+    store = snapshot if snapshot is not None else StatSnapshot(":memory:")
+    try:
+        left_files = _get_tree_state(store, left_path)
+        right_files = _get_tree_state(store, right_path)
+    finally:
+        if snapshot is None:
+            store.close()
+    last_sync = state.get(left_path, right_path) if state is not None else dict()
+
+    plan = list()
+    for rel_path in sorted(set(left_files) | set(right_files) | set(last_sync)):
+        left = left_files.get(rel_path)
+        right = right_files.get(rel_path)
+        action = _get_action(left, right, last_sync.get(rel_path), newest_wins)
+        plan.append(PlanItem(rel_path, action, left, right))
+    return plan
+
+
+def execute_plan(
+        left_path, right_path, plan, state=None, workers=None, results=None,
+        snapshot=None):
+    """Runs a plan made by plan_sync(). Files are copied with
+    engine.copy_file(), creating missing folders. Conflicts and skipped
+    files are left untouched.
+
+    Arguments:
+        ``left_path`` {str} -- Left directory
+
+        ``right_path`` {str} -- Right directory
+
+        ``plan`` {list} -- As returned by plan_sync()
+
+    Keyword Arguments:
+        ``state`` {SyncState} -- If given, it's updated with every file left
+        in sync, so the next plan can detect deletions (default: {None})
+
+        ``workers`` {int} -- Number of threads copying files
+        (default: {None})
+
+        ``results`` {dict} -- If given, it's filled with
+        {relative path: {'action', 'success', 'strategy'}} (default: {None})
+
+        ``snapshot`` {snapshot.StatSnapshot} -- Snapshot the plan was made
+        with. Folders written to are invalidated in it, since files copied
+        over existing ones don't change their folder mtime (default: {None})
+
+    Returns:
+        [bool] -- True if all copies and deletions succeeded, False otherwise.
+    """
+    def run_item(item):
+        return item, _run_action(left_path, right_path, item)
+
+    if workers and workers > 1 and len(plan) > 1:
+        pool = ThreadPool(min(workers, len(plan)))
+        try:
+            outcomes = pool.map(run_item, plan)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        outcomes = [run_item(each) for each in plan]
+
+    if snapshot is not None:
+        _invalidate_written_dirs(snapshot, left_path, right_path, plan)
+
+    synced = dict()
+    removed = list()
+    all_success = True
+    for item, (success, strategy) in outcomes:
+        if results is not None:
+            results[item.rel_path] = {
+                "action": item.action,
+                "success": success,
+                "strategy": strategy
+            }
+        if not success:
+            all_success = False
+        elif item.action in (LEFT_TO_RIGHT, SKIP):
+            synced[item.rel_path] = item.left
+        elif item.action == RIGHT_TO_LEFT:
+            synced[item.rel_path] = item.right
+        elif item.action in (DELETE_LEFT, DELETE_RIGHT):
+            removed.append(item.rel_path)
+    if state is not None:
+        state.update(left_path, right_path, synced, removed)
+    return all_success
+
+
+def sync(left_path, right_path, state=None, snapshot=None, newest_wins=True,
+         workers=None, results=None):
+    """Plans and runs a two-way sync. See plan_sync() and execute_plan().
+
+    Arguments:
+        ``left_path`` {str} -- Left directory
+
+        ``right_path`` {str} -- Right directory
+
+    Keyword Arguments:
+        ``state`` {SyncState} -- Last sync state (default: {None})
+
+        ``snapshot`` {snapshot.StatSnapshot} -- Snapshot used to walk both
+        sides (default: {None})
+
+        ``newest_wins`` {bool} -- See plan_sync() (default: {True})
+
+        ``workers`` {int} -- Number of threads copying files
+        (default: {None})
+
+        ``results`` {dict} -- See execute_plan() (default: {None})
+
+    Returns:
+        [tuple] -- (The plan that was run, as returned by plan_sync(),
+        True if all copies and deletions succeeded)
+    """
+    plan = plan_sync(left_path, right_path, state, snapshot, newest_wins)
+    success = execute_plan(
+        left_path, right_path, plan, state, workers, results, snapshot
+    )
+    return plan, success
+
+
+def _get_tree_state(store, root):
+    """Walks a tree once through given snapshot. Manifests are left out,
+    each side has its own.
+
+    Not meant to be used directly, use plan_sync() instead.
+
+    Returns:
+        [dict] -- {relative file path: (st_size, st_mtime)}
+    """
+    return dict(
+        (rel_path, (each_stat.st_size, each_stat.st_mtime))
+        for rel_path, each_stat in store.walk(root)
+        if os.path.basename(rel_path) != manifest.MANIFEST_NAME
+    )
+
+
+def _invalidate_written_dirs(snapshot, left_path, right_path, plan):
+    """Invalidates in given snapshot every folder a plan copied to or
+    deleted from.
+
+    Not meant to be used directly, use execute_plan() instead.
+    """
+    written = set()
+    for item in plan:
+        rel_dir = os.path.dirname(item.rel_path)
+        if item.action in (LEFT_TO_RIGHT, DELETE_RIGHT):
+            written.add((right_path, rel_dir))
+        elif item.action in (RIGHT_TO_LEFT, DELETE_LEFT):
+            written.add((left_path, rel_dir))
+    for root, rel_dir in written:
+        snapshot.invalidate(root, rel_dir)
+
+
+def _get_action(left, right, last, newest_wins=True):
+    """Decides what to do with one file, given its (st_size, st_mtime) on
+    each side and at the last sync. Any of them can be None.
+
+    Not meant to be used directly, use plan_sync() instead.
+    """
+    if left is not None and right is not None:
+        if left == right:
+            return SKIP
+        left_changed = last is None or left != last
+        right_changed = last is None or right != last
+        if left_changed and not right_changed:
+            return LEFT_TO_RIGHT
+        if right_changed and not left_changed:
+            return RIGHT_TO_LEFT
+        if not newest_wins or left[1] == right[1]:
+            return CONFLICT
+        return LEFT_TO_RIGHT if left[1] > right[1] else RIGHT_TO_LEFT
+
+    if left is not None:
+        if last is None:
+            return LEFT_TO_RIGHT
+        return DELETE_LEFT if left == last else CONFLICT
+    if right is not None:
+        if last is None:
+            return RIGHT_TO_LEFT
+        return DELETE_RIGHT if right == last else CONFLICT
+    # Deleted on both sides, only its state is removed
+    return DELETE_LEFT
+
+
+def _run_action(left_path, right_path, item):
+    """Runs one plan item.
+
+    Not meant to be used directly, use execute_plan() instead.
+
+    Returns:
+        [tuple] -- (success bool, copy strategy or None)
+    """
+    left_file = os.path.join(left_path, item.rel_path)
+    right_file = os.path.join(right_path, item.rel_path)
+    try:
+        if item.action == LEFT_TO_RIGHT:
+            return True, _copy(left_file, right_file)
+        if item.action == RIGHT_TO_LEFT:
+            return True, _copy(right_file, left_file)
+        if item.action == DELETE_LEFT and os.path.exists(left_file):
+            os.remove(left_file)
+        elif item.action == DELETE_RIGHT and os.path.exists(right_file):
+            os.remove(right_file)
+        elif item.action == CONFLICT:
+            logger.warning(
+                "Both sides changed, file left untouched: {}".format(item.rel_path)
+            )
+        return True, None
+    except (IOError, OSError) as why:
+        logger.warning(
+            "System Error while syncing file: {}\n{}".format(item.rel_path, why)
+        )
+        return False, None
+
+
+def _copy(src_file, trg_file):
+    """Copies a file with engine.copy_file(), creating its folder if needed.
+    Other threads creating the same folder at the same time are not an error.
+
+    Not meant to be used directly, use execute_plan() instead.
+    """
+    utils.make_dirs(os.path.dirname(trg_file))
+    strategy = engine.copy_file(src_file, trg_file)
+    logger.debug("Copied {} to {} ({})".format(src_file, trg_file, strategy))
+    return strategy
+
+
+def _get_pair_key(left_path, right_path):
+    """Normalized pair of directories used as database key."""
+    return "\0".join(
+        os.path.normcase(os.path.abspath(each)) for each in (left_path, right_path)
+    )
@@ -14,9 +14,24 @@ from __future__ import absolute_import, print_function
 
 import os
 import shutil
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 
 from synchronizer.logger import logger
-from synchronizer import utils
+from synchronizer import utils, syncstatus, engine, hashing, manifest
+
+
+# Stats ignored by incremental syncs, only size and last modification matter
+incremental_ignore_stats = [
+    'st_mode', 'st_ino', 'st_dev', 'st_nlink', 'st_uid',
+    'st_gid', 'st_atime', 'st_ctime'
+]
+
+# Overwrite policy that only copies over targets that differ from the source
+OVERWRITE_IF_CHANGED = "if_changed"
+
+# Max number of files in every task of a process pool directory copy
+PROCESS_SHARD_FILES = 1000
 
 
 def process_paths(src_path, trg_path, force_overwrite=True, **kwargs):
@@ -44,10 +59,103 @@ def process_paths(src_path, trg_path, force_overwrite=True, **kwargs):
         ``find_sequence`` {bool} -- If set to False, it'll skip trying to find
         sequence files for given src_path (default: {True})
 
+        ``workers`` {int} -- Number of threads used to copy sequence files
+        and their tx files concurrently. Useful on network storage where
+        copying is bound by per-file latency. If not given or lower than 2,
+        files are copied one after another. (default: {None})
+
+        ``incremental`` {bool} -- If src_path is a directory and trg_path
+        already exists, instead of emptying trg_path and copying everything
+        again, only files whose size or last modification differ are copied.
+        trg_path is never removed. Requires force_overwrite. (default: {False})
+
+        ``delete_orphans`` {bool} -- When syncing incrementally, files and
+        directories in trg_path that don't exist in src_path are removed.
+        (default: {False})
+
+        ``overwrite`` {str} -- 'if_changed': files that already exist in
+        trg_path are only overwritten if their size or last modification
+        differ from the source, whatever force_overwrite is. Directories are
+        synced incrementally. (default: {None})
+
+        ``compare_content`` {str} -- With overwrite='if_changed', compares
+        size and content hash instead of size and last modification.
+        'full' or 'quick', see syncstatus.compare_stats() (default: {None})
+
+        ``hash_cache`` {hashing.HashCache} -- Cache for content hashes
+        (default: {None})
+
+        ``processes`` {int} -- Number of processes used to copy directories
+        when trg_path is created or emptied. Files are split by folder in
+        tasks of up to PROCESS_SHARD_FILES, each process creating folders and
+        copying files on its own. Useful for trees of many small files, where
+        a single process is bound by per-file overhead. Scripts using it on
+        Windows need an ``if __name__ == '__main__'`` guard. If not given or
+        lower than 2, shutil.copytree() is used. (default: {None})
+
+        ``cancel_event`` {threading.Event} -- Once set, files of sequences,
+        incremental syncs and process pool copies not started yet are skipped
+        and False is returned. Files being copied are finished. Plain
+        shutil.copytree() copies can't be cancelled. (default: {None})
+
+        ``resumable`` {bool} -- Files bigger than chunk_size are copied in
+        chunks to a partial file next to the target. If the copy is
+        interrupted, the next run continues from the last verified chunk
+        instead of starting over. See engine.copy_file_resumable()
+        (default: {False})
+
+        ``chunk_size`` {int} -- Chunk size in bytes for resumable copies
+        (default: {engine.RESUME_CHUNK_SIZE})
+
+        ``verify`` {str} -- Hashes every file while it's copied, see
+        engine.copy_file_verified(). 'stream' trusts that hash, 'readback'
+        also reads the target back to check it. Directories copied with it,
+        or with resumable, go file by file through the copy engine instead of
+        shutil.copytree(). Takes precedence over resumable. (default: {None})
+
+        ``checksums_path`` {str} -- With verify, digests of copied files are
+        written to this checksum file. See hashing.write_checksums()
+        (default: {None})
+
+        ``write_manifest`` {bool} -- Writes a manifest at trg_path recording
+        relative path, size, mtime_ns and digest, with verify, of every file
+        written, so syncstatus.get_sync_status() can check it later without
+        comparing both sides. Directory copies record the whole target tree.
+        File and sequence copies are added to the manifest already there.
+        trg_path times are kept, and directory comparisons, sizes and
+        orphan removal leave the manifest out. See manifest module
+        (default: {False})
+
+        ``results`` {dict} -- If given, it's filled with per-file results
+        for every copy but plain shutil.copytree() ones, keyed by source file path:
+        {src file path: {'target': trg file path, 'success': bool,
+        'strategy': copy strategy used or None if it wasn't copied,
+        'digest': hex digest with verify, None otherwise}}.
+        See engine.copy_file() for strategies.
+
+    Raises:
+        ValueError: Invalid overwrite policy or verify mode.
+
     Returns:
         [bool] -- If files were processed correctly, True is returned.
         False otherwise.
     """
+    overwrite = kwargs.get("overwrite")
+    if overwrite is not None and overwrite != OVERWRITE_IF_CHANGED:
+        raise ValueError(
+            "overwrite={} is invalid. Valid options: {}".format(
+                overwrite, OVERWRITE_IF_CHANGED)
+        )
+    verify = kwargs.get("verify")
+    if verify is not None and verify not in engine.verify_modes:
+        raise ValueError(
+            "verify={} is invalid. Valid options: {}".format(
+                verify, ", ".join(engine.verify_modes))
+        )
+    checksums_path = kwargs.get("checksums_path")
+    write_manifest = kwargs.get("write_manifest")
+    if (checksums_path or write_manifest) and kwargs.get("results") is None:
+        kwargs["results"] = dict()
     src_path_norm = os.path.normcase(os.path.abspath(src_path))
     trg_path_norm = os.path.normcase(os.path.abspath(trg_path))
     logger_string = "\tSource: {}\n\tTarget: {}\n".format(
@@ -78,13 +186,85 @@ def process_paths(src_path, trg_path, force_overwrite=True, **kwargs):
             )
         success = False
     elif src_is_dir:
-        success = _process_dirs(src_path, trg_path, force_overwrite)
+        success = _process_dirs(src_path, trg_path, force_overwrite, **kwargs)
     else:
         success = _process_files(src_path, trg_path, force_overwrite, **kwargs)
+    if checksums_path and verify:
+        success = _write_checksums(checksums_path, kwargs["results"]) and success
+    if write_manifest and os.path.isdir(trg_path) and os.path.exists(src_path) \
+            and src_path_norm != trg_path_norm:
+        success = _write_manifest(
+            trg_path, src_is_dir, kwargs["results"], verify
+        ) and success
     return success
 
 
-def _process_dirs(src_path, trg_path, force_overwrite):
+def _write_manifest(trg_path, src_is_dir, results, verify=None):
+    """Writes or updates the manifest of trg_path after a copy. Directory
+    copies walk the whole target once, file copies record their results.
+
+    Not meant to be used directly, use process_paths() instead.
+
+    Returns:
+        [bool] -- True if the manifest was written
+    """
+    digests = dict(
+        (os.path.relpath(each["target"], trg_path), each["digest"])
+        for each in results.values() if each.get("digest")
+    )
+    algorithm = hashing.DEFAULT_ALGORITHM if verify else None
+    try:
+        if src_is_dir:
+            manifest.write_manifest(
+                trg_path, manifest.build_entries(trg_path, digests=digests),
+                algorithm
+            )
+        else:
+            rel_paths = [
+                os.path.relpath(each["target"], trg_path)
+                for each in results.values() if each["success"]
+            ]
+            manifest.update_manifest(
+                trg_path, manifest.build_entries(trg_path, rel_paths, digests),
+                algorithm
+            )
+    except (IOError, OSError) as why:
+        logger.error(
+            "System Error while writing manifest in {}\n{}".format(
+                trg_path, why)
+        )
+        return False
+    logger.debug("Wrote manifest in {}".format(trg_path))
+    return True
+
+
+def _write_checksums(checksums_path, results):
+    """Writes the digests of copied target files found in results.
+
+    Not meant to be used directly, use process_paths() instead.
+
+    Returns:
+        [bool] -- True if the checksum file was written
+    """
+    digests = dict(
+        (each["target"], each["digest"]) for each in results.values()
+        if each.get("digest")
+    )
+    try:
+        hashing.write_checksums(checksums_path, digests)
+    except (IOError, OSError) as why:
+        logger.error(
+            "System Error while writing checksums: {}\n{}".format(
+                checksums_path, why)
+        )
+        return False
+    logger.debug(
+        "Wrote {} checksums to {}".format(len(digests), checksums_path)
+    )
+    return True
+
+
+def _process_dirs(src_path, trg_path, force_overwrite, **kwargs):
     """Copies src_path to trg_path. Takes directories as source.
 
     Not meant to be used directly, use process_paths() instead.
@@ -98,6 +278,25 @@ def _process_dirs(src_path, trg_path, force_overwrite):
         ``force_overwrite`` {bool} -- Empties trg_path before copying src_path
             contents (default: {True})
 
+    Optional Keyword Arguments:
+        ``incremental`` {bool} -- Only copies files whose size or last
+        modification differ instead of emptying trg_path. (default: {False})
+
+        ``delete_orphans`` {bool} -- When syncing incrementally, removes
+        trg_path files and directories missing in src_path. (default: {False})
+
+        ``overwrite`` {str} -- 'if_changed' syncs incrementally, even without
+        force_overwrite. See process_paths() (default: {None})
+
+        ``processes`` {int} -- Copies with a pool of processes when trg_path
+        is created or emptied. See process_paths() (default: {None})
+
+        ``results`` {dict} -- Filled with per-file results of incremental
+        syncs. See process_paths()
+
+        ``resumable`` {bool} -- When syncing incrementally, copies big files
+        in resumable chunks. See process_paths()
+
     Returns:
         [bool] -- If directories were processed correctly, True is returned.
         False otherwise.
@@ -108,21 +307,28 @@ def _process_dirs(src_path, trg_path, force_overwrite):
     trg_exists = os.path.exists(trg_path)
     success = False
     try:
-        if not trg_exists:
-            shutil.copytree(src_path, trg_path)
+        if trg_exists and (
+                force_overwrite and kwargs.get("incremental")
+                or kwargs.get("overwrite") == OVERWRITE_IF_CHANGED):
+            success = _sync_dirs_incremental(
+                src_path, trg_path,
+                delete_orphans=kwargs.get("delete_orphans", False),
+                cancel_event=kwargs.get("cancel_event"),
+                **_get_copy_options(kwargs)
+            )
+        elif not trg_exists:
+            success = _copy_tree(src_path, trg_path, **kwargs)
             logger.debug(
                 "Finished copying source to target.\n{}".format(
                     logger_string)
             )
-            success = True
         elif trg_exists and force_overwrite:
             shutil.rmtree(trg_path)
-            shutil.copytree(src_path, trg_path)
+            success = _copy_tree(src_path, trg_path, **kwargs)
             logger.debug(
                 "Finished overwriting target with source.\n{}".format(
                     logger_string)
             )
-            success = True
         else:
             logger.warning(
                 "Target already existed and force_overwrite was set to False."
@@ -138,6 +344,310 @@ def _process_dirs(src_path, trg_path, force_overwrite):
     return success
 
 
+def _copy_tree(src_path, trg_path, **kwargs):
+    """Copies src_path to a missing or emptied trg_path. With processes, see
+    _copy_tree_processes(). With verify or resumable, files go one by one
+    through the copy engine, same as incremental syncs. Otherwise
+    shutil.copytree() is used.
+
+    Not meant to be used directly, use process_paths() instead.
+
+    Returns:
+        [bool] -- If all files were processed correctly, True is returned.
+        False otherwise.
+    """
+    processes = kwargs.get("processes")
+    if processes and processes > 1:
+        return _copy_tree_processes(
+            src_path, trg_path, processes, kwargs.get("results"),
+            kwargs.get("cancel_event"), **_get_engine_options(kwargs)
+        )
+    if kwargs.get("verify") or kwargs.get("resumable"):
+        utils.make_dirs(trg_path)
+        return _sync_dirs_incremental(
+            src_path, trg_path, cancel_event=kwargs.get("cancel_event"),
+            **_get_copy_options(kwargs)
+        )
+    shutil.copytree(src_path, trg_path)
+    return True
+
+
+def _sync_dirs_incremental(
+        src_path, trg_path, delete_orphans=False, results=None,
+        overwrite=None, compare_content=None, hash_cache=None,
+        cancel_event=None, **kwargs):
+    """Walks src_path and copies to trg_path only files that are missing or
+    whose size or last modification differ, as reported by
+    syncstatus.compare_stats(). trg_path is never removed.
+
+    Not meant to be used directly, use process_paths() instead.
+
+    Arguments:
+        ``src_path`` {str} -- Path to a directory
+
+        ``trg_path`` {str} -- Path to an existing directory
+
+    Keyword Arguments:
+        ``delete_orphans`` {bool} -- Removes trg_path files and directories
+        missing in src_path (default: {False})
+
+        ``results`` {dict} -- Filled with per-file results. See process_paths()
+        (default: {None})
+
+        ``compare_content`` {str} -- Compares size and content hash instead.
+        See process_paths() (default: {None})
+
+        ``hash_cache`` {hashing.HashCache} -- Cache for content hashes
+        (default: {None})
+
+        ``cancel_event`` {threading.Event} -- Stops before the next file once
+        set. See process_paths() (default: {None})
+
+    Returns:
+        [bool] -- If all files were processed correctly, True is returned.
+        False otherwise.
+    """
+    success = True
+    copied = skipped = removed = 0
+    synced_dirs = list()
+    for dirpath, dirnames, filenames in os.walk(src_path, followlinks=True):
+        rel_dir = os.path.relpath(dirpath, src_path)
+        trg_dir = os.path.normpath(os.path.join(trg_path, rel_dir))
+        if os.path.isfile(trg_dir):
+            os.remove(trg_dir)
+        if not os.path.isdir(trg_dir):
+            os.makedirs(trg_dir)
+        synced_dirs.append((dirpath, trg_dir))
+
+        for each in filenames:
+            if _is_cancelled(cancel_event):
+                logger.warning(
+                    "Incremental sync cancelled.\n\tSource: {}\n\tTarget: {}"
+                    "\n".format(src_path, trg_path)
+                )
+                return False
+            src_file_path = os.path.join(dirpath, each)
+            trg_file_path = os.path.join(trg_dir, each)
+            file_success = False
+            strategy = digest = None
+            try:
+                if os.path.isdir(trg_file_path):
+                    shutil.rmtree(trg_file_path)
+                if os.path.isfile(trg_file_path) and _is_current(
+                        src_file_path, trg_file_path,
+                        compare_content, hash_cache):
+                    skipped += 1
+                    _add_result(results, src_file_path, trg_file_path, True)
+                    continue
+                strategy, digest = _copy_file(
+                    src_file_path, trg_file_path, **kwargs
+                )
+                copied += 1
+                file_success = True
+            except (IOError, OSError) as why:
+                logger.warning(
+                    "System Error while processing source file: {}\n{}".format(
+                        src_file_path, why)
+                )
+                success = False
+            _add_result(
+                results, src_file_path, trg_file_path, file_success,
+                strategy, digest
+            )
+
+        if delete_orphans:
+            orphans_removed, orphans_success = _remove_orphans(
+                trg_dir, set(dirnames) | set(filenames)
+            )
+            removed += orphans_removed
+            success = success and orphans_success
+
+    # Directory stats last, since copying files into them changes mtimes
+    for src_dir, trg_dir in reversed(synced_dirs):
+        shutil.copystat(src_dir, trg_dir)
+
+    logger.debug(
+        "Finished incremental sync. Copied: {}, Skipped: {}, Removed: {}"
+        "\n\tSource: {}\n\tTarget: {}\n".format(
+            copied, skipped, removed, src_path, trg_path)
+    )
+    return success
+
+
+def _copy_tree_processes(
+        src_path, trg_path, processes, results=None, cancel_event=None,
+        **kwargs):
+    """Copies the src_path tree to trg_path with a pool of processes. The
+    tree is walked once and split by folder in shards of up to
+    PROCESS_SHARD_FILES files, run by _copy_dir_shard(). Folder stats are
+    copied last, once all their files are written.
+
+    Not meant to be used directly, use process_paths() instead.
+
+    Arguments:
+        ``src_path`` {str} -- Path to a directory
+
+        ``trg_path`` {str} -- Path to a directory, created if missing
+
+        ``processes`` {int} -- Number of processes
+
+    Keyword Arguments:
+        ``results`` {dict} -- Filled with per-file results. See process_paths()
+        (default: {None})
+
+        ``cancel_event`` {threading.Event} -- Once set, pending tasks are
+        dropped and workers terminated. See process_paths() (default: {None})
+
+        Any other keyword argument is passed to _copy_file() in each worker.
+
+    Returns:
+        [bool] -- If all files were processed correctly, True is returned.
+        False otherwise.
+    """
+    shards = list()
+    synced_dirs = list()
+    for dirpath, dirnames, filenames in os.walk(src_path, followlinks=True):
+        rel_dir = os.path.relpath(dirpath, src_path)
+        trg_dir = os.path.normpath(os.path.join(trg_path, rel_dir))
+        synced_dirs.append((dirpath, trg_dir))
+        # Folders without files still get a shard, to be created
+        for index in range(0, max(1, len(filenames)), PROCESS_SHARD_FILES):
+            shards.append((
+                dirpath, trg_dir,
+                filenames[index:index + PROCESS_SHARD_FILES],
+                results is not None, kwargs
+            ))
+
+    success = True
+    copied = 0
+    chunksize = max(1, len(shards) // (processes * 4))
+    pool = multiprocessing.Pool(processes)
+    try:
+        for shard_success, shard_copied, shard_results in pool.imap_unordered(
+                _copy_dir_shard, shards, chunksize):
+            if _is_cancelled(cancel_event):
+                logger.warning(
+                    "Process pool copy cancelled.\n\tSource: {}\n\tTarget: {}"
+                    "\n".format(src_path, trg_path)
+                )
+                pool.terminate()
+                return False
+            success = success and shard_success
+            copied += shard_copied
+            for each in shard_results:
+                _add_result(results, *each)
+    finally:
+        pool.close()
+        pool.join()
+
+    # Directory stats last, since copying files into them changes mtimes
+    for src_dir, trg_dir in reversed(synced_dirs):
+        try:
+            shutil.copystat(src_dir, trg_dir)
+        except (IOError, OSError) as why:
+            logger.warning(
+                "System Error while copying directory stats: {}\n{}".format(
+                    trg_dir, why)
+            )
+            success = False
+
+    logger.debug(
+        "Finished process pool copy. Copied: {}, Processes: {}, Tasks: {}"
+        "\n\tSource: {}\n\tTarget: {}\n".format(
+            copied, processes, len(shards), src_path, trg_path)
+    )
+    return success
+
+
+def _copy_dir_shard(shard):
+    """Creates a target folder and copies some of its files. Runs in a
+    process pool worker, so it only takes and returns picklable values.
+
+    Not meant to be used directly, use process_paths() instead.
+
+    Arguments:
+        ``shard`` {tuple} -- (source folder, target folder, file names,
+        True to return per-file results, keyword arguments of _copy_file())
+
+    Returns:
+        [tuple] -- (True if all files were copied, number of files copied,
+        list of (src file path, trg file path, success, strategy, digest))
+    """
+    src_dir, trg_dir, file_names, want_results, copy_options = shard
+    success = True
+    copied = 0
+    file_results = list()
+    try:
+        utils.make_dirs(trg_dir)
+    except (IOError, OSError) as why:
+        logger.warning(
+            "System Error while creating directory: {}\n{}".format(trg_dir, why)
+        )
+        file_results = [
+            (os.path.join(src_dir, each), os.path.join(trg_dir, each), False)
+            for each in file_names
+        ]
+        return False, 0, file_results if want_results else list()
+
+    for each in file_names:
+        src_file_path = os.path.join(src_dir, each)
+        trg_file_path = os.path.join(trg_dir, each)
+        strategy = digest = None
+        try:
+            strategy, digest = _copy_file(
+                src_file_path, trg_file_path, **copy_options
+            )
+            copied += 1
+        except (IOError, OSError) as why:
+            logger.warning(
+                "System Error while processing source file: {}\n{}".format(
+                    src_file_path, why)
+            )
+            success = False
+        if want_results:
+            file_results.append((
+                src_file_path, trg_file_path, strategy is not None,
+                strategy, digest
+            ))
+    return success, copied, file_results
+
+
+def _remove_orphans(trg_dir, src_names):
+    """Removes every file and directory in trg_dir whose name is not
+    in src_names. Manifests are kept.
+
+    Not meant to be used directly, use process_paths() instead.
+
+    Arguments:
+        ``trg_dir`` {str} -- Path to a directory
+
+        ``src_names`` {set} -- Names found in the matching source directory
+
+    Returns:
+        [tuple] -- (Number of removed paths, True if all removals succeeded)
+    """
+    removed = 0
+    success = True
+    for each in os.listdir(trg_dir):
+        if each in src_names or each == manifest.MANIFEST_NAME:
+            continue
+        orphan_path = os.path.join(trg_dir, each)
+        try:
+            if os.path.isdir(orphan_path) and not os.path.islink(orphan_path):
+                shutil.rmtree(orphan_path)
+            else:
+                os.remove(orphan_path)
+            removed += 1
+            logger.debug("Removed orphan: {}".format(orphan_path))
+        except (IOError, OSError) as why:
+            logger.warning(
+                "System Error while removing orphan: {}\n{}".format(
+                    orphan_path, why)
+            )
+            success = False
+    return removed, success
+
+
 def _process_files(src_path, trg_path, force_overwrite, **kwargs):
     """Copies src_path to trg_path. Takes a file as source.
     If given file is part of a sequence it'll find and copy the
@@ -165,8 +675,16 @@ def _process_files(src_path, trg_path, force_overwrite, **kwargs):
         ``find_sequence`` {bool} -- If set to False, it'll skip trying to find
         sequence files for given src_path (default: {True})
 
+        ``workers`` {int} -- Number of threads used to copy files
+        concurrently (default: {None})
+
+        ``results`` {dict} -- Filled with per-file results. See process_paths()
+
+        ``resumable`` {bool} -- Copies big files in resumable chunks.
+        See process_paths()
+
     Returns:
-        [bool] -- If file was processed correctly, True is returned.
+        [bool] -- If all files were processed correctly, True is returned.
         False otherwise.
     """
     skip_non_tx = False
@@ -177,41 +695,225 @@ def _process_files(src_path, trg_path, force_overwrite, **kwargs):
     if kwargs.get("include_tx"):
         include_tx = kwargs.get("include_tx")
 
-    find_sequence = True
-    if kwargs.get("find_sequence"):
-        find_sequence = kwargs.get("find_sequence")
+    find_sequence = kwargs.get("find_sequence", True)
 
     dir_success = utils.create_dir(trg_path)
     if not dir_success:
         # If directory creation failed, stop execution
         return False
 
-    if utils.is_sequence(src_path) and find_sequence:
-        sequence_files = utils.get_sequence_files(src_path)
-        for each in sequence_files:
-            if not skip_non_tx:
-                _process_original_files(each, trg_path, force_overwrite)
-            if include_tx:
-                _process_tx(each, trg_path, force_overwrite)
-            if skip_non_tx and not include_tx:
-                logger.warning(
-                    "only_tx argument set to True, but include_tx not "
-                    "passed or set to False. Nothing will be processed."
-                )
-    else:
-        if not skip_non_tx:
-            _process_original_files(src_path, trg_path, force_overwrite)
-        if include_tx:
-            _process_tx(src_path, trg_path, force_overwrite)
-        if skip_non_tx and not include_tx:
-            logger.warning(
-                "only_tx argument set to True, but include_tx not passed or "
-                "set to False. Nothing will be processed."
-            )
-    return True
+    if skip_non_tx and not include_tx:
+        logger.warning(
+            "only_tx argument set to True, but include_tx not passed or "
+            "set to False. Nothing will be processed."
+        )
+
+    files_to_process = [src_path]
+    sequences = None
+    if find_sequence:
+        # Single listing of the source folder for every sequence query
+        sequences = utils.scan_sequences(os.path.split(src_path)[0] or os.curdir)
+        if utils.is_sequence(src_path, sequences):
+            files_to_process = utils.get_sequence_files(src_path, sequences)
+
+    jobs = list()
+    if not skip_non_tx:
+        jobs.extend((_process_original_files, each) for each in files_to_process)
+    tx_success = True
+    if include_tx:
+        # Tx files of the whole sequence are found from the same listing
+        tx_files = utils.get_tx_files(files_to_process, sequences)
+        jobs.extend((_copy_tx, each) for each in tx_files["present"])
+        tx_success = _report_missing_tx(
+            tx_files["missing"], trg_path, kwargs.get("results")
+        )
+
+    job_results = _run_jobs(
+        jobs, trg_path, force_overwrite, workers=kwargs.get("workers"),
+        cancel_event=kwargs.get("cancel_event"), **_get_copy_options(kwargs)
+    )
+    return tx_success and all(job_results)
+
+
+def _report_missing_tx(missing_tx, trg_path, results=None):
+    """Logs a single warning for all missing tx files and adds them as
+    failed to results.
+
+    Not meant to be used directly, use process_paths() instead.
+
+    Returns:
+        [bool] -- True if no tx file is missing
+    """
+    if not missing_tx:
+        return True
+    logger.warning(
+        "{} source TX files don't exist:\n\t{}".format(
+            len(missing_tx), "\n\t".join(missing_tx))
+    )
+    for each in missing_tx:
+        _add_result(
+            results, each, os.path.join(trg_path, os.path.split(each)[1]), False
+        )
+    return False
+
+
+def _get_copy_options(kwargs):
+    """Picks from process_paths() keyword arguments the ones that change
+    how each single file is copied.
+
+    Not meant to be used directly, use process_paths() instead.
+
+    Arguments:
+        ``kwargs`` {dict} -- Keyword arguments passed to process_paths()
+
+    Returns:
+        [dict] -- Keyword arguments for _process_original_files() and
+        _copy_tx()
+    """
+    copy_option_names = (
+        "results", "resumable", "chunk_size", "verify",
+        "overwrite", "compare_content", "hash_cache"
+    )
+    return dict(
+        (key, value) for key, value in kwargs.items()
+        if key in copy_option_names
+    )
+
+
+def _get_engine_options(kwargs):
+    """Picks from process_paths() keyword arguments the ones passed to
+    _copy_file().
+
+    Not meant to be used directly, use process_paths() instead.
+    """
+    return dict(
+        (key, value) for key, value in kwargs.items()
+        if key in ("resumable", "chunk_size", "verify")
+    )
+
+
+def _needs_copy(
+        src_path, trg_file_path, force_overwrite, overwrite=None,
+        compare_content=None, hash_cache=None):
+    """Decides if a file has to be copied to trg_file_path, following
+    force_overwrite or the overwrite policy. Skipped files are logged.
+
+    Not meant to be used directly, use process_paths() instead.
+
+    Returns:
+        [bool] -- True if the file must be copied
+    """
+    if not os.path.exists(trg_file_path):
+        return True
+    if overwrite == OVERWRITE_IF_CHANGED:
+        if not _is_current(src_path, trg_file_path, compare_content, hash_cache):
+            return True
+        logger.debug("File already up to date: \n\t{}".format(trg_file_path))
+        return False
+    if force_overwrite:
+        return True
+    logger.debug(
+        "File already existed and force_overwrite was set to False: "
+        "\n\t{}".format(trg_file_path)
+    )
+    return False
+
+
+def _is_current(src_path, trg_file_path, compare_content=None, hash_cache=None):
+    """Checks if trg_file_path has the same size and last modification as
+    src_path, or the same size and content hash if compare_content is given.
+
+    Not meant to be used directly, use process_paths() instead.
+    """
+    compare_items = syncstatus.compare_stats(
+        src_path, trg_file_path, True, incremental_ignore_stats,
+        compare_content=compare_content, hash_cache=hash_cache
+    )
+    return all(compare_items.values())
+
+
+def _copy_file(
+        src_path, trg_file_path, resumable=False, chunk_size=None, verify=None):
+    """Copies a single file with the copy engine.
+
+    Not meant to be used directly, use process_paths() instead.
+
+    Arguments:
+        ``src_path`` {str} -- Path to a file
+
+        ``trg_file_path`` {str} -- Path to the target file
+
+    Keyword Arguments:
+        ``resumable`` {bool} -- Use engine.copy_file_resumable()
+        (default: {False})
+
+        ``chunk_size`` {int} -- Chunk size for resumable copies
+        (default: {engine.RESUME_CHUNK_SIZE})
+
+        ``verify`` {str} -- Use engine.copy_file_verified() with this mode
+        (default: {None})
+
+    Returns:
+        [tuple] -- (Strategy used to copy the file, hex digest or None if
+        not verified)
+    """
+    if verify:
+        return engine.copy_file_verified(src_path, trg_file_path, verify)
+    if resumable:
+        return engine.copy_file_resumable(
+            src_path, trg_file_path,
+            chunk_size=chunk_size or engine.RESUME_CHUNK_SIZE
+        ), None
+    return engine.copy_file(src_path, trg_file_path), None
+
+
+def _run_jobs(
+        jobs, trg_path, force_overwrite, workers=None, cancel_event=None,
+        **kwargs):
+    """Runs a list of file jobs, either one after another or through a
+    bounded thread pool if ``workers`` is greater than 1.
+
+    Not meant to be used directly, use process_paths() instead.
+
+    Arguments:
+        ``jobs`` {list} -- List of (function, src file path) tuples. Functions
+        must take the same arguments as _process_original_files()
+
+        ``trg_path`` {str} -- Path to a directory
+
+        ``force_overwrite`` {bool} -- Empties trg_path before copying src_path
+
+    Keyword Arguments:
+        ``workers`` {int} -- Max number of threads to use (default: {None})
+
+        ``cancel_event`` {threading.Event} -- Once set, jobs not started yet
+        are skipped and return False (default: {None})
+
+        Any other keyword argument is passed to each job function.
+
+    Returns:
+        [list] -- One bool per job, in the same order jobs were given.
+    """
+    def run_job(job):
+        func, file_path = job
+        if _is_cancelled(cancel_event):
+            logger.debug("Cancelled, skipped: {}".format(file_path))
+            return False
+        return func(file_path, trg_path, force_overwrite, **kwargs)
+
+    if workers and workers > 1 and len(jobs) > 1:
+        pool = ThreadPool(min(workers, len(jobs)))
+        try:
+            return pool.map(run_job, jobs)
+        finally:
+            pool.close()
+            pool.join()
+    return [run_job(each) for each in jobs]
 
 
-def _process_original_files(src_path, trg_path, force_overwrite):
+def _process_original_files(
+        src_path, trg_path, force_overwrite, results=None,
+        overwrite=None, compare_content=None, hash_cache=None, **kwargs):
     """Sometimes no tx are desired, so this only deals with src_path,
     ignoring tx files if they exist.
 
@@ -224,88 +926,112 @@ def _process_original_files(src_path, trg_path, force_overwrite):
 
         ``force_overwrite`` {bool} -- Empties trg_path before copying src_path
 
+    Keyword Arguments:
+        ``results`` {dict} -- If given, it's filled with this file result.
+        See process_paths() (default: {None})
+
+        ``resumable`` {bool} -- Copies in chunks that can be resumed if the
+        copy is interrupted. See process_paths() (default: {False})
+
+        ``overwrite`` {str} -- Overwrite policy, 'if_changed' only copies
+        over targets that differ. See process_paths() (default: {None})
+
     Returns:
         [bool] -- If files were processed correctly, True is returned.
         False otherwise.
     """
     success = False
+    strategy = digest = None
+    src_file_name = os.path.split(src_path)[1]
+    trg_file_path = os.path.join(trg_path, src_file_name)
     try:
-        src_file_name = os.path.split(src_path)[1]
-        trg_file_exists = os.path.exists(
-                os.path.join(trg_path, src_file_name)
-            )
-        if not trg_file_exists \
-                or (trg_file_exists and force_overwrite):
-            shutil.copy2(src_path, trg_path)
-            logger.debug(
-                "Copied {} to {}".format(src_path, trg_path)
-            )
-            success = True
-        else:
+        if _needs_copy(
+                src_path, trg_file_path, force_overwrite,
+                overwrite, compare_content, hash_cache):
+            strategy, digest = _copy_file(src_path, trg_file_path, **kwargs)
             logger.debug(
-                "File already existed and force_overwrite was set to False: "
-                "\n\t{}".format(os.path.join(trg_path, src_file_name))
+                "Copied {} to {} ({})".format(src_path, trg_path, strategy)
             )
-            success = True
+        success = True
     except (IOError, OSError) as why:
         logger.warning(
             "System Error while processing source file: {}\n{}".format(
                 src_path, why)
         )
         success = False
+    _add_result(results, src_path, trg_file_path, success, strategy, digest)
     return success
 
 
-def _process_tx(original_file_path, trg_path, force_overwrite):
-    """Takes original texture as parameter and finds adjacent tx file to
-    copy it to trg_path.
+def _copy_tx(
+        src_tx_path, trg_path, force_overwrite, results=None,
+        overwrite=None, compare_content=None, hash_cache=None, **kwargs):
+    """Copies a tx file already known to exist to trg_path, as found by
+    utils.get_tx_files().
 
     Not meant to be used directly, use process_paths() instead.
 
     Arguments:
-        ``src_path`` {str} -- Path to a file
+        ``src_tx_path`` {str} -- Path to a tx file
 
         ``trg_path`` {str} -- Path to a directory
 
         ``force_overwrite`` {bool} -- Empties trg_path before copying src_path
 
+    Keyword Arguments:
+        ``results`` {dict} -- If given, it's filled with this tx file result.
+        See process_paths() (default: {None})
+
+        ``resumable`` {bool} -- Copies in chunks that can be resumed if the
+        copy is interrupted. See process_paths() (default: {False})
+
+        ``overwrite`` {str} -- Overwrite policy, 'if_changed' only copies
+        over targets that differ. See process_paths() (default: {None})
+
     Returns:
-        [bool] -- If tx files were processed correctly, True is returned.
+        [bool] -- If the tx file was processed correctly, True is returned.
         False otherwise.
     """
-    src_tx_path = original_file_path.rsplit(".", 1)[0] + ".tx"
-    success = False
-    if os.path.exists(src_tx_path):
-        try:
-            src_tx_name = os.path.split(src_tx_path)[1]
-            trg_file_exists = os.path.exists(
-                    os.path.join(trg_path, src_tx_name)
-                )
-            if not trg_file_exists \
-                    or (trg_file_exists and force_overwrite):
-                shutil.copy2(src_tx_path, trg_path)
-                logger.debug(
-                    "Copied {} to {}".format(
-                        src_tx_path, trg_path)
-                )
-                success = True
-            else:
-                logger.debug(
-                    "File already existed and force_overwrite was set to "
-                    "False: \n\t{}".format(
-                        os.path.join(trg_path, src_tx_name))
-                )
-                success = True
-        except (IOError, OSError) as why:
-            logger.warning(
-                "System Error while processing source tx file: {}\n{}".format(
-                    src_tx_path, why)
+    trg_file_path = os.path.join(trg_path, os.path.split(src_tx_path)[1])
+    strategy = digest = None
+    try:
+        if _needs_copy(
+                src_tx_path, trg_file_path, force_overwrite,
+                overwrite, compare_content, hash_cache):
+            strategy, digest = _copy_file(src_tx_path, trg_file_path, **kwargs)
+            logger.debug(
+                "Copied {} to {} ({})".format(src_tx_path, trg_path, strategy)
             )
-            success = False
-    else:
+        success = True
+    except (IOError, OSError) as why:
         logger.warning(
-            "The specified source TX file doesn't exist: {}".format(
-                src_tx_path)
+            "System Error while processing source tx file: {}\n{}".format(
+                src_tx_path, why)
         )
         success = False
+    _add_result(
+        results, src_tx_path, trg_file_path, success, strategy, digest
+    )
     return success
+
+
+def _is_cancelled(cancel_event):
+    """Checks the cancel_event given to process_paths(), if any."""
+    return cancel_event is not None and cancel_event.is_set()
+
+
+def _add_result(
+        results, src_path, trg_file_path, success, strategy=None, digest=None):
+    """Stores a file result in given results dict, if any. Strategy is the
+    one reported by engine.copy_file(), None if the file wasn't copied.
+    Digest is only known for verified copies.
+
+    Not meant to be used directly, use process_paths() instead.
+    """
+    if results is not None:
+        results[src_path] = {
+            "target": trg_file_path,
+            "success": success,
+            "strategy": strategy,
+            "digest": digest
+        }
@@ -0,0 +1,443 @@
+# coding=utf-8
+
+# Copyright (C) 2019 - Chris Granados
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License, or any
+# later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+from __future__ import absolute_import, print_function
+
+import os
+import json
+import shutil
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+
+from synchronizer.logger import logger
+from synchronizer import utils, copier, manifest
+
+
+# Operation kinds
+DELETE = "delete"
+MKDIR = "mkdir"
+COPY = "copy"
+OVERWRITE = "overwrite"
+SKIP = "skip"
+
+# Version of the serialized plan format
+PLAN_FORMAT_VERSION = 1
+
+# One operation of a plan. src is None for delete and mkdir, size is the
+# number of bytes to copy, 0 for delete and mkdir
+Operation = namedtuple('Operation', ('kind', 'src', 'trg', 'size'))
+
+
+class CopyPlan(object):
+    """List of operations needed to copy some paths, made by plan_copy().
+    Nothing is touched until it's passed to execute(), so it can be inspected,
+    saved as JSON and split to run in different hosts.
+
+    Keyword Arguments:
+        ``operations`` {list} -- List of Operation (default: {None})
+    """
+    def __init__(self, operations=None):
+        self.operations = [Operation(*each) for each in operations or list()]
+
+    def add(self, kind, src, trg, size=0):
+        """Appends an operation.
+
+        Arguments:
+            ``kind`` {str} -- 'delete', 'mkdir', 'copy', 'overwrite' or 'skip'
+
+            ``src`` {str} -- Source file path, None for 'delete' and 'mkdir'
+
+            ``trg`` {str} -- Target file or directory path
+
+        Keyword Arguments:
+            ``size`` {int} -- Bytes to copy (default: {0})
+        """
+        self.operations.append(Operation(kind, src, trg, size))
+
+    @property
+    def totals(self):
+        """Number of operations of each kind, and total bytes to copy.
+
+        Returns:
+            [dict] -- {'delete', 'mkdir', 'copy', 'overwrite', 'skip': counts,
+            'bytes': bytes copied or overwritten}
+        """
+        totals = dict(
+            (kind, 0) for kind in (DELETE, MKDIR, COPY, OVERWRITE, SKIP)
+        )
+        totals["bytes"] = 0
+        for each in self.operations:
+            totals[each.kind] += 1
+            if each.kind in (COPY, OVERWRITE):
+                totals["bytes"] += each.size
+        return totals
+
+    def split(self, parts):
+        """Splits the plan in plans of similar size in bytes, to run them in
+        different hosts. Every plan keeps all mkdir operations, which are
+        harmless to repeat, so each one can run on its own. Delete operations
+        are only kept by the first plan, which must then finish before the
+        others start.
+
+        Arguments:
+            ``parts`` {int} -- Number of plans
+
+        Returns:
+            [list] -- List of CopyPlan
+        """
+        mkdirs = [each for each in self.operations if each.kind == MKDIR]
+        plans = [CopyPlan(mkdirs) for _ in range(max(1, parts))]
+        plans[0].operations[:0] = [
+            each for each in self.operations if each.kind == DELETE
+        ]
+        loads = [0] * len(plans)
+        files = [
+            each for each in self.operations if each.kind not in (MKDIR, DELETE)
+        ]
+        # Biggest files first, each one to the least loaded plan
+        for each in sorted(files, key=lambda operation: -operation.size):
+            index = loads.index(min(loads))
+            plans[index].operations.append(each)
+            loads[index] += each.size
+        return plans
+
+    def to_dict(self):
+        """Serializable representation of the plan.
+
+        Returns:
+            [dict] -- {'version', 'totals', 'operations': list of
+            [kind, src, trg, size]}
+        """
+        return {
+            "version": PLAN_FORMAT_VERSION,
+            "totals": self.totals,
+            "operations": [list(each) for each in self.operations]
+        }
+
+    def to_json(self):
+        """Serializes the plan to a JSON string. See to_dict()."""
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_dict(cls, plan_dict):
+        """Builds a plan from to_dict() output.
+
+        Raises:
+            ValueError: Unsupported format version.
+        """
+        if plan_dict.get("version") != PLAN_FORMAT_VERSION:
+            raise ValueError(
+                "Unsupported copy plan version: {}".format(plan_dict.get("version"))
+            )
+        return cls(plan_dict["operations"])
+
+    @classmethod
+    def from_json(cls, text):
+        """Builds a plan from to_json() output."""
+        return cls.from_dict(json.loads(text))
+
+    def __len__(self):
+        return len(self.operations)
+
+    def __iter__(self):
+        return iter(self.operations)
+
+    def __repr__(self):
+        return "CopyPlan({} operations, {} bytes)".format(
+            len(self.operations), self.totals["bytes"]
+        )
+
+
+def plan_copy(src_path, trg_path, force_overwrite=True, **kwargs):
+    """Works out what copier.process_paths() would do with the same
+    arguments, without touching anything. Files are compared the same way
+    process_paths() does:
+
+        -Directories with force_overwrite: process_paths() empties the
+        target first, so every target entry is deleted and every file
+        copied\n
+        -Directories without force_overwrite: nothing is copied, every file
+        is skipped\n
+        -Incremental or overwrite='if_changed': files with the same size and
+        last modification, or content with compare_content, are skipped and
+        the rest are overwritten. Orphans are deleted with delete_orphans\n
+        -Files and sequences: existing targets are overwritten if
+        force_overwrite is set, or skipped if not
+
+    Arguments:
+        ``src_path`` {str} -- Path to a file or directory
+
+        ``trg_path`` {str} -- Path to a directory
+
+    Keyword Arguments:
+        ``force_overwrite`` {bool} -- Overwrites existing files
+        (default: {True})
+
+    Optional Keyword Arguments:
+        ``include_tx``, ``only_tx``, ``find_sequence``, ``incremental``,
+        ``delete_orphans``, ``overwrite``, ``compare_content``,
+        ``hash_cache`` -- Same as copier.process_paths()
+
+    Returns:
+        [CopyPlan] -- Plan to pass to execute(). Empty if paths are invalid.
+    """
+    plan = CopyPlan()
+    compare_options = dict(
+        overwrite=kwargs.get("overwrite"),
+        compare_content=kwargs.get("compare_content"),
+        hash_cache=kwargs.get("hash_cache")
+    )
+    if not os.path.isdir(trg_path) or not os.path.exists(src_path):
+        logger.warning(
+            "Nothing to plan, target must be a directory and source must "
+            "exist.\n\tSource: {}\n\tTarget: {}\n".format(src_path, trg_path)
+        )
+        return plan
+    if os.path.isdir(src_path):
+        _plan_dirs(
+            plan, src_path, trg_path, force_overwrite,
+            incremental=kwargs.get("incremental", False),
+            delete_orphans=kwargs.get("delete_orphans", False),
+            **compare_options
+        )
+        return plan
+
+    files_to_process = [src_path]
+    sequences = None
+    if kwargs.get("find_sequence", True):
+        sequences = utils.scan_sequences(os.path.split(src_path)[0] or os.curdir)
+        if utils.is_sequence(src_path, sequences):
+            files_to_process = utils.get_sequence_files(src_path, sequences)
+    if not kwargs.get("only_tx"):
+        for each in files_to_process:
+            _plan_file(plan, each, trg_path, force_overwrite, **compare_options)
+    if kwargs.get("include_tx"):
+        tx_files = utils.get_tx_files(files_to_process, sequences)
+        for each in tx_files["present"]:
+            _plan_file(plan, each, trg_path, force_overwrite, **compare_options)
+        if tx_files["missing"]:
+            logger.warning(
+                "{} source TX files don't exist:\n\t{}".format(
+                    len(tx_files["missing"]), "\n\t".join(tx_files["missing"]))
+            )
+    return plan
+
+
+def execute(
+        plan, workers=None, results=None, resumable=False, chunk_size=None,
+        verify=None):
+    """Runs a CopyPlan. Target paths are deleted first, then directories
+    are created and files are copied the same way copier.process_paths()
+    copies them, alternating the biggest and the smallest pending files so
+    threads don't all wait on big files at the same time.
+
+    Arguments:
+        ``plan`` {CopyPlan} -- As returned by plan_copy()
+
+    Keyword Arguments:
+        ``workers`` {int} -- Number of threads copying files. If not given
+        or lower than 2, files are copied one after another (default: {None})
+
+        ``results`` {dict} -- If given, it's filled with per-file results,
+        same as copier.process_paths() (default: {None})
+
+        ``resumable`` {bool} -- Uses engine.copy_file_resumable()
+        (default: {False})
+
+        ``chunk_size`` {int} -- Chunk size for resumable copies
+        (default: {engine.RESUME_CHUNK_SIZE})
+
+        ``verify`` {str} -- Uses engine.copy_file_verified() with this mode
+        (default: {None})
+
+    Returns:
+        [bool] -- True if all operations succeeded, False otherwise.
+    """
+    success = True
+    for each in plan:
+        if each.kind == DELETE:
+            success = _remove_path(each.trg) and success
+    mkdirs = sorted(
+        (each for each in plan if each.kind == MKDIR),
+        key=lambda operation: operation.trg.count(os.sep)
+    )
+    for each in mkdirs:
+        success = utils.create_dir(each.trg) and success
+
+    def run_operation(operation):
+        strategy = digest = None
+        operation_success = True
+        if operation.kind != SKIP:
+            try:
+                strategy, digest = copier._copy_file(
+                    operation.src, operation.trg, resumable, chunk_size, verify
+                )
+            except (IOError, OSError) as why:
+                logger.warning(
+                    "System Error while processing source file: {}\n{}".format(
+                        operation.src, why)
+                )
+                operation_success = False
+        copier._add_result(
+            results, operation.src, operation.trg, operation_success,
+            strategy, digest
+        )
+        return operation_success
+
+    operations = _interleave_by_size(
+        [each for each in plan if each.kind not in (MKDIR, DELETE)]
+    )
+    if workers and workers > 1 and len(operations) > 1:
+        pool = ThreadPool(min(workers, len(operations)))
+        try:
+            outcomes = pool.map(run_operation, operations, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        outcomes = [run_operation(each) for each in operations]
+    return success and all(outcomes)
+
+
+def _plan_dirs(
+        plan, src_path, trg_path, force_overwrite, incremental=False,
+        delete_orphans=False, overwrite=None, compare_content=None,
+        hash_cache=None):
+    """Adds operations to copy a directory tree, following the same
+    branches as copier._process_dirs().
+
+    Not meant to be used directly, use plan_copy() instead.
+    """
+    incremental = force_overwrite and incremental or \
+        overwrite == copier.OVERWRITE_IF_CHANGED
+    if not incremental and not force_overwrite:
+        logger.warning(
+            "Target already existed and force_overwrite was set to False."
+            "\n\tSource: {}\n\tTarget: {}\n".format(src_path, trg_path)
+        )
+    elif not incremental:
+        # process_paths() removes the whole target before copying
+        for each in sorted(os.listdir(trg_path)):
+            plan.add(DELETE, None, os.path.join(trg_path, each))
+
+    for dirpath, dirnames, filenames in os.walk(src_path, followlinks=True):
+        rel_dir = os.path.relpath(dirpath, src_path)
+        trg_dir = os.path.normpath(os.path.join(trg_path, rel_dir))
+        if incremental:
+            _plan_dir_incremental(
+                plan, dirpath, trg_dir, dirnames, filenames,
+                delete_orphans, compare_content, hash_cache
+            )
+            continue
+        if force_overwrite and rel_dir != os.curdir:
+            plan.add(MKDIR, None, trg_dir)
+        for each in filenames:
+            _plan_file(
+                plan, os.path.join(dirpath, each), trg_dir, force_overwrite,
+                COPY if force_overwrite else SKIP
+            )
+
+
+def _plan_dir_incremental(
+        plan, src_dir, trg_dir, dirnames, filenames, delete_orphans=False,
+        compare_content=None, hash_cache=None):
+    """Adds operations to sync one folder, following the same steps as
+    copier._sync_dirs_incremental().
+
+    Not meant to be used directly, use plan_copy() instead.
+    """
+    if os.path.isfile(trg_dir):
+        plan.add(DELETE, None, trg_dir)
+    if not os.path.isdir(trg_dir):
+        plan.add(MKDIR, None, trg_dir)
+    for each in filenames:
+        kind = None
+        if os.path.isdir(os.path.join(trg_dir, each)):
+            plan.add(DELETE, None, os.path.join(trg_dir, each))
+            kind = COPY
+        _plan_file(
+            plan, os.path.join(src_dir, each), trg_dir, True, kind,
+            copier.OVERWRITE_IF_CHANGED, compare_content, hash_cache
+        )
+    if delete_orphans and os.path.isdir(trg_dir):
+        src_names = set(dirnames) | set(filenames)
+        for each in sorted(os.listdir(trg_dir)):
+            if each not in src_names and each != manifest.MANIFEST_NAME:
+                plan.add(DELETE, None, os.path.join(trg_dir, each))
+
+
+def _plan_file(
+        plan, src_file_path, trg_dir, force_overwrite, kind=None,
+        overwrite=None, compare_content=None, hash_cache=None):
+    """Adds the operation needed to copy one file into trg_dir. Unless kind
+    is given, it's decided the same way copier.process_paths() does.
+
+    Not meant to be used directly, use plan_copy() instead.
+    """
+    trg_file_path = os.path.join(trg_dir, os.path.split(src_file_path)[1])
+    try:
+        size = os.stat(src_file_path).st_size
+        if kind is None and not os.path.exists(trg_file_path):
+            kind = COPY
+        elif kind is None and copier._needs_copy(
+                src_file_path, trg_file_path, force_overwrite,
+                overwrite, compare_content, hash_cache):
+            kind = OVERWRITE
+        elif kind is None:
+            kind = SKIP
+    except (IOError, OSError) as why:
+        logger.warning(
+            "System Error while planning source file: {}\n{}".format(
+                src_file_path, why)
+        )
+        return
+    plan.add(kind, src_file_path, trg_file_path, size)
+
+
+def _interleave_by_size(operations):
+    """Orders operations biggest, smallest, second biggest, second smallest...
+
+    Not meant to be used directly, use execute() instead.
+    """
+    by_size = sorted(operations, key=lambda operation: -operation.size)
+    ordered = list()
+    first, last = 0, len(by_size) - 1
+    while first <= last:
+        ordered.append(by_size[first])
+        if first != last:
+            ordered.append(by_size[last])
+        first += 1
+        last -= 1
+    return ordered
+
+
+def _remove_path(path):
+    """Removes a file or directory tree. Paths already gone are fine, so
+    plans can be run again.
+
+    Not meant to be used directly, use execute() instead.
+
+    Returns:
+        [bool] -- True if path doesn't exist anymore
+    """
+    try:
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        elif os.path.lexists(path):
+            os.remove(path)
+    except (IOError, OSError) as why:
+        logger.warning(
+            "System Error while removing target path: {}\n{}".format(path, why)
+        )
+        return False
+    logger.debug("Removed: {}".format(path))
+    return True
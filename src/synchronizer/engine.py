@@ -0,0 +1,431 @@
+# coding=utf-8
+
+# Copyright (C) 2019 - Chris Granados
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License, or any
+# later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+from __future__ import absolute_import, print_function
+
+import os
+import sys
+import json
+import errno
+import shutil
+import hashlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from synchronizer.logger import logger
+from synchronizer import hashing
+
+
+# ioctl request number to clone a whole file on Linux (btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+# Buffer size used when data has to go through user space
+COPY_BUFSIZE = 1024 * 1024
+
+# Chunk size used by resumable copies
+RESUME_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Suffixes for in-progress resumable copies and their chunk records
+PARTIAL_SUFFIX = ".partial"
+PARTIAL_RECORD_SUFFIX = ".partial.json"
+
+# Verification modes of copy_file_verified()
+verify_modes = ("stream", "readback")
+
+# Kernel side strategies failing with any of these fall back to the next one
+_fallback_errnos = set(
+    getattr(errno, name) for name in (
+        'ENOSYS', 'EXDEV', 'EINVAL', 'EOPNOTSUPP', 'ENOTSUP',
+        'ENOTTY', 'ENOTSOCK', 'EBADF', 'EPERM'
+    ) if hasattr(errno, name)
+)
+
+try:
+    SameFileError = shutil.SameFileError
+except AttributeError:
+    class SameFileError(OSError):
+        """Raised when source and target are the same file."""
+
+
+def copy_file(src_path, trg_file_path):
+    """Copies ``src_path`` contents to ``trg_file_path`` using the cheapest
+    strategy available and then copies its metadata, same as ``shutil.copy2()``
+    does. Strategies are tried in this order, falling back to the next one
+    when the platform or filesystem doesn't support them:
+
+        -'reflink': FICLONE ioctl, the target shares the source blocks\n
+        -'copy_file_range': Kernel side copy, os.copy_file_range()\n
+        -'sendfile': Kernel side copy, os.sendfile()\n
+        -'userspace': Buffered read/write loop
+
+    Arguments:
+        ``src_path`` {str} -- Path to a file
+
+        ``trg_file_path`` {str} -- Path to the target file, not a directory
+
+    Raises:
+        SameFileError: Source and target are the same file.
+        IOError, OSError: File couldn't be copied.
+
+    Returns:
+        [str] -- Name of the strategy used to copy the file contents.
+    """
+    _check_same_file(src_path, trg_file_path)
+    with open(src_path, 'rb') as fsrc:
+        with open(trg_file_path, 'wb') as fdst:
+            strategy = _copy_contents(fsrc, fdst)
+    shutil.copystat(src_path, trg_file_path)
+    return strategy
+
+
+def copy_file_resumable(src_path, trg_file_path, chunk_size=RESUME_CHUNK_SIZE):
+    """Copies ``src_path`` to ``trg_file_path`` in chunks, so an interrupted
+    copy can continue where it left off the next time it's called. Data is
+    written to ``trg_file_path + '.partial'`` and every chunk that's been
+    written and flushed to disk is recorded, together with its checksum, in
+    ``trg_file_path + '.partial.json'``. On the next run, recorded chunks are
+    verified against the partial file and the copy continues from the last
+    good one. When finished the partial file is renamed to ``trg_file_path``,
+    metadata is copied and the record is removed.
+
+    Files smaller than ``chunk_size`` with no partial copy are copied with
+    copy_file() instead. If the source changed since the partial copy started,
+    the copy starts over.
+
+    Arguments:
+        ``src_path`` {str} -- Path to a file
+
+        ``trg_file_path`` {str} -- Path to the target file, not a directory
+
+    Keyword Arguments:
+        ``chunk_size`` {int} -- Size in bytes of each recorded chunk
+        (default: {RESUME_CHUNK_SIZE})
+
+    Raises:
+        SameFileError: Source and target are the same file.
+        IOError, OSError: File couldn't be copied.
+
+    Returns:
+        [str] -- 'resumed' if a previous partial copy was continued,
+        'resumable' if it was copied in chunks from scratch. Otherwise,
+        the strategy reported by copy_file().
+    """
+    _check_same_file(src_path, trg_file_path)
+    partial_path = trg_file_path + PARTIAL_SUFFIX
+    record_path = trg_file_path + PARTIAL_RECORD_SUFFIX
+    src_stat = os.stat(src_path)
+    if src_stat.st_size <= chunk_size and not os.path.exists(partial_path):
+        return copy_file(src_path, trg_file_path)
+
+    record = {
+        "src_size": src_stat.st_size,
+        "src_mtime": src_stat.st_mtime,
+        "chunk_size": chunk_size,
+        "chunks": list()
+    }
+    offset = _get_resume_offset(partial_path, record_path, record)
+    strategy = "resumed" if offset else "resumable"
+    if offset:
+        logger.debug(
+            "Resuming copy of {} at byte {}".format(src_path, offset)
+        )
+
+    mode = 'r+b' if os.path.exists(partial_path) else 'wb'
+    with open(src_path, 'rb') as fsrc:
+        with open(partial_path, mode) as fdst:
+            fdst.truncate(offset)
+            fsrc.seek(offset)
+            fdst.seek(offset)
+            while True:
+                data = fsrc.read(chunk_size)
+                if not data:
+                    break
+                fdst.write(data)
+                fdst.flush()
+                os.fsync(fdst.fileno())
+                record["chunks"].append(
+                    [offset, len(data), hashlib.sha1(data).hexdigest()]
+                )
+                offset += len(data)
+                _write_record(record_path, record)
+
+    if os.path.exists(trg_file_path):
+        os.remove(trg_file_path)
+    os.rename(partial_path, trg_file_path)
+    shutil.copystat(src_path, trg_file_path)
+    # Empty files never write a record
+    if os.path.exists(record_path):
+        os.remove(record_path)
+    return strategy
+
+
+def copy_file_verified(src_path, trg_file_path, verify="stream", algorithm=None):
+    """Copies ``src_path`` to ``trg_file_path`` through a user space loop
+    that hashes the data while it's written, so getting the file checksum
+    doesn't read the source again. Kernel side strategies are never used,
+    since data must go through user space to be hashed. Metadata is copied
+    same as copy_file() does.
+
+        -'stream': Trusts the hash of the data written. No extra reads\n
+        -'readback': The target is flushed to disk, dropped from the page
+        cache where os.posix_fadvise() is available, read back and hashed.
+        Only the target is read again
+
+    Arguments:
+        ``src_path`` {str} -- Path to a file
+
+        ``trg_file_path`` {str} -- Path to the target file, not a directory
+
+    Keyword Arguments:
+        ``verify`` {str} -- 'stream' or 'readback' (default: {'stream'})
+
+        ``algorithm`` {str} -- Hash algorithm name. See hashing.new_hasher()
+        (default: {hashing.DEFAULT_ALGORITHM})
+
+    Raises:
+        ValueError: Invalid verify mode.
+        SameFileError: Source and target are the same file.
+        IOError, OSError: File couldn't be copied, or the target read back
+        doesn't match. Mismatching targets are removed.
+
+    Returns:
+        [tuple] -- ('userspace', hex digest of the source data)
+    """
+    if verify not in verify_modes:
+        raise ValueError(
+            "verify={} is invalid. Valid options: {}".format(
+                verify, ", ".join(verify_modes))
+        )
+    _check_same_file(src_path, trg_file_path)
+    hasher = hashing.new_hasher(algorithm)
+    buffer = bytearray(COPY_BUFSIZE)
+    view = memoryview(buffer)
+    with open(src_path, 'rb') as fsrc:
+        with open(trg_file_path, 'wb') as fdst:
+            while True:
+                length = fsrc.readinto(buffer)
+                if not length:
+                    break
+                hasher.update(view[:length])
+                fdst.write(view[:length])
+            if verify == "readback":
+                fdst.flush()
+                os.fsync(fdst.fileno())
+    digest = hasher.hexdigest()
+
+    if verify == "readback":
+        _drop_cache(trg_file_path)
+        if hashing.get_file_hash(trg_file_path, algorithm) != digest:
+            os.remove(trg_file_path)
+            raise IOError(
+                errno.EIO, "Copied file doesn't match source checksum",
+                trg_file_path
+            )
+    shutil.copystat(src_path, trg_file_path)
+    return "userspace", digest
+
+
+def get_strategies():
+    """Lists kernel side copy strategies supported by this platform, in the
+    order copy_file() tries them. 'userspace' is always available and
+    not listed.
+
+    Returns:
+        [list] -- List of strategy names.
+    """
+    return [name for name, func in _strategies]
+
+
+def _check_same_file(src_path, trg_file_path):
+    """Refuses to copy a file onto itself, opening the target for writing
+    would truncate the source.
+
+    Not meant to be used directly, use copy_file() instead.
+
+    Raises:
+        SameFileError: Source and target are the same file.
+    """
+    if os.path.exists(trg_file_path) and \
+            os.path.samefile(src_path, trg_file_path):
+        raise SameFileError(
+            "{!r} and {!r} are the same file".format(src_path, trg_file_path)
+        )
+
+
+def _copy_contents(fsrc, fdst):
+    """Copies all data from one open file object to another, trying kernel
+    side strategies first.
+
+    Not meant to be used directly, use copy_file() instead.
+
+    Arguments:
+        ``fsrc`` {file} -- Source file object, opened for binary reading
+
+        ``fdst`` {file} -- Target file object, opened for binary writing
+
+    Returns:
+        [str] -- Name of the strategy used
+    """
+    src_fd = fsrc.fileno()
+    trg_fd = fdst.fileno()
+    size = os.fstat(src_fd).st_size
+    if size:
+        for name, func in _strategies:
+            try:
+                if func(src_fd, trg_fd, size):
+                    return name
+            except (IOError, OSError) as why:
+                if why.errno not in _fallback_errnos:
+                    raise
+                logger.debug(
+                    "Copy strategy '{}' not supported: {}".format(name, why)
+                )
+            # Start over from a clean state before falling back
+            os.lseek(src_fd, 0, os.SEEK_SET)
+            os.lseek(trg_fd, 0, os.SEEK_SET)
+            os.ftruncate(trg_fd, 0)
+    shutil.copyfileobj(fsrc, fdst, COPY_BUFSIZE)
+    return "userspace"
+
+
+def _get_resume_offset(partial_path, record_path, record):
+    """Finds the offset a resumable copy can continue from, verifying
+    recorded chunks against the partial file. Verified chunks are kept
+    in given record.
+
+    Not meant to be used directly, use copy_file_resumable() instead.
+
+    Returns:
+        [int] -- Offset in bytes, 0 if the copy must start from scratch.
+    """
+    if not os.path.exists(partial_path) or not os.path.exists(record_path):
+        return 0
+    try:
+        with open(record_path) as fp:
+            previous = json.load(fp)
+    except (IOError, OSError, ValueError) as why:
+        logger.debug(
+            "Couldn't read partial copy record {}: {}".format(record_path, why)
+        )
+        return 0
+    same_source = previous.get("src_size") == record["src_size"] and \
+        previous.get("src_mtime") == record["src_mtime"] and \
+        previous.get("chunk_size") == record["chunk_size"]
+    if not same_source:
+        logger.debug(
+            "Source changed since partial copy started: {}".format(partial_path)
+        )
+        return 0
+
+    offset = 0
+    with open(partial_path, 'rb') as fp:
+        for chunk_offset, length, digest in previous.get("chunks", list()):
+            if chunk_offset != offset:
+                break
+            fp.seek(chunk_offset)
+            if hashlib.sha1(fp.read(length)).hexdigest() != digest:
+                break
+            record["chunks"].append([chunk_offset, length, digest])
+            offset += length
+    return offset
+
+
+def _write_record(record_path, record):
+    """Writes a resumable copy record, replacing the previous one only
+    once the new one is completely written.
+
+    Not meant to be used directly, use copy_file_resumable() instead.
+    """
+    temp_path = record_path + ".tmp"
+    with open(temp_path, 'w') as fp:
+        json.dump(record, fp)
+    if os.path.exists(record_path):
+        os.remove(record_path)
+    os.rename(temp_path, record_path)
+
+
+def _drop_cache(file_path):
+    """Asks the kernel to drop cached pages of a file, so it's read back
+    from disk. Does nothing where os.posix_fadvise() isn't available.
+
+    Not meant to be used directly, use copy_file_verified() instead.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def _reflink(src_fd, trg_fd, size):
+    """Clones src_fd into trg_fd with the FICLONE ioctl.
+
+    Not meant to be used directly, use copy_file() instead.
+    """
+    fcntl.ioctl(trg_fd, FICLONE, src_fd)
+    return True
+
+
+def _copy_file_range(src_fd, trg_fd, size):
+    """Copies src_fd into trg_fd with os.copy_file_range(). Returns False
+    if less than ``size`` bytes could be copied, so the next strategy
+    is used.
+
+    Not meant to be used directly, use copy_file() instead.
+    """
+    copied = 0
+    while True:
+        sent = os.copy_file_range(src_fd, trg_fd, COPY_BUFSIZE * 64)
+        if not sent:
+            break
+        copied += sent
+    return copied == size
+
+
+def _sendfile(src_fd, trg_fd, size):
+    """Copies src_fd into trg_fd with os.sendfile(). Returns False
+    if less than ``size`` bytes could be copied, so the next strategy
+    is used.
+
+    Not meant to be used directly, use copy_file() instead.
+    """
+    copied = 0
+    while True:
+        sent = os.sendfile(trg_fd, src_fd, copied, COPY_BUFSIZE * 64)
+        if not sent:
+            break
+        copied += sent
+    return copied == size
+
+
+def _get_available_strategies():
+    """Builds the list of (name, function) kernel side strategies supported
+    by this platform.
+
+    Not meant to be used directly, use copy_file() instead.
+    """
+    strategies = list()
+    if fcntl is not None and sys.platform.startswith("linux"):
+        strategies.append(("reflink", _reflink))
+    if hasattr(os, "copy_file_range"):
+        strategies.append(("copy_file_range", _copy_file_range))
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+        strategies.append(("sendfile", _sendfile))
+    return strategies
+
+
+_strategies = _get_available_strategies()
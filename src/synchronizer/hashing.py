@@ -0,0 +1,347 @@
+# coding=utf-8
+
+# Copyright (C) 2019 - Chris Granados
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License, or any
+# later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+from __future__ import absolute_import, print_function
+
+import io
+import os
+import sqlite3
+import hashlib
+import threading
+from multiprocessing.pool import ThreadPool
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+from synchronizer.logger import logger, get_config_dir
+from synchronizer import utils
+
+
+# Default hash cache database name, inside logger.get_config_dir()
+HASH_CACHE_DB_NAME = "synchronizer_hashes.db"
+
+# Algorithm used when none is given. BLAKE2 is fast and ships with Python 3
+DEFAULT_ALGORITHM = "blake2b" if hasattr(hashlib, "blake2b") else "sha1"
+
+# Buffer size used to read files
+HASH_BUFSIZE = 1024 * 1024
+
+# Sampled hashes read the head, the tail and this many evenly spaced blocks
+SAMPLE_COUNT = 8
+
+# Size in bytes of every block read by sampled hashes
+SAMPLE_BLOCK_SIZE = 64 * 1024
+
+
+class HashCache(object):
+    """Persistent cache of file content hashes, backed by SQLite. Hashes are
+    keyed by device, inode, size and last modification in nanoseconds, so a
+    file is only read again after it changes.
+
+    Keyword Arguments:
+        ``db_path`` {str} -- Path to the SQLite database, or ':memory:' for a
+        cache that only lives as long as this object. If not given, it's
+        stored in the same user folder log files use. (default: {None})
+    """
+    def __init__(self, db_path=None):
+        if db_path is None:
+            db_path = os.path.join(get_config_dir(), HASH_CACHE_DB_NAME)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS hashes ("
+                "dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER, "
+                "algorithm TEXT, digest TEXT, "
+                "PRIMARY KEY (dev, ino, size, mtime_ns, algorithm))"
+            )
+            self._connection.commit()
+
+    def get(self, stat_result, algorithm):
+        """Looks up the hash of a file.
+
+        Arguments:
+            ``stat_result`` {os.stat_result} -- File stats
+
+            ``algorithm`` {str} -- Hash algorithm name
+
+        Returns:
+            [str] -- Hex digest, None if not cached
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT digest FROM hashes WHERE dev=? AND ino=? AND size=? "
+                "AND mtime_ns=? AND algorithm=?",
+                _get_key(stat_result) + (algorithm,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0]
+
+    def set(self, stat_result, algorithm, digest):
+        """Stores the hash of a file.
+
+        Arguments:
+            ``stat_result`` {os.stat_result} -- File stats, taken before
+            reading the file
+
+            ``algorithm`` {str} -- Hash algorithm name
+
+            ``digest`` {str} -- Hex digest
+        """
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?)",
+                _get_key(stat_result) + (algorithm, digest)
+            )
+            self._connection.commit()
+
+    def close(self):
+        """Closes the database connection."""
+        with self._lock:
+            self._connection.close()
+
+
+def new_hasher(algorithm=None):
+    """Creates a hash object for given algorithm name. Any ``hashlib``
+    algorithm is valid, and 'xxhash' if the xxhash package is installed.
+
+    Keyword Arguments:
+        ``algorithm`` {str} -- Hash algorithm name (default: {DEFAULT_ALGORITHM})
+
+    Raises:
+        ValueError: Unknown or unavailable algorithm.
+
+    Returns:
+        [object] -- Object with update() and hexdigest() methods
+    """
+    algorithm = algorithm or DEFAULT_ALGORITHM
+    if algorithm == "xxhash":
+        if xxhash is None:
+            raise ValueError("xxhash algorithm requires the xxhash package.")
+        return xxhash.xxh64()
+    return hashlib.new(algorithm)
+
+
+def get_file_hash(file_path, algorithm=None, cache=None):
+    """Hashes the whole content of a file.
+
+    Arguments:
+        ``file_path`` {str} -- Path to a file
+
+    Keyword Arguments:
+        ``algorithm`` {str} -- Hash algorithm name. See new_hasher()
+        (default: {DEFAULT_ALGORITHM})
+
+        ``cache`` {HashCache} -- If given, the file is only read if its hash
+        isn't cached yet for its current stats (default: {None})
+
+    Raises:
+        IOError, OSError: File couldn't be read.
+
+    Returns:
+        [str] -- Hex digest
+    """
+    algorithm = algorithm or DEFAULT_ALGORITHM
+    stat_result = None
+    if cache is not None:
+        stat_result = os.stat(file_path)
+        digest = cache.get(stat_result, algorithm)
+        if digest is not None:
+            return digest
+
+    hasher = new_hasher(algorithm)
+    with open(file_path, 'rb') as fp:
+        while True:
+            data = fp.read(HASH_BUFSIZE)
+            if not data:
+                break
+            hasher.update(data)
+    digest = hasher.hexdigest()
+
+    if cache is not None:
+        cache.set(stat_result, algorithm, digest)
+    return digest
+
+
+def get_sample_hash(
+        file_path, algorithm=None, cache=None,
+        samples=SAMPLE_COUNT, block_size=SAMPLE_BLOCK_SIZE):
+    """Hashes the size of a file and a few fixed-size blocks of it: the head,
+    the tail and ``samples`` blocks evenly spaced in between, read with
+    positional reads. Reading a few hundred kilobytes gives a good guess of
+    whether two big media files are equal in milliseconds, but changes
+    outside the sampled blocks are not noticed. Use get_file_hash() to be
+    sure. Files no bigger than the sampled blocks are hashed whole.
+
+    Arguments:
+        ``file_path`` {str} -- Path to a file
+
+    Keyword Arguments:
+        ``algorithm`` {str} -- Hash algorithm name. See new_hasher()
+        (default: {DEFAULT_ALGORITHM})
+
+        ``cache`` {HashCache} -- Hash cache. See get_file_hash()
+        (default: {None})
+
+        ``samples`` {int} -- Number of blocks between head and tail
+        (default: {SAMPLE_COUNT})
+
+        ``block_size`` {int} -- Size in bytes of every block
+        (default: {SAMPLE_BLOCK_SIZE})
+
+    Raises:
+        IOError, OSError: File couldn't be read.
+
+    Returns:
+        [str] -- Hex digest
+    """
+    algorithm = algorithm or DEFAULT_ALGORITHM
+    cache_algorithm = "sample:{}:{}:{}".format(algorithm, samples, block_size)
+    stat_result = os.stat(file_path)
+    if cache is not None:
+        digest = cache.get(stat_result, cache_algorithm)
+        if digest is not None:
+            return digest
+
+    size = stat_result.st_size
+    hasher = new_hasher(algorithm)
+    hasher.update(str(size).encode("ascii"))
+    with open(file_path, 'rb') as fp:
+        for offset, length in _get_sample_blocks(size, samples, block_size):
+            hasher.update(_pread(fp, length, offset))
+    digest = hasher.hexdigest()
+
+    if cache is not None:
+        cache.set(stat_result, cache_algorithm, digest)
+    return digest
+
+
+def hash_files(file_paths, algorithm=None, cache=None, workers=8):
+    """Hashes many files through a thread pool. Files that can't be read
+    are logged and left out.
+
+    Arguments:
+        ``file_paths`` {list} -- Paths to files
+
+    Keyword Arguments:
+        ``algorithm`` {str} -- Hash algorithm name. See new_hasher()
+        (default: {DEFAULT_ALGORITHM})
+
+        ``cache`` {HashCache} -- Hash cache. See get_file_hash()
+        (default: {None})
+
+        ``workers`` {int} -- Number of threads (default: {8})
+
+    Returns:
+        [dict] -- {file path: hex digest}
+    """
+    def hash_file(file_path):
+        try:
+            return file_path, get_file_hash(file_path, algorithm, cache)
+        except (IOError, OSError) as why:
+            logger.warning(
+                "System Error while hashing file: {}\n{}".format(file_path, why)
+            )
+            return file_path, None
+
+    file_paths = list(file_paths)
+    if not file_paths:
+        return dict()
+    pool = ThreadPool(max(1, min(workers, len(file_paths))))
+    try:
+        results = pool.map(hash_file, file_paths)
+    finally:
+        pool.close()
+        pool.join()
+    return dict(each for each in results if each[1] is not None)
+
+
+def write_checksums(checksums_path, digests):
+    """Writes file digests to a checksum file, one '<digest>  <path>' line
+    per file, with paths relative to the checksum file folder. It's the
+    format of sha1sum, b2sum and friends, so it can be checked with them
+    when the same algorithm is used.
+
+    Arguments:
+        ``checksums_path`` {str} -- Path to the checksum file
+
+        ``digests`` {dict} -- {file path: hex digest}
+    """
+    root = os.path.dirname(os.path.abspath(checksums_path))
+    lines = sorted(
+        u"{}  {}\n".format(
+            digest, os.path.relpath(os.path.abspath(file_path), root)
+        )
+        for file_path, digest in digests.items()
+    )
+    with io.open(checksums_path, 'w', encoding='utf-8') as fp:
+        fp.writelines(lines)
+
+
+def read_checksums(checksums_path):
+    """Reads a checksum file written by write_checksums().
+
+    Arguments:
+        ``checksums_path`` {str} -- Path to the checksum file
+
+    Raises:
+        IOError, OSError: File couldn't be read.
+
+    Returns:
+        [dict] -- {absolute file path: hex digest}
+    """
+    root = os.path.dirname(os.path.abspath(checksums_path))
+    digests = dict()
+    with io.open(checksums_path, encoding='utf-8') as fp:
+        for line in fp:
+            digest, _, rel_path = line.rstrip("\n").partition("  ")
+            if rel_path:
+                digests[os.path.normpath(os.path.join(root, rel_path))] = digest
+    return digests
+
+
+def _get_sample_blocks(size, samples, block_size):
+    """Lists (offset, length) blocks read by get_sample_hash(). A single
+    block covers files no bigger than all the sampled blocks together.
+
+    Not meant to be used directly, use get_sample_hash() instead.
+    """
+    if size <= block_size * (samples + 2):
+        return [(0, size)]
+    last_offset = size - block_size
+    step = last_offset // (samples + 1)
+    return [(step * each, block_size) for each in range(samples + 2)][:-1] + \
+        [(last_offset, block_size)]
+
+
+def _pread(fp, length, offset):
+    """Reads length bytes at offset, without moving the file position where
+    os.pread() is available.
+
+    Not meant to be used directly, use get_sample_hash() instead.
+    """
+    if hasattr(os, "pread"):
+        return os.pread(fp.fileno(), length, offset)
+    fp.seek(offset)
+    return fp.read(length)
+
+
+def _get_key(stat_result):
+    """Hash cache key for given file stats."""
+    return (
+        stat_result.st_dev, stat_result.st_ino,
+        stat_result.st_size, utils.get_mtime_ns(stat_result)
+    )
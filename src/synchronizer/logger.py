@@ -69,19 +69,7 @@ def init_file_logger():
             '%(lineno)s:%(levelname)s] %(message)s'
         )
         # Log file stream
-        userPath = os.path.expanduser("~")
-        module_dir = os.path.split(__file__)[0]
-        config_location = os.path.join(module_dir, "cfg", "config.json")
-        config = dict()
-        with open(config_location) as fp:
-            config = json.load(fp)
-        finalDir = os.path.join(userPath, "." + config["logger_dir_name"])
-
-        try:
-            if not os.path.exists(finalDir):
-                os.mkdir(finalDir)
-        except (OSError, IOError) as why:
-            raise why
+        finalDir = get_config_dir()
 
         today = date.today()
         date_string = today.strftime("%d-%m-%Y")
@@ -93,3 +81,29 @@ def init_file_logger():
 
         return log_file_path
     return None
+
+
+def get_config_dir():
+    """Returns the user OS folder where log files and other {} data are
+    stored, creating it if needed.
+
+    Raises:
+        OSError, IOError: Directory couldn't be created.
+
+    Returns:
+        [str]: Directory path
+    """.format(_base_name)
+    userPath = os.path.expanduser("~")
+    module_dir = os.path.split(__file__)[0]
+    config_location = os.path.join(module_dir, "cfg", "config.json")
+    config = dict()
+    with open(config_location) as fp:
+        config = json.load(fp)
+    finalDir = os.path.join(userPath, "." + config["logger_dir_name"])
+
+    try:
+        if not os.path.exists(finalDir):
+            os.mkdir(finalDir)
+    except (OSError, IOError) as why:
+        raise why
+    return finalDir
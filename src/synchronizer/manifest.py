@@ -0,0 +1,315 @@
+# coding=utf-8
+
+# Copyright (C) 2019 - Chris Granados
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License, or any
+# later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+from __future__ import absolute_import, print_function
+
+import os
+import struct
+import binascii
+from collections import namedtuple
+
+from synchronizer.logger import logger
+from synchronizer import utils
+from synchronizer.snapshot import StatSnapshot
+
+
+# Manifest file name, at the target root
+MANIFEST_NAME = ".synchronizer-manifest"
+
+# Binary format: header, algorithm name, then one record per file followed
+# by its UTF-8 relative path and raw digest bytes. Little endian.
+MANIFEST_MAGIC = b"SYNCMF"
+MANIFEST_VERSION = 1
+_header = struct.Struct("<6sBBI")
+_record = struct.Struct("<HQqB")
+
+# One file recorded in a manifest. digest is a hex string or None
+ManifestEntry = namedtuple(
+    'ManifestEntry', ('rel_path', 'size', 'mtime_ns', 'digest')
+)
+
+
+def get_manifest_path(root):
+    """Path of the manifest of given target root."""
+    return os.path.join(root, MANIFEST_NAME)
+
+
+def write_manifest(root, entries, algorithm=None):
+    """Writes a manifest at ``root``, replacing any previous one only once
+    the new one is completely written. The times of ``root`` are restored
+    afterwards, so writing the manifest doesn't make it look changed.
+
+    Arguments:
+        ``root`` {str} -- Target root directory
+
+        ``entries`` {list} -- ManifestEntry of every file
+
+    Keyword Arguments:
+        ``algorithm`` {str} -- Name of the hash algorithm of entry digests
+        (default: {None})
+
+    Raises:
+        IOError, OSError: Manifest couldn't be written.
+    """
+    manifest_path = get_manifest_path(root)
+    root_stat = os.stat(root)
+    algorithm_bytes = (algorithm or "").encode("ascii")
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, 'wb') as fp:
+        fp.write(_header.pack(
+            MANIFEST_MAGIC, MANIFEST_VERSION, len(algorithm_bytes), len(entries)
+        ))
+        fp.write(algorithm_bytes)
+        for each in sorted(entries, key=lambda entry: entry.rel_path):
+            path_bytes = each.rel_path.replace(os.sep, "/").encode("utf-8")
+            digest_bytes = binascii.unhexlify(each.digest) if each.digest else b""
+            fp.write(_record.pack(
+                len(path_bytes), each.size, each.mtime_ns, len(digest_bytes)
+            ))
+            fp.write(path_bytes)
+            fp.write(digest_bytes)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    os.rename(temp_path, manifest_path)
+    _restore_times(root, root_stat)
+
+
+def read_manifest(root):
+    """Reads the manifest of given target root.
+
+    Arguments:
+        ``root`` {str} -- Target root directory
+
+    Raises:
+        IOError, OSError: Manifest couldn't be read.
+        ValueError: Not a manifest, unsupported version or truncated.
+
+    Returns:
+        [tuple] -- (Hash algorithm name or None, {relative file path:
+        ManifestEntry})
+    """
+    with open(get_manifest_path(root), 'rb') as fp:
+        data = fp.read()
+    if len(data) < _header.size:
+        raise ValueError("Truncated manifest in {}".format(root))
+    magic, version, algorithm_size, count = _header.unpack_from(data)
+    if magic != MANIFEST_MAGIC or version != MANIFEST_VERSION:
+        raise ValueError("Unsupported manifest in {}".format(root))
+    offset = _header.size
+    algorithm = data[offset:offset + algorithm_size].decode("ascii") or None
+    offset += algorithm_size
+
+    entries = dict()
+    for _ in range(count):
+        if len(data) < offset + _record.size:
+            raise ValueError("Truncated manifest in {}".format(root))
+        path_size, size, mtime_ns, digest_size = _record.unpack_from(data, offset)
+        offset += _record.size
+        rel_path = os.path.normpath(
+            data[offset:offset + path_size].decode("utf-8")
+        )
+        offset += path_size
+        digest = data[offset:offset + digest_size]
+        offset += digest_size
+        entries[rel_path] = ManifestEntry(
+            rel_path, size, mtime_ns,
+            binascii.hexlify(digest).decode("ascii") if digest else None
+        )
+    return algorithm, entries
+
+
+def build_entries(root, rel_paths=None, digests=None):
+    """Stats files under ``root`` to make manifest entries. The manifest
+    itself is left out.
+
+    Arguments:
+        ``root`` {str} -- Target root directory
+
+    Keyword Arguments:
+        ``rel_paths`` {list} -- File paths relative to root. If not given,
+        every file under root is walked (default: {None})
+
+        ``digests`` {dict} -- {relative file path: hex digest}
+        (default: {None})
+
+    Returns:
+        [list] -- ManifestEntry of every file that could be stat'ed
+    """
+    digests = digests or dict()
+    if rel_paths is None:
+        rel_paths = utils.walk_files(root)
+    entries = list()
+    for rel_path in rel_paths:
+        rel_path = os.path.normpath(rel_path)
+        if rel_path == MANIFEST_NAME:
+            continue
+        try:
+            stat_result = os.stat(os.path.join(root, rel_path))
+        except (IOError, OSError) as why:
+            logger.warning(
+                "System Error while adding file to manifest: {}\n{}".format(
+                    rel_path, why)
+            )
+            continue
+        entries.append(ManifestEntry(
+            rel_path, stat_result.st_size, utils.get_mtime_ns(stat_result),
+            digests.get(rel_path)
+        ))
+    return entries
+
+
+def update_manifest(root, entries, algorithm=None):
+    """Adds or replaces entries in the manifest of given target root, keeping
+    the ones already recorded for other files. An unreadable manifest is
+    replaced.
+
+    Arguments:
+        ``root`` {str} -- Target root directory
+
+        ``entries`` {list} -- ManifestEntry of files written
+
+    Keyword Arguments:
+        ``algorithm`` {str} -- Name of the hash algorithm of entry digests
+        (default: {None})
+
+    Raises:
+        IOError, OSError: Manifest couldn't be written.
+    """
+    recorded = dict()
+    previous_algorithm = None
+    if os.path.exists(get_manifest_path(root)):
+        try:
+            previous_algorithm, recorded = read_manifest(root)
+        except (IOError, OSError, ValueError) as why:
+            logger.warning(
+                "Replacing unreadable manifest in {}\n{}".format(root, why)
+            )
+    for each in entries:
+        recorded[each.rel_path] = each
+    write_manifest(root, list(recorded.values()), algorithm or previous_algorithm)
+
+
+def validate(src_path, trg_path, check_target=True, snapshot=None):
+    """Checks a target against its manifest and the source. The source is
+    walked once and every file compared by size and mtime_ns with its
+    manifest entry, the target is never walked. Target files can also be
+    stat'ed, to find the ones changed since the manifest was written. Files
+    added to the target without touching the manifest aren't noticed.
+
+    For a file source, ``trg_path`` is the target file and the manifest is
+    looked up in its folder.
+
+    Arguments:
+        ``src_path`` {str} -- Source file or directory
+
+        ``trg_path`` {str} -- Target file or directory
+
+    Keyword Arguments:
+        ``check_target`` {bool} -- Stats target files recorded in the
+        manifest (default: {True})
+
+        ``snapshot`` {snapshot.StatSnapshot} -- Snapshot used to walk the
+        source. If not given, an in-memory one is used (default: {None})
+
+    Raises:
+        IOError, OSError: Manifest couldn't be read.
+        ValueError: Invalid manifest.
+
+    Returns:
+        [dict] -- {'in_sync': bool, 'missing': source files not in the
+        manifest, 'changed': source files whose size or mtime differ,
+        'extra': manifest files not in the source, 'drifted': target files
+        missing or different from the manifest}. Lists of relative paths.
+    """
+    if os.path.isdir(src_path):
+        root = trg_path
+        src_files = _get_source_files(src_path, snapshot)
+    else:
+        root, file_name = os.path.split(trg_path)
+        src_stat = os.stat(src_path)
+        src_files = {
+            file_name: (src_stat.st_size, utils.get_mtime_ns(src_stat))
+        }
+    _, entries = read_manifest(root)
+    if not os.path.isdir(src_path):
+        entries = dict(
+            (key, value) for key, value in entries.items() if key in src_files
+        )
+
+    result = {
+        "missing": list(),
+        "changed": list(),
+        "extra": sorted(set(entries) - set(src_files)),
+        "drifted": list()
+    }
+    for rel_path in sorted(src_files):
+        entry = entries.get(rel_path)
+        if entry is None:
+            result["missing"].append(rel_path)
+        elif src_files[rel_path] != (entry.size, entry.mtime_ns):
+            result["changed"].append(rel_path)
+    if check_target:
+        for rel_path in sorted(entries):
+            if _is_drifted(os.path.join(root, rel_path), entries[rel_path]):
+                result["drifted"].append(rel_path)
+    result["in_sync"] = not any(
+        result[each] for each in ("missing", "changed", "extra", "drifted")
+    )
+    return result
+
+
+def _get_source_files(src_path, snapshot=None):
+    """Walks a source tree once.
+
+    Not meant to be used directly, use validate() instead.
+
+    Returns:
+        [dict] -- {relative file path: (st_size, st_mtime_ns)}, without the
+        source own manifest, if any
+    """
+    store = snapshot if snapshot is not None else StatSnapshot(":memory:")
+    try:
+        return dict(
+            (os.path.normpath(rel_path), (each.st_size, each.st_mtime_ns))
+            for rel_path, each in store.walk(src_path)
+            if rel_path != MANIFEST_NAME
+        )
+    finally:
+        if snapshot is None:
+            store.close()
+
+
+def _restore_times(dir_path, stat_result):
+    """Sets the access and modification times of dir_path back to the ones
+    in given os.stat() result.
+
+    Not meant to be used directly, use write_manifest() instead.
+    """
+    if hasattr(stat_result, "st_mtime_ns"):
+        os.utime(
+            dir_path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns)
+        )
+    else:
+        os.utime(dir_path, (stat_result.st_atime, stat_result.st_mtime))
+
+
+def _is_drifted(file_path, entry):
+    """Checks if a target file changed since its manifest entry was written.
+
+    Not meant to be used directly, use validate() instead.
+    """
+    try:
+        stat_result = os.stat(file_path)
+    except (IOError, OSError):
+        return True
+    return (stat_result.st_size, utils.get_mtime_ns(stat_result)) != \
+        (entry.size, entry.mtime_ns)
@@ -0,0 +1,230 @@
+# coding=utf-8
+
+# Copyright (C) 2019 - Chris Granados
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License, or any
+# later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+from __future__ import absolute_import, print_function
+
+import os
+
+from synchronizer.logger import logger
+from synchronizer import hashing, syncstatus, manifest
+from synchronizer.snapshot import StatSnapshot
+
+
+def get_tree_digests(root, snapshot=None, compare_content=None, hash_cache=None):
+    """Computes a Merkle digest for every directory under ``root``. Each
+    directory digest is built from its files names, sizes and mtimes and
+    from the digests of its subdirectories, so two directories with the same
+    digest hold the same tree, and any change deep in a tree changes the
+    digest of every directory above it.
+
+    Directories are listed through a snapshot.StatSnapshot. With a persistent
+    snapshot, directories that didn't change since the last time are read
+    from it instead of stat'ing their files again, and the digest of their
+    files is stored in it and reused, so unchanged files aren't hashed
+    again either. Subdirectories are always walked, a directory mtime
+    doesn't change when something deeper does. Same as the snapshot, files
+    modified in place without touching their directory are not noticed.
+
+    Arguments:
+        ``root`` {str} -- Root directory of the tree
+
+    Keyword Arguments:
+        ``snapshot`` {snapshot.StatSnapshot} -- Snapshot used to list
+        directories. If not given, an in-memory one is used (default: {None})
+
+        ``compare_content`` {str} -- If given, file digests use content hashes
+        instead of mtimes. 'full' or 'quick', see syncstatus.compare_stats()
+        (default: {None})
+
+        ``hash_cache`` {hashing.HashCache} -- Cache for content hashes
+        (default: {None})
+
+    Raises:
+        ValueError: Invalid compare_content.
+
+    Returns:
+        [dict] -- {directory path relative to root: hex digest}. The root
+        digest is keyed by ''
+    """
+    if compare_content and compare_content not in syncstatus.content_modes:
+        raise ValueError(
+            "compare_content={} is invalid. Valid options: {}".format(
+                compare_content, ", ".join(syncstatus.content_modes))
+        )
+    store = snapshot if snapshot is not None else StatSnapshot(":memory:")
+    digests = dict()
+    try:
+        _digest_dir(store, root, "", digests, compare_content, hash_cache)
+    finally:
+        if snapshot is None:
+            store.close()
+    return digests
+
+
+def diff_digests(
+        src_path, trg_path, snapshot=None, compare_content=None, hash_cache=None):
+    """Finds files that differ between two directory trees, descending only
+    into directories whose digests differ. Unlike syncstatus.diff_trees(),
+    files that are the same are not yielded.
+
+    Arguments:
+        ``src_path`` {str} -- Source directory
+
+        ``trg_path`` {str} -- Target directory
+
+    Keyword Arguments:
+        ``snapshot`` {snapshot.StatSnapshot} -- Snapshot used to list both
+        trees. See get_tree_digests() (default: {None})
+
+        ``compare_content`` {str} -- Compares files by content hash instead
+        of mtime. See get_tree_digests() (default: {None})
+
+        ``hash_cache`` {hashing.HashCache} -- Cache for content hashes. If not
+        given, an in-memory one is used so files are only read once.
+        (default: {None})
+
+    Yields:
+        [tuple] -- (File path relative to both roots, status). Status is
+        one of syncstatus.DIFF_ADDED, DIFF_REMOVED or DIFF_CHANGED
+    """
+    store = snapshot if snapshot is not None else StatSnapshot(":memory:")
+    cache = hash_cache
+    if compare_content and cache is None:
+        cache = hashing.HashCache(":memory:")
+    try:
+        src_digests = get_tree_digests(src_path, store, compare_content, cache)
+        trg_digests = get_tree_digests(trg_path, store, compare_content, cache)
+        pending = [""]
+        while pending:
+            rel_dir = pending.pop()
+            if src_digests.get(rel_dir) == trg_digests.get(rel_dir):
+                continue
+            src_files, src_dirs = _list_dir(store, src_path, rel_dir)
+            trg_files, trg_dirs = _list_dir(store, trg_path, rel_dir)
+            for name in sorted(set(src_files) | set(trg_files)):
+                rel_path = os.path.join(rel_dir, name)
+                if name not in trg_files:
+                    yield (rel_path, syncstatus.DIFF_ADDED)
+                elif name not in src_files:
+                    yield (rel_path, syncstatus.DIFF_REMOVED)
+                elif _get_file_key(src_path, rel_path, src_files[name],
+                                   compare_content, cache) != \
+                        _get_file_key(trg_path, rel_path, trg_files[name],
+                                      compare_content, cache):
+                    yield (rel_path, syncstatus.DIFF_CHANGED)
+            for name in sorted(src_dirs - trg_dirs):
+                for rel_path in _walk_files(store, src_path, os.path.join(rel_dir, name)):
+                    yield (rel_path, syncstatus.DIFF_ADDED)
+            for name in sorted(trg_dirs - src_dirs):
+                for rel_path in _walk_files(store, trg_path, os.path.join(rel_dir, name)):
+                    yield (rel_path, syncstatus.DIFF_REMOVED)
+            pending.extend(
+                os.path.join(rel_dir, name)
+                for name in sorted(src_dirs & trg_dirs, reverse=True)
+            )
+    finally:
+        if snapshot is None:
+            store.close()
+        if cache is not hash_cache:
+            cache.close()
+
+
+def _digest_dir(store, root, rel_dir, digests, compare_content, hash_cache):
+    """Computes the digest of a directory after its subdirectories, storing
+    all of them in given digests dict.
+
+    Not meant to be used directly, use get_tree_digests() instead.
+    """
+    files, dirs = _list_dir(store, root, rel_dir)
+    hasher = hashing.new_hasher()
+    for name in sorted(dirs):
+        child_dir = os.path.join(rel_dir, name)
+        child_digest = _digest_dir(
+            store, root, child_dir, digests, compare_content, hash_cache
+        )
+        hasher.update(u"d\0{}\0{}\n".format(name, child_digest).encode("utf-8"))
+    files_digest = _digest_files(
+        store, root, rel_dir, files, compare_content, hash_cache
+    )
+    hasher.update(u"f\0{}\n".format(files_digest).encode("utf-8"))
+    digests[rel_dir] = hasher.hexdigest()
+    return digests[rel_dir]
+
+
+def _digest_files(store, root, rel_dir, files, compare_content, hash_cache):
+    """Computes the digest of the files right in a directory, or reuses the
+    one stored in the snapshot if the directory didn't change.
+
+    Not meant to be used directly, use get_tree_digests() instead.
+    """
+    kind = "merkle:{}:{}".format(
+        hashing.DEFAULT_ALGORITHM, compare_content or "stat"
+    )
+    files_digest = store.get_digest(root, rel_dir, kind)
+    if files_digest is not None:
+        return files_digest
+    hasher = hashing.new_hasher()
+    for name in sorted(files):
+        file_key = _get_file_key(
+            root, os.path.join(rel_dir, name), files[name],
+            compare_content, hash_cache
+        )
+        hasher.update(u"{}\0{}\0{}\n".format(name, *file_key).encode("utf-8"))
+    files_digest = hasher.hexdigest()
+    store.set_digest(root, rel_dir, kind, files_digest)
+    return files_digest
+
+
+def _list_dir(store, root, rel_dir):
+    """Lists a directory through given snapshot, leaving manifests out.
+
+    Not meant to be used directly, use get_tree_digests() instead.
+    """
+    files, dirs = store.list_dir(root, rel_dir)
+    if manifest.MANIFEST_NAME in files:
+        files = dict(files)
+        del files[manifest.MANIFEST_NAME]
+    return files, dirs
+
+
+def _walk_files(store, root, rel_dir):
+    """Yields file paths under a directory through given snapshot, leaving
+    manifests out.
+
+    Not meant to be used directly, use get_tree_digests() instead.
+    """
+    for rel_path, _ in store.walk(root, rel_dir):
+        if os.path.basename(rel_path) != manifest.MANIFEST_NAME:
+            yield rel_path
+
+
+def _get_file_key(root, rel_path, stat_result, compare_content, hash_cache):
+    """Values that identify a file version: (size, mtime_ns), or
+    (size, content hash) when comparing content. Files that can't be read
+    get no content hash.
+
+    Not meant to be used directly, use get_tree_digests() instead.
+    """
+    if not compare_content:
+        return (stat_result.st_size, stat_result.st_mtime_ns)
+    file_path = os.path.join(root, rel_path)
+    try:
+        if compare_content == "quick":
+            digest = hashing.get_sample_hash(file_path, cache=hash_cache)
+        else:
+            digest = hashing.get_file_hash(file_path, cache=hash_cache)
+    except (IOError, OSError) as why:
+        logger.warning(
+            "System Error while hashing file: {}\n{}".format(file_path, why)
+        )
+        digest = None
+    return (stat_result.st_size, digest)
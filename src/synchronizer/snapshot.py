@@ -0,0 +1,360 @@
+# coding=utf-8
+
+# Copyright (C) 2019 - Chris Granados
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License, or any
+# later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+from __future__ import absolute_import, print_function
+
+import os
+import stat
+import time
+import sqlite3
+import threading
+from collections import namedtuple
+
+from synchronizer.logger import logger, get_config_dir
+from synchronizer import utils
+
+
+# Default snapshot database name, inside logger.get_config_dir()
+SNAPSHOT_DB_NAME = "synchronizer_snapshot.db"
+
+# Directories modified less than this many seconds before being listed are
+# listed again next time, changes within the same mtime tick could be missed
+RECENT_CHANGE_SECONDS = 2
+
+# Stat fields stored for every file, same names os.stat() uses
+stat_fields = (
+    'st_mode', 'st_ino', 'st_dev', 'st_nlink', 'st_uid', 'st_gid',
+    'st_size', 'st_atime', 'st_mtime', 'st_ctime', 'st_mtime_ns'
+)
+
+SnapshotStat = namedtuple('SnapshotStat', stat_fields)
+
+
+class StatSnapshot(object):
+    """Persistent store of directory listings and file stats, backed by
+    SQLite. Every directory is recorded with its own last modification time.
+    When a directory is listed again and its mtime didn't change, its files
+    and stats are answered from the snapshot instead of stat'ing them again,
+    so repeated checks of the same trees only touch directories that changed.
+
+    A directory mtime only changes when entries are created, removed or
+    renamed in it. Files modified in place, without touching their
+    directory, are not noticed until the directory is listed with
+    ``refresh=True``. Publishing and rendering tools usually write to a
+    temporary name and rename it, which does update the directory.
+
+    Arguments:
+        ``db_path`` {str} -- Path to the SQLite database. If not given,
+        it's stored in the same user folder log files use.
+        (default: {None})
+    """
+    def __init__(self, db_path=None):
+        if db_path is None:
+            db_path = os.path.join(get_config_dir(), SNAPSHOT_DB_NAME)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._create_tables()
+
+    def list_dir(self, root, rel_dir="", refresh=False):
+        """Lists a directory, not recursively. Files are only stat'ed if the
+        directory changed since the last time it was listed.
+
+        Arguments:
+            ``root`` {str} -- Root directory of the tree
+
+        Keyword Arguments:
+            ``rel_dir`` {str} -- Directory to list, relative to root
+            (default: {""})
+
+            ``refresh`` {bool} -- Stats everything again, even if the
+            directory didn't change (default: {False})
+
+        Returns:
+            [tuple] -- ({file name: SnapshotStat}, set of directory names).
+            Both empty if the directory doesn't exist.
+        """
+        root_key = _get_root_key(root)
+        dir_path = os.path.join(root, rel_dir)
+        try:
+            dir_mtime_ns = utils.get_mtime_ns(os.stat(dir_path))
+        except (IOError, OSError):
+            with self._lock:
+                self._forget_dir(root_key, rel_dir)
+            return dict(), set()
+
+        with self._lock:
+            cursor = self._connection.execute(
+                "SELECT mtime_ns FROM dirs WHERE root=? AND rel_dir=?",
+                (root_key, rel_dir)
+            )
+            row = cursor.fetchone()
+            if row is not None and row[0] == dir_mtime_ns and not refresh:
+                return self._load_dir(root_key, rel_dir)
+
+        files, dirs = _stat_dir(dir_path)
+        if time.time() - dir_mtime_ns / 1e9 < RECENT_CHANGE_SECONDS:
+            dir_mtime_ns = None
+        with self._lock:
+            previous_dirs = self._load_dir(root_key, rel_dir)[1]
+            for each in previous_dirs - dirs:
+                self._forget_dir(root_key, os.path.join(rel_dir, each))
+            self._save_dir(root_key, rel_dir, dir_mtime_ns, files, dirs)
+        logger.debug(
+            "Snapshot updated for: {}".format(dir_path)
+        )
+        return files, dirs
+
+    def walk(self, root, rel_dir="", refresh=False):
+        """Recursively yields every file under a directory with its stats,
+        listing each directory through list_dir().
+
+        Arguments:
+            ``root`` {str} -- Root directory of the tree
+
+        Keyword Arguments:
+            ``rel_dir`` {str} -- Directory to walk, relative to root
+            (default: {""})
+
+            ``refresh`` {bool} -- Stats everything again (default: {False})
+
+        Yields:
+            [tuple] -- (File path relative to root, SnapshotStat)
+        """
+        pending = [rel_dir]
+        while pending:
+            current_dir = pending.pop()
+            files, dirs = self.list_dir(root, current_dir, refresh)
+            for each in sorted(files):
+                yield os.path.join(current_dir, each), files[each]
+            pending.extend(
+                os.path.join(current_dir, each)
+                for each in sorted(dirs, reverse=True)
+            )
+
+    def get_digest(self, root, rel_dir, kind):
+        """Reads a digest stored for a directory with set_digest(). It's only
+        returned if the directory didn't change since it was stored.
+
+        Arguments:
+            ``root`` {str} -- Root directory of the tree
+
+            ``rel_dir`` {str} -- Directory, relative to root
+
+            ``kind`` {str} -- Name telling apart digests of the same
+            directory built in different ways
+
+        Returns:
+            [str] -- Stored digest, or None
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                "SELECT digests.digest FROM digests JOIN dirs "
+                "ON digests.root=dirs.root AND digests.rel_dir=dirs.rel_dir "
+                "WHERE digests.root=? AND digests.rel_dir=? AND kind=? "
+                "AND digests.mtime_ns=dirs.mtime_ns",
+                (_get_root_key(root), rel_dir, kind)
+            )
+            row = cursor.fetchone()
+        return row[0] if row is not None else None
+
+    def set_digest(self, root, rel_dir, kind, digest):
+        """Stores a digest computed from a directory listing, tied to the
+        directory mtime recorded by the last list_dir(). Nothing is stored
+        for directories modified too recently to trust their mtime.
+
+        Arguments:
+            ``root`` {str} -- Root directory of the tree
+
+            ``rel_dir`` {str} -- Directory, relative to root
+
+            ``kind`` {str} -- See get_digest()
+
+            ``digest`` {str} -- Digest to store
+        """
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO digests "
+                "SELECT root, rel_dir, ?, mtime_ns, ? FROM dirs "
+                "WHERE root=? AND rel_dir=? AND mtime_ns IS NOT NULL",
+                (kind, digest, _get_root_key(root), rel_dir)
+            )
+            self._connection.commit()
+
+    def invalidate(self, root, rel_dir=""):
+        """Marks a directory as changed, so it's listed and stat'ed again
+        next time. Use it after writing files in place, which doesn't change
+        the directory mtime.
+
+        Arguments:
+            ``root`` {str} -- Root directory of the tree
+
+        Keyword Arguments:
+            ``rel_dir`` {str} -- Directory written to, relative to root
+            (default: {""})
+        """
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM dirs WHERE root=? AND rel_dir=?",
+                (_get_root_key(root), rel_dir)
+            )
+            self._connection.commit()
+
+    def clear(self, root=None):
+        """Removes everything stored for given root, or for every root.
+
+        Keyword Arguments:
+            ``root`` {str} -- Root directory of the tree (default: {None})
+        """
+        with self._lock:
+            for table in ("dirs", "entries", "digests"):
+                if root is None:
+                    self._connection.execute("DELETE FROM {}".format(table))
+                else:
+                    self._connection.execute(
+                        "DELETE FROM {} WHERE root=?".format(table),
+                        (_get_root_key(root),)
+                    )
+            self._connection.commit()
+
+    def close(self):
+        """Closes the database connection."""
+        with self._lock:
+            self._connection.close()
+
+    def _create_tables(self):
+        """Creates database tables if they don't exist yet."""
+        stat_columns = ", ".join(
+            "{} {}".format(each, "REAL" if each.endswith("time") else "INTEGER")
+            for each in stat_fields
+        )
+        with self._lock:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS dirs ("
+                "root TEXT, rel_dir TEXT, mtime_ns INTEGER, "
+                "PRIMARY KEY (root, rel_dir))"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "root TEXT, rel_dir TEXT, name TEXT, is_dir INTEGER, "
+                "{}, PRIMARY KEY (root, rel_dir, name))".format(stat_columns)
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS digests ("
+                "root TEXT, rel_dir TEXT, kind TEXT, mtime_ns INTEGER, "
+                "digest TEXT, PRIMARY KEY (root, rel_dir, kind))"
+            )
+            self._connection.commit()
+
+    def _load_dir(self, root_key, rel_dir):
+        """Reads a directory listing from the snapshot."""
+        files = dict()
+        dirs = set()
+        cursor = self._connection.execute(
+            "SELECT name, is_dir, {} FROM entries "
+            "WHERE root=? AND rel_dir=?".format(", ".join(stat_fields)),
+            (root_key, rel_dir)
+        )
+        for row in cursor:
+            if row[1]:
+                dirs.add(row[0])
+            else:
+                files[row[0]] = SnapshotStat(*row[2:])
+        return files, dirs
+
+    def _save_dir(self, root_key, rel_dir, mtime_ns, files, dirs):
+        """Replaces a directory listing in the snapshot."""
+        self._connection.execute(
+            "DELETE FROM entries WHERE root=? AND rel_dir=?", (root_key, rel_dir)
+        )
+        placeholders = ", ".join("?" * (len(stat_fields) + 4))
+        rows = [
+            (root_key, rel_dir, name, 0) + tuple(stat)
+            for name, stat in files.items()
+        ]
+        rows.extend(
+            (root_key, rel_dir, name, 1) + (None,) * len(stat_fields)
+            for name in dirs
+        )
+        self._connection.executemany(
+            "INSERT INTO entries VALUES ({})".format(placeholders), rows
+        )
+        self._connection.execute(
+            "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?)",
+            (root_key, rel_dir, mtime_ns)
+        )
+        self._connection.commit()
+
+    def _forget_dir(self, root_key, rel_dir):
+        """Removes a directory and everything under it from the snapshot."""
+        prefix = os.path.join(rel_dir, "") if rel_dir else ""
+        for table in ("dirs", "entries", "digests"):
+            self._connection.execute(
+                "DELETE FROM {} WHERE root=? AND "
+                "(rel_dir=? OR substr(rel_dir, 1, ?)=?)".format(table),
+                (root_key, rel_dir, len(prefix), prefix)
+            )
+        self._connection.commit()
+
+
+def to_snapshot_stat(stat_result):
+    """Converts an os.stat() result to a SnapshotStat.
+
+    Arguments:
+        ``stat_result`` {os.stat_result} -- As returned by os.stat()
+
+    Returns:
+        [SnapshotStat] -- Stat fields stored in snapshots
+    """
+    values = [getattr(stat_result, each) for each in stat_fields[:-1]]
+    values.append(utils.get_mtime_ns(stat_result))
+    return SnapshotStat(*values)
+
+
+def _get_root_key(root):
+    """Normalized root path used as database key."""
+    return os.path.normcase(os.path.abspath(root))
+
+
+def _stat_dir(dir_path):
+    """Lists and stats a directory, not recursively. Symbolic links to
+    directories are skipped, same as utils.walk_files() does.
+
+    Returns:
+        [tuple] -- ({file name: SnapshotStat}, set of directory names)
+    """
+    files = dict()
+    dirs = set()
+    if utils.scandir is not None:
+        for entry in utils.scandir(dir_path):
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.add(entry.name)
+                elif entry.is_file():
+                    files[entry.name] = to_snapshot_stat(entry.stat())
+            except (IOError, OSError):
+                # Removed while listing
+                continue
+        return files, dirs
+
+    for each in os.listdir(dir_path):
+        each_path = os.path.join(dir_path, each)
+        try:
+            if os.path.isdir(each_path) and not os.path.islink(each_path):
+                dirs.add(each)
+                continue
+            each_stat = os.stat(each_path)
+        except (IOError, OSError):
+            continue
+        if stat.S_ISREG(each_stat.st_mode):
+            files[each] = to_snapshot_stat(each_stat)
+    return files, dirs
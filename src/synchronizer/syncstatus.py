@@ -13,11 +13,20 @@
 from __future__ import absolute_import, print_function
 
 import os
+import time
 import datetime
+from multiprocessing.pool import ThreadPool
 
 import six
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from synchronizer.logger import logger
+from synchronizer import utils, hashing, manifest
+from synchronizer.snapshot import RECENT_CHANGE_SECONDS
 
 
 status_dict = {
@@ -30,12 +39,46 @@ status_dict = {
             7: "Source and Target are exactly the same path"
             }
 
+stats_dict = {
+    'st_mode': 'File type and file mode bits',
+    'st_ino': 'inode or file index',
+    'st_dev': 'Device',
+    'st_nlink': 'Number of hard links',
+    'st_uid': 'User id of owner',
+    'st_gid': 'Group id of owner',
+    'st_size': 'File size',
+    'st_atime': 'Most recent access',
+    'st_mtime': 'Last modification',
+    'st_ctime': 'Most recent metadata change'
+}
+
+# Order of stat columns in compare_stats_batch() results
+stat_columns = (
+    'st_mode', 'st_ino', 'st_dev', 'st_nlink', 'st_uid', 'st_gid',
+    'st_size', 'st_atime', 'st_mtime', 'st_ctime'
+)
+
+# Content comparison modes. See compare_stats()
+content_modes = ("full", "quick")
+
+# Stats ignored when comparing content, equal bytes written at different
+# times are in sync
+content_ignore_stats = ['st_atime', 'st_mtime', 'st_ctime']
+
+# Per-file statuses yielded by diff_trees()
+DIFF_ADDED = "added"
+DIFF_REMOVED = "removed"
+DIFF_CHANGED = "changed"
+DIFF_SAME = "same"
+
 
 def get_sync_status(
         src_path, trg_path,
         ignore_name=False,
         ignore_stats=['st_uid', 'st_gid', 'st_atime',
-                      'st_ctime', 'st_ino', 'st_dev']):
+                      'st_ctime', 'st_ino', 'st_dev'],
+        snapshot=None, compare_content=None, hash_cache=None,
+        escalate_content=False, size_cache=None, use_manifest=False):
     """Compare two files or directory paths and return sync status.
     Sync status refers to name and ``os.stat()`` comparisons.
 
@@ -63,6 +106,40 @@ def get_sync_status(
         -'st_mtime': 'Last modification'\n
         -'st_ctime': 'Most recent metadata change'
 
+        ``snapshot`` {snapshot.StatSnapshot} -- If given, directory sizes
+        are computed from it, only stat'ing files again in directories that
+        changed since the last time. See snapshot.StatSnapshot
+        (default: {None})
+
+        ``compare_content`` {str} -- Also compares file contents, so files with
+        the same bytes are in sync even if they were written at different
+        times. Time stats (st_atime, st_mtime, st_ctime) are ignored and a
+        'Content' comparison is added. Only applies to files.
+        (default: {None})
+
+            -'full': Hashes the whole content of both files.
+            See hashing.get_file_hash()\n
+            -'quick': Hashes the size and a few sampled blocks of both files,
+            changes outside those blocks are missed.
+            See hashing.get_sample_hash()
+
+        ``hash_cache`` {hashing.HashCache} -- If given, files are only read
+        again when their stats change (default: {None})
+
+        ``escalate_content`` {bool} -- With compare_content='quick', files
+        whose samples match are confirmed with a full hash. Files whose
+        samples differ are never read whole. (default: {False})
+
+        ``size_cache`` {dict} -- Directory sizes cache, reused between calls.
+        See get_dir_size() (default: {None})
+
+        ``use_manifest`` {bool} -- If the target has a manifest written by
+        copier.process_paths(), the source is walked once and checked against
+        it, and target files are only stat'ed, instead of comparing stats
+        of both sides. ignore_name, ignore_stats and compare_content don't
+        apply. Without a readable manifest, paths are compared as usual.
+        See manifest.validate() (default: {False})
+
     Returns:
         [tuple] -- (Status code, Status description)
             1 = "In sync"\n
@@ -88,8 +165,19 @@ def get_sync_status(
                     status_dict[7], logger_string)
                     )
                 return (7, status_dict[7])
+            manifest_status = None
+            if use_manifest:
+                manifest_status = _get_manifest_status(src_path, trg_path, snapshot)
+            if manifest_status is not None:
+                logger.debug("{} (manifest).\n{}".format(
+                    manifest_status[1], logger_string)
+                    )
+                return manifest_status
             compare_items = compare_stats(
-                    src_path, trg_path, ignore_name, ignore_stats
+                    src_path, trg_path, ignore_name, ignore_stats,
+                    snapshot=snapshot, compare_content=compare_content,
+                    hash_cache=hash_cache, escalate_content=escalate_content,
+                    size_cache=size_cache
                 )
             result = True
             logger_string += "\tMatch comparison results:\n"
@@ -145,11 +233,41 @@ def get_sync_status(
         return None
 
 
+def _get_manifest_status(src_path, trg_path, snapshot=None):
+    """Sync status from the target manifest.
+
+    Not meant to be used directly, use get_sync_status() instead.
+
+    Returns:
+        [tuple] -- (Status code, Status description)
+
+        [None] -- If the target has no readable manifest
+    """
+    root = trg_path if os.path.isdir(trg_path) else os.path.dirname(trg_path)
+    if not os.path.exists(manifest.get_manifest_path(root)):
+        return None
+    try:
+        result = manifest.validate(src_path, trg_path, snapshot=snapshot)
+    except (IOError, OSError, ValueError) as why:
+        logger.warning(
+            "Couldn't validate manifest in {}, comparing stats instead.\n{}".format(
+                root, why)
+        )
+        return None
+    if os.path.isfile(src_path) and result["missing"]:
+        # File not recorded, the manifest can't tell
+        return None
+    status_code = 1 if result["in_sync"] else 2
+    return (status_code, status_dict[status_code])
+
+
 def compare_stats(
         src_path, trg_path,
         ignore_name=False,
         ignore_stats=['st_uid', 'st_gid', 'st_atime',
-                      'st_ctime', 'st_ino', 'st_dev']):
+                      'st_ctime', 'st_ino', 'st_dev'],
+        snapshot=None, compare_content=None, hash_cache=None,
+        escalate_content=False, size_cache=None):
     """Compares stats and file names for two given paths. Returns a
     dict with all comparison results.
 
@@ -177,23 +295,41 @@ def compare_stats(
             -'st_mtime': 'Last modification'\n
             -'st_ctime': 'Most recent metadata change'
 
+        ``snapshot`` {snapshot.StatSnapshot} -- If given, directory sizes
+        are computed from it, only stat'ing files again in directories that
+        changed since the last time. See snapshot.StatSnapshot
+        (default: {None})
+
+        ``compare_content`` {str} -- Also compares file contents, so files with
+        the same bytes are in sync even if they were written at different
+        times. Time stats (st_atime, st_mtime, st_ctime) are ignored and a
+        'Content' comparison is added. Only applies to files.
+        (default: {None})
+
+            -'full': Hashes the whole content of both files.
+            See hashing.get_file_hash()\n
+            -'quick': Hashes the size and a few sampled blocks of both files,
+            changes outside those blocks are missed.
+            See hashing.get_sample_hash()
+
+        ``hash_cache`` {hashing.HashCache} -- If given, files are only read
+        again when their stats change (default: {None})
+
+        ``escalate_content`` {bool} -- With compare_content='quick', files
+        whose samples match are confirmed with a full hash. Files whose
+        samples differ are never read whole. (default: {False})
+
+        ``size_cache`` {dict} -- Directory sizes cache, reused between calls.
+        See get_dir_size() (default: {None})
+
     Returns:
         [dict] -- {Stat description: Comparison result bool}
     """
-    src_stat = os.stat(src_path)  # noqa: F841
-    trg_stat = os.stat(trg_path)  # noqa: F841
-    stats_dict = {
-        'st_mode': 'File type and file mode bits',
-        'st_ino': 'inode or file index',
-        'st_dev': 'Device',
-        'st_nlink': 'Number of hard links',
-        'st_uid': 'User id of owner',
-        'st_gid': 'Group id of owner',
-        'st_size': 'File size',
-        'st_atime': 'Most recent access',
-        'st_mtime': 'Last modification',
-        'st_ctime': 'Most recent metadata change'
-    }
+    _validate_content_mode(compare_content)
+    if compare_content:
+        ignore_stats = list(ignore_stats) + content_ignore_stats
+    src_stat = os.stat(src_path)
+    trg_stat = os.stat(trg_path)
     result = dict()
     src_file_name = os.path.split(src_path)[1]
     trg_file_name = os.path.split(trg_path)[1]
@@ -201,17 +337,21 @@ def compare_stats(
         result["Name"] = False
     elif src_file_name == trg_file_name and not ignore_name:
         result["Name"] = True
-    for key, value in six.iteritems(stats_dict):
-        if key not in ignore_stats:
-            if eval("src_stat.{}".format(key)) != \
-               eval("trg_stat.{}".format(key)):
-                result[value] = False
-            else:
-                result[value] = True
+    result.update(_compare_stat_results(src_stat, trg_stat, ignore_stats))
+
+    if compare_content and os.path.isfile(src_path) and os.path.isfile(trg_path):
+        result["Content"] = _compare_content(
+            src_path, trg_path, src_stat, trg_stat, compare_content,
+            hash_cache, escalate_content
+        )
 
     if os.path.isdir(src_path) and os.path.isdir(trg_path):
-        src_dir_size = get_dir_size(src_path)
-        trg_dir_size = get_dir_size(trg_path)
+        src_dir_size = get_dir_size(
+            src_path, snapshot=snapshot, size_cache=size_cache
+        )
+        trg_dir_size = get_dir_size(
+            trg_path, snapshot=snapshot, size_cache=size_cache
+        )
         result['Dir size'] = False
         if src_dir_size == trg_dir_size:
             result['Dir size'] = True
@@ -219,7 +359,384 @@ def compare_stats(
     return result
 
 
-def get_most_recent(src_path, trg_path, use_stat='st_mtime'):
+def get_sequence_sync_status(
+        src_frame, trg_path,
+        ignore_stats=['st_uid', 'st_gid', 'st_atime',
+                      'st_ctime', 'st_ino', 'st_dev'],
+        include_tx=False):
+    """Compares a whole sequence against a target directory. The source
+    folder and the target directory are listed once each, so checking
+    a sequence doesn't require calling get_sync_status() for every frame.
+    Frames are matched by name, case insensitive.
+
+    Arguments:
+        ``src_frame`` {str} -- Path to any file of the source sequence
+
+        ``trg_path`` {str} -- Path to the target directory
+
+    Keyword Arguments:
+        ``ignore_stats`` {list} -- Ignores this list of stats when comparing
+        frames found in both sides. See get_sync_status()
+        (default: ['st_uid', 'st_gid', 'st_atime', 'st_ctime', 'st_ino', 'st_dev'])
+
+        ``include_tx`` {bool} -- Also reports frames whose source tx file
+        is not in the target directory. Frames without a tx file in the
+        source are not reported (default: {False})
+
+    Returns:
+        [dict] -- Aggregate status and per-frame differences, as FrameSets:
+
+            -'status': (Status code, Status description), see
+            get_sync_status(). 1 if nothing differs, 2 otherwise\n
+            -'missing': Source frames not found in the target\n
+            -'extra': Target frames not found in the source\n
+            -'changed': Source frames whose stats differ from the target\n
+            -'missing_tx': Frames whose source tx file is not in the target,
+            named as the expected target tx files. Empty if include_tx is
+            False
+
+        Differences are None if either path doesn't exist or the target
+        is not a directory.
+
+        [None] -- If src_frame is not part of a sequence
+    """
+    if not os.path.exists(src_frame):
+        if not os.path.exists(trg_path):
+            return _sequence_result(3)
+        return _sequence_result(4)
+    if not os.path.exists(trg_path):
+        return _sequence_result(5)
+    if not os.path.isdir(trg_path):
+        return _sequence_result(6)
+
+    key = utils.get_sequence_key(src_frame)
+    src_sequences = utils.scan_sequences(
+        os.path.split(src_frame)[0] or os.curdir
+    )
+    if not utils.is_sequence(src_frame, src_sequences):
+        return None
+    src_set = utils.get_frame_set(src_frame, src_sequences)
+    trg_sequences = utils.scan_sequences(trg_path)
+    src_files = _get_frame_paths(src_sequences.get(key, list()))
+    trg_files = _get_frame_paths(trg_sequences.get(key, list()))
+    trg_set = utils.FrameSet(
+        trg_path, src_set.name_pattern, src_set.ext, trg_files, src_set.padding
+    )
+
+    changed = list()
+    for frame in sorted(set(src_files) & set(trg_files)):
+        try:
+            compare_items = _compare_stat_results(
+                os.stat(src_files[frame]), os.stat(trg_files[frame]),
+                ignore_stats
+            )
+        except (IOError, OSError) as why:
+            logger.warning(
+                "System Error while comparing frame: {}\n{}".format(
+                    src_files[frame], why)
+            )
+            compare_items = {"Stats": False}
+        if not all(compare_items.values()):
+            changed.append(frame)
+
+    missing_tx = list()
+    tx_ext = "tx"
+    if include_tx:
+        tx_key = utils.get_sequence_key(utils.get_tx_path(src_frame))
+        src_tx_files = _get_frame_paths(src_sequences.get(tx_key, list()))
+        trg_tx_files = _get_frame_paths(trg_sequences.get(tx_key, list()))
+        missing_tx = sorted(
+            each for each in src_tx_files if each not in trg_tx_files
+        )
+        if missing_tx:
+            # Same case as the source tx files, e.g. '.TX'
+            tx_ext = os.path.splitext(src_tx_files[missing_tx[0]])[1][1:]
+    tx_set = utils.FrameSet(
+        trg_path, src_set.name_pattern, tx_ext, missing_tx, src_set.padding
+    )
+
+    result = _sequence_result(2)
+    result["missing"] = src_set.difference(trg_set)
+    result["extra"] = trg_set.difference(src_set)
+    result["changed"] = utils.FrameSet(
+        src_set.dir_path, src_set.name_pattern, src_set.ext, changed,
+        src_set.padding
+    )
+    result["missing_tx"] = tx_set
+    differences = ("missing", "extra", "changed", "missing_tx")
+    if not any(len(result[each]) for each in differences):
+        result["status"] = (1, status_dict[1])
+    return result
+
+
+def _get_frame_paths(sequence_files):
+    """Maps frame numbers to paths for files of one sequence, as listed by
+    utils.scan_sequences().
+
+    Not meant to be used directly, use get_sequence_sync_status() instead.
+    """
+    if not sequence_files:
+        return dict()
+    name_pattern = utils.FrameSet.from_files(sequence_files).name_pattern
+    frame_paths = dict()
+    for each in sequence_files:
+        try:
+            frame_paths[utils.get_frame_number(each, name_pattern)] = each
+        except ValueError:
+            # Placeholder digits, e.g. '####'
+            continue
+    return frame_paths
+
+
+def _sequence_result(status_code):
+    """Builds a get_sequence_sync_status() result with no differences.
+
+    Not meant to be used directly, use get_sequence_sync_status() instead.
+    """
+    return {
+        "status": (status_code, status_dict[status_code]),
+        "missing": None,
+        "extra": None,
+        "changed": None,
+        "missing_tx": None
+    }
+
+
+def diff_trees(
+        src_path, trg_path,
+        ignore_stats=['st_uid', 'st_gid', 'st_atime',
+                      'st_ctime', 'st_ino', 'st_dev'],
+        workers=8, stop_at_first_difference=False, batch_size=512,
+        snapshot=None, compare_content=None, hash_cache=None,
+        escalate_content=False):
+    """Walks two directory trees and yields the status of every file found
+    in either of them, as soon as it's known. Both trees are walked side by
+    side, one directory at a time, so memory stays bounded no matter how big
+    they are. Files found in both trees are stat'ed in batches through a
+    thread pool and compared with the same rules as compare_stats().
+    Directories are only walked, empty directories are not reported.
+
+    Arguments:
+        ``src_path`` {str} -- Source directory
+
+        ``trg_path`` {str} -- Target directory
+
+    Keyword Arguments:
+        ``ignore_stats`` {list} -- Ignores this list of stats. See compare_stats()
+        (default: ['st_uid', 'st_gid', 'st_atime', 'st_ctime', 'st_ino', 'st_dev'])
+
+        ``workers`` {int} -- Number of threads used to stat files (default: {8})
+
+        ``stop_at_first_difference`` {bool} -- Stops after yielding the first
+        file that's not 'same' (default: {False})
+
+        ``batch_size`` {int} -- Max number of files waiting to be stat'ed
+        at once (default: {512})
+
+        ``snapshot`` {snapshot.StatSnapshot} -- If given, directories are
+        listed through it and files are only stat'ed again in directories
+        that changed since the last time. See snapshot.StatSnapshot
+        (default: {None})
+
+        ``compare_content`` {str} -- Content comparison mode, see
+        compare_stats(). Files are hashed in the same thread pool.
+        (default: {None})
+
+        ``hash_cache`` {hashing.HashCache} -- Cache for content hashes
+        (default: {None})
+
+        ``escalate_content`` {bool} -- Confirms matching quick comparisons
+        with a full hash, see compare_stats() (default: {False})
+
+    Yields:
+        [tuple] -- (File path relative to both trees, status)
+            'added' = Only in src_path\n
+            'removed' = Only in trg_path\n
+            'changed' = In both, but stats are different\n
+            'same' = In both, with equal stats
+    """
+    _validate_content_mode(compare_content)
+    if compare_content:
+        ignore_stats = list(ignore_stats) + content_ignore_stats
+
+    def compare_file(item):
+        rel_path, stats = item
+        src_file_path = os.path.join(src_path, rel_path)
+        trg_file_path = os.path.join(trg_path, rel_path)
+        if stats is None:
+            try:
+                src_stat = os.stat(src_file_path)
+            except (IOError, OSError):
+                # Removed from source after walking it
+                return (rel_path, DIFF_REMOVED)
+            try:
+                trg_stat = os.stat(trg_file_path)
+            except (IOError, OSError):
+                return (rel_path, DIFF_ADDED)
+        else:
+            src_stat, trg_stat = stats
+        compare_items = _compare_stat_results(src_stat, trg_stat, ignore_stats)
+        if all(compare_items.values()) and compare_content:
+            compare_items["Content"] = _compare_content(
+                src_file_path, trg_file_path, src_stat, trg_stat,
+                compare_content, hash_cache, escalate_content
+            )
+        if all(compare_items.values()):
+            return (rel_path, DIFF_SAME)
+        return (rel_path, DIFF_CHANGED)
+
+    pool = ThreadPool(max(1, workers))
+    try:
+        for rel_path, status in _iter_compared(
+                _iter_tree_pairs(src_path, trg_path, snapshot), compare_file,
+                pool, batch_size, inline_known_stats=not compare_content):
+            yield (rel_path, status)
+            if stop_at_first_difference and status != DIFF_SAME:
+                return
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _iter_tree_pairs(src_path, trg_path, snapshot=None):
+    """Walks src_path and trg_path side by side, one directory at a time.
+
+    Not meant to be used directly, use diff_trees() instead.
+
+    Yields:
+        [tuple] -- (File path relative to both trees, status, stats). Status
+        is 'added', 'removed' or None for files found in both trees. For
+        those, stats is a (src stat, trg stat) tuple when a snapshot already
+        knows them, None otherwise.
+    """
+    pending = [""]
+    while pending:
+        rel_dir = pending.pop()
+        src_files, src_dirs = _list_tree_dir(src_path, rel_dir, snapshot)
+        trg_files, trg_dirs = _list_tree_dir(trg_path, rel_dir, snapshot)
+
+        for each in sorted(set(src_files) | set(trg_files)):
+            rel_path = os.path.join(rel_dir, each)
+            if each not in trg_files:
+                yield (rel_path, DIFF_ADDED, None)
+            elif each not in src_files:
+                yield (rel_path, DIFF_REMOVED, None)
+            elif snapshot is not None:
+                yield (rel_path, None, (src_files[each], trg_files[each]))
+            else:
+                yield (rel_path, None, None)
+
+        for each in sorted(src_dirs - trg_dirs):
+            for rel_path in _walk_tree_files(src_path, os.path.join(rel_dir, each), snapshot):
+                yield (rel_path, DIFF_ADDED, None)
+        for each in sorted(trg_dirs - src_dirs):
+            for rel_path in _walk_tree_files(trg_path, os.path.join(rel_dir, each), snapshot):
+                yield (rel_path, DIFF_REMOVED, None)
+        pending.extend(
+            os.path.join(rel_dir, each)
+            for each in sorted(src_dirs & trg_dirs, reverse=True)
+        )
+
+
+def _list_tree_dir(root, rel_dir, snapshot=None):
+    """Lists a directory of a tree, through given snapshot if any.
+    Manifests are left out.
+
+    Not meant to be used directly, use diff_trees() instead.
+
+    Returns:
+        [tuple] -- (file names or {file name: stat}, set of directory names)
+    """
+    if snapshot is not None:
+        files, dirs = snapshot.list_dir(root, rel_dir)
+        if manifest.MANIFEST_NAME in files:
+            files = dict(files)
+            del files[manifest.MANIFEST_NAME]
+        return files, dirs
+    files, dirs = _list_dir(os.path.join(root, rel_dir))
+    files.discard(manifest.MANIFEST_NAME)
+    return files, dirs
+
+
+def _walk_tree_files(root, rel_dir, snapshot=None):
+    """Recursively yields files under a directory of a tree, through given
+    snapshot if any.
+
+    Not meant to be used directly, use diff_trees() instead.
+
+    Yields:
+        [str] -- File path relative to root
+    """
+    if snapshot is not None:
+        rel_paths = (rel_path for rel_path, _ in snapshot.walk(root, rel_dir))
+    else:
+        rel_paths = (
+            os.path.join(rel_dir, rel_path)
+            for rel_path in utils.walk_files(os.path.join(root, rel_dir))
+        )
+    for rel_path in rel_paths:
+        if os.path.basename(rel_path) != manifest.MANIFEST_NAME:
+            yield rel_path
+
+
+def _iter_compared(pairs, compare_func, pool, batch_size, inline_known_stats=True):
+    """Yields statuses from _iter_tree_pairs(), comparing files found in
+    both trees in batches through given thread pool. Files only found in one
+    tree are yielded right away, and so are files whose stats are already
+    known if inline_known_stats is True.
+
+    Not meant to be used directly, use diff_trees() instead.
+    """
+    batch = list()
+    for rel_path, status, stats in pairs:
+        if status is not None:
+            yield (rel_path, status)
+            continue
+        if stats is not None and inline_known_stats:
+            yield compare_func((rel_path, stats))
+            continue
+        batch.append((rel_path, stats))
+        if len(batch) >= batch_size:
+            for each in pool.imap(compare_func, batch):
+                yield each
+            batch = list()
+    for each in pool.imap(compare_func, batch):
+        yield each
+
+
+def _list_dir(dir_path):
+    """Lists a directory, not recursively.
+
+    Not meant to be used directly, use diff_trees() instead.
+
+    Returns:
+        [tuple] -- (set of file names, set of directory names). Both empty
+        if dir_path doesn't exist. Symbolic links to directories are
+        skipped, same as utils.walk_files() does.
+    """
+    files = set()
+    dirs = set()
+    if not os.path.isdir(dir_path):
+        return files, dirs
+    if utils.scandir is None:
+        for each in os.listdir(dir_path):
+            each_path = os.path.join(dir_path, each)
+            if os.path.isdir(each_path) and not os.path.islink(each_path):
+                dirs.add(each)
+            elif os.path.isfile(each_path):
+                files.add(each)
+        return files, dirs
+    for entry in utils.scandir(dir_path):
+        if entry.is_dir(follow_symlinks=False):
+            dirs.add(entry.name)
+        elif entry.is_file():
+            files.add(entry.name)
+    return files, dirs
+
+
+def get_most_recent(
+        src_path, trg_path, use_stat='st_mtime',
+        recursive=False, workers=8, prune=False, recent_cache=None):
     """Compares two paths and returns whichever has the most recent stat time.
     Default stat used for comparison is st_mtime which is: Time of most recent
     content modification.
@@ -238,6 +755,29 @@ def get_most_recent(src_path, trg_path, use_stat='st_mtime'):
             -'st_ctime': Time of creation on Windows, time of most recent
             metadata change on Unix
 
+        ``recursive`` {bool} -- Directories are compared by the most recent
+        stat time of anything inside them, files and directories, instead of
+        their own. Trees are walked with ``os.scandir()`` through a thread
+        pool. (default: {False})
+
+        ``workers`` {int} -- Number of threads used by recursive
+        (default: {8})
+
+        ``prune`` {bool} -- Used with recursive. Files right in the given
+        directories are always stat'ed. Deeper, files are not stat'ed in
+        directories whose own stat time isn't newer than the most recent time
+        found so far. Only safe if files are renamed into place once
+        complete, which updates their directory after their last write.
+        Files written after being created, modified in place or appended to
+        can be newer than their directory and are missed. Subdirectories are
+        always walked, a directory time doesn't change when something deeper
+        does. (default: {False})
+
+        ``recent_cache`` {dict} -- Used with recursive. If given, the most
+        recent time of every directory is kept in it, keyed by directory path
+        and mtime, so next calls only list directories that changed. Same
+        caveat as prune applies. (default: {None})
+
     Returns:
         [str] -- Path of whichever has the most recent stat time.
 
@@ -249,11 +789,12 @@ def get_most_recent(src_path, trg_path, use_stat='st_mtime'):
         src_path, trg_path
         )
     if use_stat in valid_stats:
-        src_stat = os.stat(src_path)  # noqa: F841
-        trg_stat = os.stat(trg_path)  # noqa: F841
-
-        src_most = eval("src_stat.{}".format(use_stat))
-        trg_most = eval("trg_stat.{}".format(use_stat))
+        src_most = _get_recent_time(
+            src_path, use_stat, recursive, workers, prune, recent_cache
+        )
+        trg_most = _get_recent_time(
+            trg_path, use_stat, recursive, workers, prune, recent_cache
+        )
         if trg_most > src_most:
             return trg_path
         elif trg_most < src_most:
@@ -274,23 +815,451 @@ def get_most_recent(src_path, trg_path, use_stat='st_mtime'):
     return None
 
 
-def get_dir_size(dir_path):
-    """Walks thru given directory to calculate total size.
+def _get_recent_time(
+        path, use_stat, recursive=False, workers=8, prune=False, recent_cache=None):
+    """Most recent use_stat time of a path, or of anything inside it if
+    it's a directory and recursive is True.
+
+    Not meant to be used directly, use get_most_recent() instead.
+    """
+    if not recursive or not os.path.isdir(path):
+        return getattr(os.stat(path), use_stat)
+
+    # Nothing is pruned until the root level, files included, is scanned
+    most_recent = [None]
+
+    def scan_dir(each_dir):
+        best = most_recent[0] if prune else None
+        return _scan_recent_time(each_dir, use_stat, best, recent_cache)
+
+    for level in _iter_dir_levels(path, scan_dir, workers):
+        level_times = [each for each, _ in level if each is not None]
+        if most_recent[0] is not None:
+            level_times.append(most_recent[0])
+        if level_times:
+            most_recent[0] = max(level_times)
+    if most_recent[0] is None:
+        return getattr(os.stat(path), use_stat)
+    return most_recent[0]
+
+
+def _scan_recent_time(dir_path, use_stat, best=None, recent_cache=None):
+    """Lists a directory, not recursively, finding the most recent use_stat
+    time of the directory itself and its files. Files are not stat'ed if
+    best is given and the directory time isn't newer than it.
+
+    Not meant to be used directly, use get_most_recent() instead.
+
+    Returns:
+        [tuple] -- (Most recent time or None, list of subdirectory paths)
+    """
+    try:
+        dir_stat = os.stat(dir_path)
+    except (IOError, OSError):
+        return None, list()
+    dir_time = getattr(dir_stat, use_stat)
+    cache_key = (dir_path, use_stat)
+    mtime_ns = utils.get_mtime_ns(dir_stat)
+    if recent_cache is not None:
+        cached = recent_cache.get(cache_key)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1], cached[2]
+
+    skip_files = best is not None and dir_time <= best
+    most_recent = dir_time
+    subdirs = list()
+    try:
+        if utils.scandir is not None:
+            # DirEntry.stat() is cached, and free on Windows
+            entries = [
+                (entry.path, entry.is_dir(follow_symlinks=False), entry.stat)
+                for entry in utils.scandir(dir_path)
+            ]
+        else:
+            entries = [
+                (each_path,
+                 os.path.isdir(each_path) and not os.path.islink(each_path),
+                 None)
+                for each_path in (
+                    os.path.join(dir_path, each) for each in os.listdir(dir_path)
+                )
+            ]
+    except (IOError, OSError) as why:
+        logger.warning(
+            "System Error while listing directory: {}\n{}".format(dir_path, why)
+        )
+        return most_recent, subdirs
+
+    for each_path, is_dir, stat_func in entries:
+        if is_dir:
+            subdirs.append(each_path)
+            continue
+        if skip_files or os.path.basename(each_path) == manifest.MANIFEST_NAME:
+            continue
+        try:
+            each_stat = stat_func() if stat_func is not None else os.stat(each_path)
+            most_recent = max(most_recent, getattr(each_stat, use_stat))
+        except (IOError, OSError):
+            # Removed while listing or broken link
+            continue
+
+    if recent_cache is not None and not skip_files and \
+            time.time() - mtime_ns / 1e9 >= RECENT_CHANGE_SECONDS:
+        recent_cache[cache_key] = (mtime_ns, most_recent, subdirs)
+    return most_recent, subdirs
+
+
+def compare_stats_batch(
+        src_paths, trg_paths,
+        ignore_stats=['st_uid', 'st_gid', 'st_atime',
+                      'st_ctime', 'st_ino', 'st_dev'],
+        workers=8):
+    """Compares stats of many pairs of paths at once. Paths are stat'ed
+    through a thread pool, stat fields are packed in columns and every
+    column is compared in one go, with NumPy if it's installed. Names,
+    contents and directory sizes are not compared, use compare_stats()
+    for a single pair.
+
+    Arguments:
+        ``src_paths`` {list} -- Source paths
+
+        ``trg_paths`` {list} -- Target paths, same length as src_paths
+
+    Keyword Arguments:
+        ``ignore_stats`` {list} -- Ignores this list of stats. See
+        get_sync_status()
+        (default: ['st_uid', 'st_gid', 'st_atime', 'st_ctime', 'st_ino', 'st_dev'])
+
+        ``workers`` {int} -- Number of threads used to stat paths
+        (default: {8})
+
+    Raises:
+        ValueError: src_paths and trg_paths have different lengths.
+
+    Returns:
+        [dict] -- Comparison results:
+
+            -'stats': Compared stat names, in matrix column order\n
+            -'matrix': One row per pair, True where the stat is equal.
+            A NumPy bool array if NumPy is installed, otherwise a list of
+            bytearrays\n
+            -'in_sync': Per pair, True if all compared stats are equal.
+            A NumPy bool array or a bytearray\n
+            -'counts': {'pairs', 'in_sync', 'out_of_sync', 'errors':
+            pairs where a path couldn't be stat'ed, 'mismatches': {stat
+            name: pairs where it differs}}
+    """
+    src_paths = list(src_paths)
+    trg_paths = list(trg_paths)
+    if len(src_paths) != len(trg_paths):
+        raise ValueError(
+            "Got {} source paths and {} target paths.".format(
+                len(src_paths), len(trg_paths))
+        )
+    fields = [each for each in stat_columns if each not in ignore_stats]
+    pairs = list(zip(src_paths, trg_paths))
+    if workers > 1 and len(pairs) > 1:
+        pool = ThreadPool(min(workers, len(pairs)))
+        try:
+            stat_pairs = pool.map(_stat_pair, pairs)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        stat_pairs = [_stat_pair(each) for each in pairs]
+
+    matrix = _compare_stat_batch(stat_pairs, fields, numpy is not None)
+    errors = sum(1 for each in stat_pairs if each is None)
+    if numpy is not None:
+        in_sync = matrix.all(axis=1)
+        if stat_pairs:
+            in_sync &= numpy.array([each is not None for each in stat_pairs])
+        mismatches = len(stat_pairs) - errors - matrix.sum(axis=0)
+        in_sync_count = int(in_sync.sum())
+    else:
+        in_sync = bytearray(
+            stat_pair is not None and all(row)
+            for stat_pair, row in zip(stat_pairs, matrix)
+        )
+        mismatches = [
+            sum(1 for stat_pair, row in zip(stat_pairs, matrix)
+                if stat_pair is not None and not row[column])
+            for column in range(len(fields))
+        ]
+        in_sync_count = sum(in_sync)
+    return {
+        "stats": fields,
+        "matrix": matrix,
+        "in_sync": in_sync,
+        "counts": {
+            "pairs": len(stat_pairs),
+            "in_sync": in_sync_count,
+            "out_of_sync": len(stat_pairs) - in_sync_count,
+            "errors": errors,
+            "mismatches": dict(
+                (field, int(count)) for field, count in zip(fields, mismatches)
+            )
+        }
+    }
+
+
+def _stat_pair(pair):
+    """Stats a (source, target) pair of paths.
+
+    Not meant to be used directly, use compare_stats_batch() instead.
+
+    Returns:
+        [tuple] -- (source os.stat_result, target os.stat_result)
+
+        [None] -- If either path couldn't be stat'ed
+    """
+    try:
+        return (os.stat(pair[0]), os.stat(pair[1]))
+    except (IOError, OSError):
+        return None
+
+
+def _compare_stat_batch(stat_pairs, fields, use_numpy):
+    """Compares given stat fields for every (source, target) stats pair.
+    Pairs that are None compare as all different.
+
+    Not meant to be used directly, use compare_stats_batch() instead.
+
+    Returns:
+        [numpy.ndarray] -- Bool matrix, one row per pair and one column per
+        field, if use_numpy is True
+
+        [list] -- List of bytearray rows, otherwise
+    """
+    if use_numpy:
+        valid = [each for each in stat_pairs if each is not None]
+        matrix = numpy.zeros((len(stat_pairs), len(fields)), dtype=bool)
+        if not valid:
+            return matrix
+        rows = numpy.array([each is not None for each in stat_pairs])
+        for column, field in enumerate(fields):
+            dtype = numpy.float64 if field.endswith("time") else numpy.uint64
+            src_column = numpy.array(
+                [getattr(each[0], field) for each in valid], dtype=dtype
+            )
+            trg_column = numpy.array(
+                [getattr(each[1], field) for each in valid], dtype=dtype
+            )
+            matrix[rows, column] = src_column == trg_column
+        return matrix
+
+    return [_compare_stat_row(each, fields) for each in stat_pairs]
+
+
+def _compare_stat_row(stat_pair, fields):
+    """Compares given stat fields for one (source, target) stats pair.
+
+    Not meant to be used directly, use compare_stats_batch() instead.
+
+    Returns:
+        [bytearray] -- 1 where the field is equal, all 0 if stat_pair is None
+    """
+    if stat_pair is None:
+        return bytearray(len(fields))
+    src_stat, trg_stat = stat_pair
+    return bytearray(
+        getattr(src_stat, field) == getattr(trg_stat, field) for field in fields
+    )
+
+
+def _compare_stat_results(src_stat, trg_stat, ignore_stats):
+    """Compares two os.stat() results, field by field, through the same
+    _compare_stat_row() compare_stats_batch() uses.
+
+    Not meant to be used directly, use compare_stats() instead.
+
+    Returns:
+        [dict] -- {Stat description: Comparison result bool}
+    """
+    fields = [key for key in stat_columns if key not in ignore_stats]
+    row = _compare_stat_row((src_stat, trg_stat), fields)
+    return dict(
+        (stats_dict[field], bool(equal)) for field, equal in zip(fields, row)
+    )
+
+
+def _compare_content(
+        src_path, trg_path, src_stat, trg_stat, compare_content,
+        hash_cache=None, escalate_content=False):
+    """Compares the content of two files. Files of different size are
+    different without reading them.
+
+    Not meant to be used directly, use compare_stats() instead.
+
+    Returns:
+        [bool] -- True if contents are equal
+    """
+    if src_stat.st_size != trg_stat.st_size:
+        return False
+    if compare_content == "quick":
+        src_hash = hashing.get_sample_hash(src_path, cache=hash_cache)
+        trg_hash = hashing.get_sample_hash(trg_path, cache=hash_cache)
+        if src_hash != trg_hash or not escalate_content:
+            return src_hash == trg_hash
+    src_hash = hashing.get_file_hash(src_path, cache=hash_cache)
+    trg_hash = hashing.get_file_hash(trg_path, cache=hash_cache)
+    return src_hash == trg_hash
+
+
+def _validate_content_mode(compare_content):
+    """Raises ValueError if compare_content is not a valid mode.
+
+    Not meant to be used directly, use compare_stats() instead.
+    """
+    if compare_content and compare_content not in content_modes:
+        raise ValueError(
+            "compare_content={} is invalid. Valid options: {}".format(
+                compare_content, ", ".join(content_modes))
+        )
+
+
+def get_dir_size(dir_path, snapshot=None, workers=8, size_cache=None):
+    """Walks thru given directory to calculate total size. Directories are
+    listed with ``os.scandir()``, reusing the stats it caches, and each level
+    of subdirectories is listed concurrently through a thread pool.
 
     Arguments:
         ``dir_path`` {str} -- Directory to measure size.
 
+    Keyword Arguments:
+        ``snapshot`` {snapshot.StatSnapshot} -- If given, sizes come from it,
+        only stat'ing files again in directories that changed since the
+        last time (default: {None})
+
+        ``workers`` {int} -- Number of threads listing directories
+        (default: {8})
+
+        ``size_cache`` {dict} -- If given, the size of the files right in
+        every directory is kept in it, keyed by directory path and mtime.
+        Next calls with the same dict only stat each directory, and only list
+        the ones whose mtime changed. Same as snapshot.StatSnapshot, files
+        modified in place without touching their directory are not noticed.
+        (default: {None})
+
     Returns:
         [int] -- Size of directory in bytes, as reported by the sum
         of all its files os.stat()
 
         [None] -- If dir_path is not a directory, returns None
     """
-    if os.path.isdir(dir_path):
-        total_size = 0
-        for dirpath, dirnames, filenames in os.walk(dir_path):
-            for f in filenames:
-                fp = os.path.join(dirpath, f)
-                total_size += os.path.getsize(fp)
-        return total_size
-    return None
+    if not os.path.isdir(dir_path):
+        return None
+    if snapshot is not None:
+        return sum(
+            each_stat.st_size for rel_path, each_stat in snapshot.walk(dir_path)
+            if os.path.basename(rel_path) != manifest.MANIFEST_NAME
+        )
+
+    def size_dir(each_dir):
+        if size_cache is None:
+            return _scan_dir_size(each_dir)
+        return _get_cached_dir_size(each_dir, size_cache)
+
+    total_size = 0
+    for level in _iter_dir_levels(dir_path, size_dir, workers):
+        total_size += sum(files_size for files_size, _ in level)
+    return total_size
+
+
+def _iter_dir_levels(dir_path, scan_dir, workers):
+    """Walks a tree one level of directories at a time, scanning every
+    directory of a level concurrently through a thread pool. The pool is
+    only created once a level has more than one directory.
+
+    Not meant to be used directly, use get_dir_size() instead.
+
+    Arguments:
+        ``dir_path`` {str} -- Root directory
+
+        ``scan_dir`` {function} -- Called with a directory path, returns a
+        tuple whose last item is the list of its subdirectory paths
+
+        ``workers`` {int} -- Number of threads
+
+    Yields:
+        [list] -- scan_dir() results for all directories of a level
+    """
+    pending = [dir_path]
+    pool = None
+    try:
+        while pending:
+            if workers <= 1 or len(pending) == 1:
+                level = [scan_dir(each) for each in pending]
+            else:
+                if pool is None:
+                    pool = ThreadPool(workers)
+                level = pool.map(scan_dir, pending)
+            yield level
+            pending = [each for result in level for each in result[-1]]
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def _get_cached_dir_size(dir_path, size_cache):
+    """Same as _scan_dir_size(), answered from size_cache if the directory
+    mtime didn't change since it was stored.
+
+    Not meant to be used directly, use get_dir_size() instead.
+    """
+    try:
+        mtime_ns = utils.get_mtime_ns(os.stat(dir_path))
+    except (IOError, OSError):
+        size_cache.pop(dir_path, None)
+        return 0, list()
+    cached = size_cache.get(dir_path)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1], cached[2]
+    files_size, subdirs = _scan_dir_size(dir_path)
+    if time.time() - mtime_ns / 1e9 >= RECENT_CHANGE_SECONDS:
+        size_cache[dir_path] = (mtime_ns, files_size, subdirs)
+    return files_size, subdirs
+
+
+def _scan_dir_size(dir_path):
+    """Lists a directory, not recursively, adding up the size of its files.
+    Symbolic links to directories are not followed, same as os.walk().
+
+    Not meant to be used directly, use get_dir_size() instead.
+
+    Returns:
+        [tuple] -- (Size in bytes, list of subdirectory paths)
+    """
+    files_size = 0
+    subdirs = list()
+    try:
+        if utils.scandir is not None:
+            for entry in utils.scandir(dir_path):
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file() and \
+                            entry.name != manifest.MANIFEST_NAME:
+                        files_size += entry.stat().st_size
+                except (IOError, OSError):
+                    # Removed while listing or broken link
+                    continue
+            return files_size, subdirs
+        names = os.listdir(dir_path)
+    except (IOError, OSError) as why:
+        logger.warning(
+            "System Error while listing directory: {}\n{}".format(dir_path, why)
+        )
+        return files_size, subdirs
+
+    for each in names:
+        each_path = os.path.join(dir_path, each)
+        if os.path.isdir(each_path) and not os.path.islink(each_path):
+            subdirs.append(each_path)
+        elif os.path.isfile(each_path) and each != manifest.MANIFEST_NAME:
+            try:
+                files_size += os.path.getsize(each_path)
+            except (IOError, OSError):
+                continue
+    return files_size, subdirs
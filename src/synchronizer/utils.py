@@ -13,11 +13,135 @@
 from __future__ import absolute_import, print_function
 
 import os
+import bisect
+from array import array
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
 
 from synchronizer.logger import logger
 
 
-def get_sequence_files(file_path):
+def scan_sequences(dir_path):
+    """Lists ``dir_path`` once and groups all its files by sequence name
+    pattern and extension, so finding sequences, their files and missing
+    frames doesn't require listing the directory again for every file.
+    This assumes the sequence digits are right beside the file extension.
+
+        e.g.:
+            - C_myfile_v568.jpg
+            - MJ_thisisafileseq_4568.dpx
+            - MB_udimsforthewin.1008.tx
+
+    Pass the result to is_sequence(), get_sequence_files() or
+    get_missing_frames() to answer each query without touching the disk.
+
+    Arguments:
+        ``dir_path`` {str} -- Path to a directory
+
+    Returns:
+        [dict] -- {sequence key: sorted list of file paths}. Keys are
+        returned by get_sequence_key(). Files without a name pattern
+        are left out.
+    """
+    sequences = dict()
+    for each, each_path in iter_dir_files(dir_path):
+        key = get_sequence_key(each)
+        if key is None:
+            continue
+        sequences.setdefault(key, list()).append(each_path)
+    for each in sequences.values():
+        each.sort()
+    return sequences
+
+
+def iter_dir_files(dir_path):
+    """Yields every file in ``dir_path``, not recursively. Uses ``os.scandir()``
+    when available, so file types come from the directory listing itself
+    instead of one ``os.stat()`` per entry, which matters on network storage.
+    Only symbolic links are resolved one by one.
+
+    Arguments:
+        ``dir_path`` {str} -- Path to a directory
+
+    Yields:
+        [tuple] -- (file name, real normcased path to the file)
+    """
+    dir_path_real = os.path.realpath(os.path.normcase(dir_path))
+    if scandir is None:
+        for each in os.listdir(dir_path):
+            each_path = os.path.realpath(
+                os.path.normcase(os.path.join(dir_path, each))
+            )
+            if os.path.isfile(each_path):
+                yield each, each_path
+        return
+
+    for entry in scandir(dir_path):
+        if entry.is_symlink():
+            each_path = os.path.realpath(os.path.normcase(entry.path))
+            if os.path.isfile(each_path):
+                yield entry.name, each_path
+        elif entry.is_file():
+            yield entry.name, os.path.join(
+                dir_path_real, os.path.normcase(entry.name)
+            )
+
+
+def walk_files(dir_path):
+    """Recursively yields every file under ``dir_path``, as paths relative
+    to it. Uses ``os.scandir()`` when available. Symbolic links to
+    directories are not followed.
+
+    Arguments:
+        ``dir_path`` {str} -- Path to a directory
+
+    Yields:
+        [str] -- File path relative to dir_path
+    """
+    if scandir is None:
+        for dirpath, dirnames, filenames in os.walk(dir_path):
+            rel_dir = os.path.relpath(dirpath, dir_path)
+            for each in filenames:
+                yield os.path.normpath(os.path.join(rel_dir, each))
+        return
+
+    pending = [""]
+    while pending:
+        rel_dir = pending.pop()
+        for entry in scandir(os.path.join(dir_path, rel_dir)):
+            rel_path = os.path.join(rel_dir, entry.name)
+            if entry.is_dir(follow_symlinks=False):
+                pending.append(rel_path)
+            elif entry.is_file():
+                yield rel_path
+
+
+def get_sequence_key(file_path):
+    """Builds the key used by scan_sequences() to group files of the
+    same sequence. Keys are case insensitive.
+
+    Arguments:
+        ``file_path`` {str} -- Path or name of a file
+
+    Returns:
+        [tuple] -- (lowercase name pattern, lowercase extension)
+
+        [None] -- If no digits can be found in the name, returns None
+    """
+    name_parts = _split_sequence_name(os.path.split(file_path)[1])
+    if name_parts is None:
+        return None
+    name_pattern, file_ext = name_parts[0], name_parts[2]
+    return (name_pattern.lower(), file_ext.lower())
+
+
+def get_sequence_files(file_path, sequences=None):
     """Find and return all files that are part of a sequence matching ``file_path``.
     If no sequence found, returns None. Two files are enough to make
     a sequence, even if they're not sequential. This assumes the sequence
@@ -31,29 +155,20 @@ def get_sequence_files(file_path):
     Arguments:
         ``file_path`` {string} -- Path to a file
 
+    Keyword Arguments:
+        ``sequences`` {dict} -- Result of scan_sequences() for file_path
+        parent folder. If not given, the parent folder is scanned.
+        (default: {None})
+
     Returns:
         [list] -- List of sequence files including given file_path.
         None if sequence is not found.
     """
-    path_parts = os.path.split(file_path)
-    parent_folder = path_parts[0]
-    file_with_ext = path_parts[1]
-    file_name, file_ext = file_with_ext.rsplit(".", 1)
-
-    if is_sequence(file_path):
+    if sequences is None:
+        sequences = _scan_parent_folder(file_path)
+    if is_sequence(file_path, sequences):
         name_pattern = get_sequence_name_pattern(file_path)
-        files_and_dirs = os.listdir(parent_folder)
-        sequence_files = list()
-        for each in files_and_dirs:
-            each_path = os.path.realpath(
-                os.path.normcase(os.path.join(parent_folder, each))
-            )
-            if os.path.isfile(each_path):
-                each_file_name, each_file_ext = each.rsplit(".", 1)
-                if each[:len(name_pattern)].lower() == name_pattern.lower()\
-                        and each_file_ext.lower() == file_ext.lower():
-                    sequence_files.append(each_path)
-        sequence_files = sorted(sequence_files)
+        sequence_files = list(sequences[get_sequence_key(file_path)])
         if not is_sequence_complete(sequence_files, name_pattern):
             logger.warning(
                 "Missing frames on sequence for "
@@ -63,7 +178,7 @@ def get_sequence_files(file_path):
     return None
 
 
-def is_sequence(file_path):
+def is_sequence(file_path, sequences=None):
     """Looks for sibling files in the same directory. Since two sibling
     files is enough to make a sequence, even if they are not sequential, if it
     finds one, it'll stop looking and return True. This assumes the sequence
@@ -79,38 +194,322 @@ def is_sequence(file_path):
     Arguments:
         ``file_path`` {str} -- Full path to a file
 
+    Keyword Arguments:
+        ``sequences`` {dict} -- Result of scan_sequences() for file_path
+        parent folder. If not given, the parent folder is scanned.
+        (default: {None})
+
     Returns:
         [bool] -- If another a file is found with the same name pattern,
         True is returned. Missing files are taken into account.
     """
+    key = get_sequence_key(file_path)
+    if key is None:
+        return False
+    if sequences is None:
+        sequences = _scan_parent_folder(file_path)
+
     file_path_norm = os.path.realpath(os.path.normcase(file_path))
-    parent_folder, file_with_ext = os.path.split(file_path)
-    file_name, file_ext = file_with_ext.rsplit(".", 1)
+    sequence_files = sequences.get(key, list())
+    result = len(sequence_files) > 1 or \
+        (len(sequence_files) == 1 and sequence_files[0] != file_path_norm)
+    if result:
+        logger.debug(
+            "File belongs to a sequence: {}".format(file_path)
+        )
+    return result
 
-    name_pattern = get_sequence_name_pattern(file_path)
-    if not name_pattern:
-        return False
 
-    files_and_dirs = os.listdir(parent_folder)
-    result = False
-    for each in files_and_dirs:
-        each_path = os.path.join(parent_folder, each)
-        each_path_norm = os.path.realpath(
-                os.path.normcase(each_path)
-            )
-        if os.path.isfile(each_path):
-            each_file_name, each_file_ext = each.rsplit(".", 1)
-            if file_path_norm == each_path_norm:
+def get_missing_frames(file_path, sequences=None):
+    """Finds frame numbers missing between the first and last files of the
+    sequence matching ``file_path``.
+
+    Arguments:
+        ``file_path`` {str} -- Full path to a file
+
+    Keyword Arguments:
+        ``sequences`` {dict} -- Result of scan_sequences() for file_path
+        parent folder. If not given, the parent folder is scanned.
+        (default: {None})
+
+    Returns:
+        [list] -- Sorted list of missing frame numbers. Empty if the
+        sequence is complete.
+
+        [None] -- If file_path is not part of a sequence.
+    """
+    if not is_sequence(file_path, sequences):
+        return None
+    frame_set = get_frame_set(file_path, sequences)
+    return list(frame_set.missing().frames)
+
+
+def get_frame_set(file_path, sequences=None):
+    """Builds a FrameSet for the sequence matching ``file_path``. A single
+    file with a name pattern makes a FrameSet of one frame.
+
+    Arguments:
+        ``file_path`` {str} -- Full path to a file
+
+    Keyword Arguments:
+        ``sequences`` {dict} -- Result of scan_sequences() for file_path
+        parent folder. If not given, the parent folder is scanned.
+        (default: {None})
+
+    Returns:
+        [FrameSet] -- Frames found for file_path name pattern and extension.
+
+        [None] -- If file_path has no name pattern or no files match it.
+    """
+    key = get_sequence_key(file_path)
+    if key is None:
+        return None
+    if sequences is None:
+        sequences = _scan_parent_folder(file_path)
+    sequence_files = sequences.get(key)
+    if not sequence_files:
+        return None
+    return FrameSet.from_files(sequence_files)
+
+
+def get_frame_number(file_path, name_pattern):
+    """Extracts the frame number from a sequence file name.
+
+    Arguments:
+        ``file_path`` {str} -- Path or name of a file
+
+        ``name_pattern`` {str} -- As returned by get_sequence_name_pattern()
+
+    Returns:
+        [int] -- Frame number
+    """
+    file_name = os.path.split(file_path)[1].rsplit(".", 1)[0]
+    return int(file_name[len(name_pattern):])
+
+
+class FrameSet(object):
+    """Compact representation of a file sequence. Instead of one path string
+    per file, it keeps the folder, name pattern, frame padding and extension
+    once, plus a sorted array of frame numbers. Paths are built on demand.
+
+        e.g.:
+            - FrameSet('/renders', 'C_cresta_02__MSH-BUMP.', 'png',
+              [1001, 1002, 1003], padding=4)
+
+    Iterating a FrameSet yields file paths lazily, ``in`` checks frame
+    numbers and ``|``, ``&`` and ``-`` combine frames of two FrameSets,
+    e.g. source and target copies of the same sequence. Results keep the
+    folder and naming of the left operand.
+
+    Arguments:
+        ``dir_path`` {str} -- Folder where sequence files live
+
+        ``name_pattern`` {str} -- As returned by get_sequence_name_pattern()
+
+        ``ext`` {str} -- File extension, without dot
+
+        ``frames`` {iterable} -- Frame numbers
+
+    Keyword Arguments:
+        ``padding`` {int} -- Minimum number of digits in file names. Frames
+        are zero padded up to it. (default: {0})
+    """
+    def __init__(self, dir_path, name_pattern, ext, frames, padding=0):
+        self.dir_path = dir_path
+        self.name_pattern = name_pattern
+        self.ext = ext
+        self.padding = padding
+        self.frames = array('l', sorted(set(frames)))
+
+    @classmethod
+    def from_files(cls, files):
+        """Builds a FrameSet from a list of files of the same sequence, as
+        returned by get_sequence_files(). Folder, name pattern and extension
+        are taken from the first file.
+
+        Arguments:
+            ``files`` {list} -- List of paths to sequence files
+
+        Returns:
+            [FrameSet] -- FrameSet with all files frames
+        """
+        dir_path, file_with_ext = os.path.split(files[0])
+        name_pattern, digits, ext = _split_sequence_name(file_with_ext)
+        frames = list()
+        padding = len(digits)
+        for each in files:
+            digits = _split_sequence_name(os.path.split(each)[1])[1]
+            if not digits.isdigit():
                 continue
-            elif each[:len(name_pattern)].lower() == name_pattern.lower()\
-                    and each_file_ext.lower() == file_ext.lower():
-                result = True
-                logger.debug(
-                    "File belongs to a sequence: {}".format(file_path)
-                )
-                break
+            frames.append(int(digits))
+            padding = min(padding, len(digits))
+        return cls(dir_path, name_pattern, ext, frames, padding)
 
-    return result
+    @classmethod
+    def from_ranges(cls, dir_path, name_pattern, ext, ranges, padding=0):
+        """Builds a FrameSet from a compressed ranges string, as returned
+        by to_ranges().
+
+            e.g.:
+                - '1001-1100,1102-1200'
+
+        Arguments:
+            ``dir_path`` {str} -- Folder where sequence files live
+
+            ``name_pattern`` {str} -- Name pattern
+
+            ``ext`` {str} -- File extension, without dot
+
+            ``ranges`` {str} -- Comma separated frames or first-last ranges
+
+        Keyword Arguments:
+            ``padding`` {int} -- Minimum number of digits (default: {0})
+
+        Returns:
+            [FrameSet] -- FrameSet with all frames in ranges
+        """
+        frames = list()
+        for each in ranges.split(","):
+            each = each.strip()
+            if not each:
+                continue
+            first, _, last = each.partition("-")
+            frames.extend(range(int(first), int(last or first) + 1))
+        return cls(dir_path, name_pattern, ext, frames, padding)
+
+    @property
+    def first(self):
+        """First frame number, None if empty."""
+        return self.frames[0] if self.frames else None
+
+    @property
+    def last(self):
+        """Last frame number, None if empty."""
+        return self.frames[-1] if self.frames else None
+
+    def get_frame_path(self, frame):
+        """Builds the path of given frame number.
+
+        Arguments:
+            ``frame`` {int} -- Frame number
+
+        Returns:
+            [str] -- Full path to the frame file
+        """
+        file_name = "{}{}.{}".format(
+            self.name_pattern, str(frame).zfill(self.padding), self.ext
+        )
+        return os.path.join(self.dir_path, file_name)
+
+    def missing(self):
+        """Finds frames missing between first and last frames.
+
+        Returns:
+            [FrameSet] -- FrameSet with the same naming, holding only
+            missing frames.
+        """
+        missing_frames = list()
+        for previous, current in zip(self.frames, self.frames[1:]):
+            if current - previous > 1:
+                missing_frames.extend(range(previous + 1, current))
+        return self._copy_with(missing_frames)
+
+    def is_complete(self):
+        """Returns True if no frames are missing between first and last."""
+        if not self.frames:
+            return True
+        return self.last - self.first + 1 == len(self.frames)
+
+    def to_ranges(self):
+        """Compresses frame numbers into ranges.
+
+            e.g.:
+                - '1001-1100,1102-1200'
+
+        Returns:
+            [str] -- Comma separated frames or first-last ranges
+        """
+        ranges = list()
+        start = previous = None
+        for each in self.frames:
+            if start is None:
+                start = previous = each
+            elif each == previous + 1:
+                previous = each
+            else:
+                ranges.append((start, previous))
+                start = previous = each
+        if start is not None:
+            ranges.append((start, previous))
+        return ",".join(
+            str(first) if first == last else "{}-{}".format(first, last)
+            for first, last in ranges
+        )
+
+    def union(self, other):
+        """Frames found in this FrameSet or in other."""
+        return self._copy_with(set(self.frames) | set(other.frames))
+
+    def intersection(self, other):
+        """Frames found both in this FrameSet and other."""
+        return self._copy_with(set(self.frames) & set(other.frames))
+
+    def difference(self, other):
+        """Frames found in this FrameSet but not in other."""
+        return self._copy_with(set(self.frames) - set(other.frames))
+
+    def paths(self):
+        """Yields full paths of all frames, lazily."""
+        for each in self.frames:
+            yield self.get_frame_path(each)
+
+    def _copy_with(self, frames):
+        """New FrameSet with the same naming and given frames."""
+        return FrameSet(
+            self.dir_path, self.name_pattern, self.ext, frames, self.padding
+        )
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+    __iter__ = paths
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __contains__(self, frame):
+        index = bisect.bisect_left(self.frames, frame)
+        return index < len(self.frames) and self.frames[index] == frame
+
+    def __eq__(self, other):
+        if not isinstance(other, FrameSet):
+            return NotImplemented
+        return self.name_pattern.lower() == other.name_pattern.lower() and \
+            self.ext.lower() == other.ext.lower() and \
+            self.frames == other.frames
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "FrameSet({!r}, {!r}, {!r}, '{}', padding={})".format(
+            self.dir_path, self.name_pattern, self.ext,
+            self.to_ranges(), self.padding
+        )
+
+
+def _scan_parent_folder(file_path):
+    """Runs scan_sequences() on the folder that contains file_path.
+
+    Not meant to be used directly, use scan_sequences() instead.
+    """
+    parent_folder = os.path.split(file_path)[0]
+    return scan_sequences(parent_folder or os.curdir)
 
 
 def is_sequence_complete(files, name_pattern):
@@ -139,15 +538,8 @@ def is_sequence_complete(files, name_pattern):
         [bool] -- True if sequence is complete. False otherwise.
     """
     files = sorted(files)
-    first_file = files[0]
-    last_file = files[-1]
-    split_first_file = os.path.split(first_file)[1]
-    first_file_name = split_first_file.rsplit(".", 1)[0]
-    first_file_number = int(first_file_name[len(name_pattern):])
-
-    split_last_file = os.path.split(last_file)[1]
-    last_file_name = split_last_file.rsplit(".", 1)[0]
-    last_file_number = int(last_file_name[len(name_pattern):])
+    first_file_number = get_frame_number(files[0], name_pattern)
+    last_file_number = get_frame_number(files[-1], name_pattern)
 
     difference = last_file_number - first_file_number + 1
 
@@ -184,8 +576,28 @@ def get_sequence_name_pattern(file_path):
 
         [None] -- If no digits can be found in the name, returns None
     """
-    path_parts = os.path.split(file_path)
-    file_with_ext = path_parts[1]
+    name_parts = _split_sequence_name(os.path.split(file_path)[1])
+    if name_parts is None:
+        logger.debug(
+            "Sequence name pattern not found for {}".format(file_path)
+        )
+        return None
+
+    return name_parts[0]
+
+
+def _split_sequence_name(file_with_ext):
+    """Splits a file name into name pattern, frame digits and extension.
+
+    Not meant to be used directly, use get_sequence_name_pattern() instead.
+
+    Returns:
+        [tuple] -- (name pattern, digits, extension)
+
+        [None] -- If the name has no extension or no digits beside it
+    """
+    if "." not in file_with_ext:
+        return None
     file_name, file_ext = file_with_ext.rsplit(".", 1)
     # Get number of digits in file_name
     digits_number = 0
@@ -196,14 +608,127 @@ def get_sequence_name_pattern(file_path):
             break
 
     if digits_number == 0:
-        logger.debug(
-            "Sequence name pattern not found for {}".format(file_path)
-        )
         return None
 
-    name_pattern = file_name[:-digits_number]
+    return (file_name[:-digits_number], file_name[-digits_number:], file_ext)
+
+
+def get_tx_path(original_file_path):
+    """Builds the path of the tx file that sits next to given original
+    texture file.
+
+    Arguments:
+        ``original_file_path`` {str} -- Path to a file
+
+    Returns:
+        [str] -- Path to the tx file, whether it exists or not.
+    """
+    return original_file_path.rsplit(".", 1)[0] + ".tx"
+
+
+def get_tx_files(file_paths, sequences=None):
+    """Finds which of given original files have a tx file next to them,
+    without checking every tx path on its own. Files of a sequence found in
+    ``sequences`` are matched against the frames of its tx files, without
+    touching the disk. Any other file folder is listed once. Extensions are
+    matched case insensitive, same as sequence keys, and present tx files
+    are returned with their names as listed, e.g. '.TX'.
+
+    Arguments:
+        ``file_paths`` {list} -- Paths to original files
+
+    Keyword Arguments:
+        ``sequences`` {dict} -- Result of scan_sequences() for the folder
+        of given files (default: {None})
+
+    Returns:
+        [dict] -- {'present': list of existing tx paths, as listed,
+        'missing': list of tx paths not found, as built by get_tx_path()}
+    """
+    present = list()
+    missing = list()
+    sequence_files = dict()
+    listings = dict()
+    for each in file_paths:
+        key = get_sequence_key(each)
+        if sequences is not None and key in sequences:
+            sequence_files.setdefault(key, list()).append(each)
+            continue
+        dir_path, file_name = os.path.split(get_tx_path(each))
+        if dir_path not in listings:
+            listings[dir_path] = _list_file_names(dir_path or os.curdir)
+        listed_name = listings[dir_path].get(file_name.lower())
+        if listed_name is not None:
+            present.append(os.path.join(dir_path, listed_name))
+        else:
+            missing.append(get_tx_path(each))
+
+    for key, files in sequence_files.items():
+        originals = FrameSet.from_files(files)
+        wanted = FrameSet(
+            originals.dir_path, originals.name_pattern, "tx",
+            originals.frames, originals.padding
+        )
+        found = _get_frame_files(sequences.get((key[0], "tx")))
+        present.extend(
+            found[frame] for frame in originals.frames if frame in found
+        )
+        missing.extend(
+            wanted.get_frame_path(frame) for frame in originals.frames
+            if frame not in found
+        )
+    return {"present": present, "missing": missing}
+
 
-    return name_pattern
+def _get_frame_files(files):
+    """Maps frame numbers to file paths, for files of one sequence.
+
+    Not meant to be used directly, use get_tx_files() instead.
+    """
+    if not files:
+        return dict()
+    name_pattern = FrameSet.from_files(files).name_pattern
+    frame_files = dict()
+    for each in files:
+        try:
+            frame_files[get_frame_number(each, name_pattern)] = each
+        except ValueError:
+            # Placeholder digits, e.g. '####'
+            continue
+    return frame_files
+
+
+def _list_file_names(dir_path):
+    """Names of every file in dir_path, keyed by lowercase name. Empty if
+    it can't be listed.
+
+    Not meant to be used directly, use get_tx_files() instead.
+    """
+    try:
+        return dict(
+            (each.lower(), each) for each, _ in iter_dir_files(dir_path)
+        )
+    except (IOError, OSError) as why:
+        logger.warning(
+            "System Error while listing directory: {}\n{}".format(dir_path, why)
+        )
+        return dict()
+
+
+def get_mtime_ns(stat_result):
+    """Last modification time in nanoseconds, for both os.stat() results
+    and platforms that don't report ``st_mtime_ns``.
+
+    Arguments:
+        ``stat_result`` {os.stat_result} -- As returned by os.stat()
+
+    Returns:
+        [int] -- Last modification time in nanoseconds
+    """
+    mtime_ns = getattr(stat_result, "st_mtime_ns", None)
+    if mtime_ns is None:
+        mtime_ns = int(stat_result.st_mtime * 1000000000)
+    return mtime_ns
 
 
 def create_dir(dirpath):
@@ -235,3 +760,21 @@ def create_dir(dirpath):
                 dirpath)
         )
         return True
+
+
+def make_dirs(dir_path):
+    """Creates given directory and its parents. Unlike create_dir(), errors
+    are raised, and other threads or processes creating the same folders at
+    the same time are not an error.
+
+    Arguments:
+        ``dir_path`` {str} -- Full path to a directory
+
+    Raises:
+        OSError: Directory couldn't be created.
+    """
+    try:
+        os.makedirs(dir_path)
+    except OSError:
+        if not os.path.isdir(dir_path):
+            raise
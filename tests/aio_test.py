@@ -0,0 +1,118 @@
+# coding=utf-8
+from __future__ import absolute_import, print_function
+
+from synchronizer import logger
+
+import os
+import time
+import threading
+import six
+import pytest
+
+if six.PY2:
+    pytest.skip("asyncio API requires Python 3", allow_module_level=True)
+
+import asyncio  # noqa: E402
+from concurrent.futures import ThreadPoolExecutor  # noqa: E402
+from synchronizer import aio  # noqa: E402
+
+# Empty directory to use for testing
+try:
+    trg_empty_dir = os.path.join(
+            os.path.split(__file__)[0], "data", "trg_path"
+        )
+    if not os.path.exists(trg_empty_dir):
+        os.mkdir(trg_empty_dir)
+except (IOError, OSError) as why:
+    raise why
+
+# Debug logging
+logger.init_logger()
+# logger.init_file_logger()
+
+
+# --------------------------------------------------------
+#  TESTING DATA
+# --------------------------------------------------------
+path_root = os.path.join(
+                os.path.normcase(
+                    os.path.abspath(os.path.split(__file__)[0])
+                ),
+                "data"
+            )
+trg_path_dir = os.path.join(path_root, "trg_path")
+path_sequence_tx = os.path.join(
+        path_root, "sequence_with_tx", "src_path",
+        "C_cresta_02__MSH-BUMP.1001.png"
+    )
+# Fixtures
+trg_dir = pytest.mark.datafiles(trg_path_dir)
+
+
+class Test_Aio:
+    @trg_dir
+    def test_aprocess_paths(self, datafiles):
+        trg_path = str(datafiles)
+        loop = asyncio.new_event_loop()
+        try:
+            copied = loop.run_until_complete(aio.aprocess_paths(
+                path_sequence_tx, trg_path, include_tx=True
+            ))
+            status = loop.run_until_complete(aio.aget_sync_status(
+                path_sequence_tx,
+                os.path.join(trg_path, os.path.split(path_sequence_tx)[1])
+            ))
+        finally:
+            loop.close()
+        assert copied is True
+        assert len(os.listdir(trg_path)) == 10
+        assert status[0] == 1
+
+    def test_limiter(self):
+        running = list()
+        peak = list()
+        lock = threading.Lock()
+
+        def job():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.pop()
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            limiter = asyncio.Semaphore(2)
+            loop.run_until_complete(asyncio.gather(
+                *[aio.run_blocking(job, limiter=limiter) for _ in range(8)]
+            ))
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+        assert len(peak) == 8
+        assert max(peak) == 2
+
+    @trg_dir
+    def test_cancel_before_start(self, datafiles):
+        trg_path = str(datafiles)
+        executor = ThreadPoolExecutor(1)
+        gate = threading.Event()
+        loop = asyncio.new_event_loop()
+        try:
+            # The only executor thread is busy, so the copy stays queued
+            blocker = loop.run_in_executor(executor, gate.wait)
+            task = loop.create_task(aio.aprocess_paths(
+                path_sequence_tx, trg_path, executor=executor
+            ))
+            loop.run_until_complete(asyncio.sleep(0.05))
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                loop.run_until_complete(task)
+            gate.set()
+            loop.run_until_complete(blocker)
+        finally:
+            loop.close()
+            executor.shutdown()
+        assert os.listdir(trg_path) == []
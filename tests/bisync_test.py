@@ -0,0 +1,161 @@
+# coding=utf-8
+from __future__ import absolute_import, print_function
+
+from synchronizer import bisync, syncstatus, logger
+from synchronizer.snapshot import StatSnapshot
+
+import os
+import shutil
+import pytest
+
+# Empty directory to use for testing
+try:
+    trg_empty_dir = os.path.join(
+            os.path.split(__file__)[0], "data", "trg_path"
+        )
+    if not os.path.exists(trg_empty_dir):
+        os.mkdir(trg_empty_dir)
+except (IOError, OSError) as why:
+    raise why
+
+# Debug logging
+logger.init_logger()
+# logger.init_file_logger()
+
+
+# --------------------------------------------------------
+#  TESTING DATA
+# --------------------------------------------------------
+path_root = os.path.join(
+                os.path.normcase(
+                    os.path.abspath(os.path.split(__file__)[0])
+                ),
+                "data"
+            )
+trg_path_dir = os.path.join(path_root, "trg_path")
+path_dir = os.path.join(path_root, "directory", "src_path")
+# Fixtures
+trg_dir = pytest.mark.datafiles(trg_path_dir)
+
+
+def write_file(file_path, data, mtime):
+    parent = os.path.dirname(file_path)
+    if not os.path.isdir(parent):
+        os.makedirs(parent)
+    with open(file_path, "w") as fp:
+        fp.write(data)
+    os.utime(file_path, (mtime, mtime))
+
+
+def get_actions(plan):
+    return dict((item.rel_path, item.action) for item in plan)
+
+
+class Test_BiSync:
+    @trg_dir
+    def test_first_sync(self, datafiles):
+        left = os.path.join(str(datafiles), "left")
+        right = os.path.join(str(datafiles), "right")
+        shutil.copytree(path_dir, left)
+        write_file(os.path.join(right, "sub", "new.txt"), "new", 1500000000)
+        write_file(os.path.join(left, "both.txt"), "old", 1000000000)
+        write_file(os.path.join(right, "both.txt"), "newer", 1600000000)
+        plan = bisync.plan_sync(left, right)
+        assert get_actions(plan) == {
+            "C_cresta_02__MSH-BUMP.1001.png": bisync.LEFT_TO_RIGHT,
+            "C_cresta_02__MSH-BUMP.1001.tx": bisync.LEFT_TO_RIGHT,
+            os.path.join("sub", "new.txt"): bisync.RIGHT_TO_LEFT,
+            "both.txt": bisync.RIGHT_TO_LEFT,
+        }
+        results = dict()
+        assert bisync.execute_plan(left, right, plan, workers=4, results=results)
+        assert all(each["success"] for each in results.values())
+        statuses = set(status for _, status in syncstatus.diff_trees(left, right))
+        assert statuses == set([syncstatus.DIFF_SAME])
+        assert all(each.action == bisync.SKIP for each in bisync.plan_sync(left, right))
+
+    @trg_dir
+    def test_deletions_and_changes(self, datafiles):
+        left = os.path.join(str(datafiles), "left")
+        right = os.path.join(str(datafiles), "right")
+        for name in ("deleted_left", "deleted_right", "changed_left",
+                     "changed_right", "changed_both", "deleted_changed"):
+            write_file(os.path.join(left, name), name, 1000000000)
+        state = bisync.SyncState(":memory:")
+        bisync.sync(left, right, state)
+
+        os.remove(os.path.join(left, "deleted_left"))
+        os.remove(os.path.join(right, "deleted_right"))
+        write_file(os.path.join(left, "changed_left"), "changed", 1100000000)
+        write_file(os.path.join(right, "changed_right"), "changed", 1100000000)
+        write_file(os.path.join(left, "changed_both"), "left", 1200000000)
+        write_file(os.path.join(right, "changed_both"), "right", 1300000000)
+        os.remove(os.path.join(left, "deleted_changed"))
+        write_file(os.path.join(right, "deleted_changed"), "changed", 1100000000)
+
+        plan = bisync.plan_sync(left, right, state)
+        assert get_actions(plan) == {
+            "deleted_left": bisync.DELETE_RIGHT,
+            "deleted_right": bisync.DELETE_LEFT,
+            "changed_left": bisync.LEFT_TO_RIGHT,
+            "changed_right": bisync.RIGHT_TO_LEFT,
+            "changed_both": bisync.RIGHT_TO_LEFT,
+            "deleted_changed": bisync.CONFLICT,
+        }
+        plan = bisync.plan_sync(left, right, state, newest_wins=False)
+        assert get_actions(plan)["changed_both"] == bisync.CONFLICT
+
+        bisync.execute_plan(left, right, plan, state)
+        assert not os.path.exists(os.path.join(right, "deleted_left"))
+        assert not os.path.exists(os.path.join(left, "deleted_right"))
+        with open(os.path.join(left, "changed_right")) as fp:
+            assert fp.read() == "changed"
+        # Conflicts stay conflicts until solved
+        assert get_actions(bisync.plan_sync(left, right, state)) == {
+            "changed_left": bisync.SKIP,
+            "changed_right": bisync.SKIP,
+            "changed_both": bisync.RIGHT_TO_LEFT,
+            "deleted_changed": bisync.CONFLICT,
+        }
+        state.close()
+
+    @trg_dir
+    def test_state_is_persisted(self, datafiles):
+        left = os.path.join(str(datafiles), "left")
+        right = os.path.join(str(datafiles), "right")
+        write_file(os.path.join(left, "file.txt"), "data", 1000000000)
+        db_path = os.path.join(str(datafiles), "bisync.db")
+        state = bisync.SyncState(db_path)
+        bisync.sync(left, right, state)
+        state.close()
+        os.remove(os.path.join(right, "file.txt"))
+        state = bisync.SyncState(db_path)
+        plan = bisync.plan_sync(left, right, state)
+        assert get_actions(plan) == {"file.txt": bisync.DELETE_LEFT}
+        assert bisync.plan_sync(left, right)[0].action == bisync.LEFT_TO_RIGHT
+        state.close()
+
+    @trg_dir
+    def test_snapshot_is_invalidated(self, datafiles):
+        left = os.path.join(str(datafiles), "left")
+        right = os.path.join(str(datafiles), "right")
+        write_file(os.path.join(left, "file.txt"), "data", 1000000000)
+        write_file(os.path.join(right, "file.txt"), "data", 1000000000)
+        for each in (left, right):
+            os.utime(each, (1000000000, 1000000000))
+        state = bisync.SyncState(":memory:")
+        snapshot = StatSnapshot(":memory:")
+        bisync.sync(left, right, state, snapshot)
+
+        # Published with a rename, the left folder mtime changes
+        write_file(os.path.join(left, "file.txt"), "new data", 1100000000)
+        os.utime(left, (1100000000, 1100000000))
+        plan, success = bisync.sync(left, right, state, snapshot)
+        assert success is True
+        assert get_actions(plan) == {"file.txt": bisync.LEFT_TO_RIGHT}
+        # Copied over in place, the right folder mtime doesn't change
+        os.utime(right, (1000000000, 1000000000))
+        plan = bisync.plan_sync(left, right, state, snapshot)
+        assert get_actions(plan) == {"file.txt": bisync.SKIP}
+        snapshot.close()
+        state.close()
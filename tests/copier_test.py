@@ -1,10 +1,11 @@
 # coding=utf-8
 from __future__ import absolute_import, print_function
 
-from synchronizer import copier, syncstatus, logger
+from synchronizer import copier, syncstatus, hashing, utils, logger
 
 import os
 import shutil
+import threading
 import pytest
 
 # Empty directory to use for testing
@@ -94,6 +95,24 @@ class Test_ProcessPaths:
                 )
         assert status[0] == 1, "File is not in sync"
 
+    @trg_dir
+    def test_process_file_resumable(self, datafiles):
+        src_path = path_single_file
+        trg_path = str(datafiles)
+        trg_file_path = os.path.join(
+            trg_path, "C_cresta_02__MSH-BUMP.1001.png"
+        )
+        results = dict()
+        success = copier.process_paths(
+            src_path, trg_path, resumable=True, chunk_size=256 * 1024,
+            results=results
+        )
+        assert success is True, "Failed to process paths"
+        assert results[src_path]["strategy"] == "resumable"
+        assert os.listdir(trg_path) == ["C_cresta_02__MSH-BUMP.1001.png"]
+        status = syncstatus.get_sync_status(src_path, trg_file_path)
+        assert status[0] == 1, "File is not in sync"
+
     @trg_dir
     def test_process_texture_only(self, datafiles):
         src_path = os.path.join(path_texture)
@@ -168,6 +187,20 @@ class Test_ProcessPaths:
         files_copied = os.listdir(trg_path)
         assert len(files_copied) == 5, "Sequence didn't copy correctly"
 
+    @trg_dir
+    def test_sequence_onto_itself(self, datafiles):
+        trg_path = str(datafiles)
+        copier.process_paths(path_sequence, trg_path)
+        sizes = dict(
+            (name, os.path.getsize(os.path.join(trg_path, name)))
+            for name in os.listdir(trg_path)
+        )
+        src_path = os.path.join(trg_path, os.path.basename(path_sequence))
+        success = copier.process_paths(src_path, trg_path)
+        assert success is False
+        for name, size in sizes.items():
+            assert os.path.getsize(os.path.join(trg_path, name)) == size
+
     @trg_dir
     def test_sequence_with_missing_frames(self, datafiles):
         src_path = path_missing
@@ -186,6 +219,105 @@ class Test_ProcessPaths:
         files_copied = os.listdir(trg_path)
         assert len(files_copied) == 10, "Sequence didn't copy correctly"
 
+    @trg_dir
+    def test_sequence_with_tx_workers(self, datafiles):
+        src_path = path_sequence_tx
+        trg_path = str(datafiles)
+        results = dict()
+        success = copier.process_paths(
+            src_path, trg_path, include_tx=True,
+            workers=4, results=results
+        )
+        assert success is True, "Failed to process paths"
+        files_copied = os.listdir(trg_path)
+        assert len(files_copied) == 10, "Sequence didn't copy correctly"
+        assert len(results) == 10
+        for src_file_path, result in results.items():
+            assert result["success"] is True
+            assert result["strategy"] is not None
+            assert os.path.split(result["target"])[1] == \
+                os.path.split(src_file_path)[1]
+
+    @trg_dir
+    def test_sequence_missing_tx_workers(self, datafiles):
+        src_path = path_sequence
+        trg_path = str(datafiles)
+        results = dict()
+        success = copier.process_paths(
+            src_path, trg_path, include_tx=True,
+            workers=4, results=results
+        )
+        assert success is False
+        assert len(os.listdir(trg_path)) == 5
+        failed = [k for k, v in results.items() if not v["success"]]
+        assert len(failed) == 5
+        for each in failed:
+            assert each.endswith(".tx")
+
+    @trg_dir
+    def test_sequence_overwrite_if_changed(self, datafiles):
+        src_path = path_sequence_tx
+        trg_path = str(datafiles)
+        assert copier.process_paths(src_path, trg_path, include_tx=True)
+        stale_path = os.path.join(trg_path, "C_cresta_02__MSH-BUMP.1002.png")
+        with open(stale_path, "ab") as fp:
+            fp.write(b"stale")
+        results = dict()
+        success = copier.process_paths(
+            src_path, trg_path, False, include_tx=True,
+            overwrite="if_changed", results=results
+        )
+        assert success is True
+        assert len(results) == 10
+        copied = [k for k, v in results.items() if v["strategy"] is not None]
+        assert [os.path.split(each)[1] for each in copied] == \
+            ["C_cresta_02__MSH-BUMP.1002.png"]
+        status = syncstatus.get_sync_status(
+                    copied[0], stale_path,
+                    ignore_stats=copier.incremental_ignore_stats
+                )
+        assert status[0] == 1, "Stale file was not copied"
+
+        results = dict()
+        assert copier.process_paths(
+            src_path, trg_path, include_tx=True, overwrite="if_changed",
+            compare_content="full", results=results
+        )
+        assert all(v["strategy"] is None for v in results.values())
+
+    @trg_dir
+    def test_sequence_cancelled(self, datafiles):
+        trg_path = str(datafiles)
+        cancel_event = threading.Event()
+        cancel_event.set()
+        success = copier.process_paths(
+            path_sequence_tx, trg_path, include_tx=True,
+            workers=4, cancel_event=cancel_event
+        )
+        assert success is False
+        assert os.listdir(trg_path) == []
+
+    @trg_dir
+    def test_sequence_verified(self, datafiles):
+        trg_path = str(datafiles)
+        checksums_path = os.path.join(trg_path, "checksums.b2")
+        results = dict()
+        success = copier.process_paths(
+            path_sequence_tx, trg_path, include_tx=True, workers=4,
+            verify="stream", checksums_path=checksums_path, results=results
+        )
+        assert success is True
+        checksums = hashing.read_checksums(checksums_path)
+        assert len(checksums) == 10
+        for src_file_path, result in results.items():
+            digest = hashing.get_file_hash(src_file_path)
+            assert result["digest"] == digest
+            assert checksums[result["target"]] == digest
+
+    def test_invalid_overwrite(self):
+        with pytest.raises(ValueError):
+            copier.process_paths(path_sequence, path_root, overwrite="always")
+
     def test_src_trg_equal(self):
         src_path = path_dir
         trg_path = path_dir
@@ -228,6 +360,86 @@ class Test_ProcessDirs:
         shutil.rmtree(trg_path)
         assert os.path.exists(trg_path) is False
 
+    @trg_dir
+    def test_trg_exists_incremental(self, datafiles):
+        src_path = path_dir
+        trg_path = str(datafiles)
+        result = copier.process_paths(src_path, trg_path)
+        assert result is True
+        # Make one target file stale and add an orphan
+        stale_name = "C_cresta_02__MSH-BUMP.1001.tx"
+        stale_path = os.path.join(trg_path, stale_name)
+        with open(stale_path, "a") as fp:
+            fp.write("stale")
+        orphan_path = os.path.join(trg_path, "orphan.txt")
+        with open(orphan_path, "w") as fp:
+            fp.write("orphan")
+        results = dict()
+        result = copier.process_paths(
+            src_path, trg_path, incremental=True, results=results
+        )
+        assert result is True
+        assert os.path.exists(orphan_path) is True
+        status = syncstatus.get_sync_status(
+                    os.path.join(src_path, stale_name), stale_path,
+                    ignore_stats=copier.incremental_ignore_stats
+                )
+        assert status[0] == 1, "Stale file was not copied"
+        assert len(results) == 2
+        result = copier.process_paths(
+            src_path, trg_path, incremental=True, delete_orphans=True
+        )
+        assert result is True
+        assert os.path.exists(orphan_path) is False
+        assert sorted(os.listdir(trg_path)) == sorted(os.listdir(src_path))
+
+    @trg_dir
+    def test_process_dir_processes(self, datafiles, monkeypatch):
+        monkeypatch.setattr(copier, "PROCESS_SHARD_FILES", 1)
+        src_path = os.path.join(str(datafiles), "src")
+        for each in ("a", os.path.join("b", "c"), "empty"):
+            shutil.copytree(path_dir, os.path.join(src_path, each))
+        shutil.rmtree(os.path.join(src_path, "empty"))
+        os.mkdir(os.path.join(src_path, "empty"))
+        os.utime(os.path.join(src_path, "b"), (1000000000, 1000000000))
+        trg_path = os.path.join(str(datafiles), "trg")
+        os.mkdir(trg_path)
+        results = dict()
+        for _ in range(2):
+            result = copier.process_paths(
+                src_path, trg_path, processes=2, results=results
+            )
+            assert result is True
+        assert len(results) == 4
+        assert all(each["strategy"] for each in results.values())
+        diffs = syncstatus.diff_trees(src_path, trg_path)
+        assert set(status for _, status in diffs) == set([syncstatus.DIFF_SAME])
+        assert os.path.isdir(os.path.join(trg_path, "empty"))
+        assert os.stat(os.path.join(trg_path, "b")).st_mtime == 1000000000
+
+    @trg_dir
+    def test_process_dir_verified(self, datafiles):
+        src_path = os.path.join(str(datafiles), "src")
+        shutil.copytree(path_dir, os.path.join(src_path, "sub"))
+        trg_path = os.path.join(str(datafiles), "trg")
+        os.mkdir(trg_path)
+        checksums_path = os.path.join(str(datafiles), "checksums.b2")
+        for processes in (None, 2):
+            results = dict()
+            success = copier.process_paths(
+                src_path, trg_path, verify="readback", processes=processes,
+                checksums_path=checksums_path, results=results
+            )
+            assert success is True
+            checksums = hashing.read_checksums(checksums_path)
+            assert len(checksums) == len(os.listdir(path_dir))
+            for src_file_path, result in results.items():
+                digest = hashing.get_file_hash(src_file_path)
+                assert result["digest"] == digest
+                assert checksums[result["target"]] == digest
+        diffs = syncstatus.diff_trees(src_path, trg_path)
+        assert set(status for _, status in diffs) == set([syncstatus.DIFF_SAME])
+
     def test_exception(self):
         src_path = os.path.join(path_root, "doesnotexist")
         trg_path = os.path.join(path_root, "TEMP_DIR_DELETE")
@@ -269,21 +481,11 @@ class Test_ProcessFiles:
         assert result is True
 
     def test_txfile_exists_overwrite_false(self):
-        src_path = path_texture
+        src_path = utils.get_tx_path(path_texture)
         trg_path = os.path.join(
                 path_root, "texture", "src_path"
             )
-        result = copier._process_tx(
+        result = copier._copy_tx(
                 src_path, trg_path, force_overwrite=False
             )
         assert result is True
-
-    def test_txfile_not_existing(self):
-        src_path = path_single_file
-        trg_path = os.path.join(
-                path_root, "texture", "src_path"
-            )
-        result = copier._process_tx(
-                src_path, trg_path, force_overwrite=False
-            )
-        assert result is False
@@ -0,0 +1,166 @@
+# coding=utf-8
+from __future__ import absolute_import, print_function
+
+from synchronizer import copier, copyplan, syncstatus, logger
+
+import os
+import shutil
+import pytest
+
+# Empty directory to use for testing
+try:
+    trg_empty_dir = os.path.join(
+            os.path.split(__file__)[0], "data", "trg_path"
+        )
+    if not os.path.exists(trg_empty_dir):
+        os.mkdir(trg_empty_dir)
+except (IOError, OSError) as why:
+    raise why
+
+# Debug logging
+logger.init_logger()
+# logger.init_file_logger()
+
+
+# --------------------------------------------------------
+#  TESTING DATA
+# --------------------------------------------------------
+path_root = os.path.join(
+                os.path.normcase(
+                    os.path.abspath(os.path.split(__file__)[0])
+                ),
+                "data"
+            )
+trg_path_dir = os.path.join(path_root, "trg_path")
+path_dir = os.path.join(path_root, "directory", "src_path")
+path_sequence_tx = os.path.join(
+                    path_root, "sequence_with_tx",
+                    "src_path", "C_cresta_02__MSH-BUMP.1001.png"
+                )
+# Fixtures
+trg_dir = pytest.mark.datafiles(trg_path_dir)
+
+
+class Test_CopyPlan:
+    @trg_dir
+    def test_plan_sequence(self, datafiles):
+        trg_path = str(datafiles)
+        plan = copyplan.plan_copy(path_sequence_tx, trg_path, include_tx=True)
+        totals = plan.totals
+        assert totals[copyplan.COPY] == 10
+        assert totals[copyplan.SKIP] == 0
+        assert totals["bytes"] == sum(
+            os.path.getsize(each.src) for each in plan
+        )
+        # Dry run, nothing copied
+        assert os.listdir(trg_path) == []
+
+        assert copyplan.execute(plan, workers=4) is True
+        assert len(os.listdir(trg_path)) == 10
+        plan = copyplan.plan_copy(
+            path_sequence_tx, trg_path, force_overwrite=False, include_tx=True
+        )
+        assert plan.totals[copyplan.SKIP] == 10
+        plan = copyplan.plan_copy(path_sequence_tx, trg_path)
+        assert plan.totals[copyplan.OVERWRITE] == 5
+
+    @trg_dir
+    def test_plan_no_find_sequence(self, datafiles):
+        trg_path = str(datafiles)
+        plan = copyplan.plan_copy(
+            path_sequence_tx, trg_path, find_sequence=False
+        )
+        assert plan.totals[copyplan.COPY] == 1
+        success = copier.process_paths(
+            path_sequence_tx, trg_path, find_sequence=False
+        )
+        assert success is True
+        assert os.listdir(trg_path) == [os.path.basename(path_sequence_tx)]
+
+    @trg_dir
+    def test_plan_dirs_incremental(self, datafiles):
+        src_path = os.path.join(str(datafiles), "src")
+        shutil.copytree(path_dir, os.path.join(src_path, "sub"))
+        shutil.copy2(os.path.join(path_dir, "C_cresta_02__MSH-BUMP.1001.png"), src_path)
+        trg_path = os.path.join(str(datafiles), "trg")
+        os.mkdir(trg_path)
+        shutil.copy2(os.path.join(path_dir, "C_cresta_02__MSH-BUMP.1001.png"), trg_path)
+
+        plan = copyplan.plan_copy(src_path, trg_path, incremental=True)
+        totals = plan.totals
+        assert totals[copyplan.MKDIR] == 1
+        assert totals[copyplan.COPY] == 2
+        assert totals[copyplan.SKIP] == 1
+        results = dict()
+        assert copyplan.execute(plan, results=results) is True
+        assert len(results) == 3
+        statuses = set(
+            status for _, status in syncstatus.diff_trees(src_path, trg_path)
+        )
+        assert statuses == set([syncstatus.DIFF_SAME])
+
+    @trg_dir
+    def test_plan_dirs_force_overwrite(self, datafiles):
+        trg_path = os.path.join(str(datafiles), "trg")
+        os.makedirs(os.path.join(trg_path, "old"))
+        with open(os.path.join(trg_path, "stale.txt"), "wb") as fp:
+            fp.write(b"stale")
+
+        plan = copyplan.plan_copy(path_dir, trg_path, force_overwrite=False)
+        totals = plan.totals
+        assert totals[copyplan.SKIP] == len(os.listdir(path_dir))
+        assert totals[copyplan.DELETE] == totals[copyplan.COPY] == 0
+
+        plan = copyplan.plan_copy(path_dir, trg_path)
+        totals = plan.totals
+        assert totals[copyplan.DELETE] == 2
+        assert totals[copyplan.COPY] == len(os.listdir(path_dir))
+        assert totals[copyplan.OVERWRITE] == totals[copyplan.SKIP] == 0
+        assert plan.split(2)[1].totals[copyplan.DELETE] == 0
+        assert copyplan.execute(plan) is True
+        assert sorted(os.listdir(trg_path)) == sorted(os.listdir(path_dir))
+
+    @trg_dir
+    def test_plan_dirs_delete_orphans(self, datafiles):
+        trg_path = str(datafiles)
+        with open(os.path.join(trg_path, "orphan.txt"), "wb") as fp:
+            fp.write(b"orphan")
+        plan = copyplan.plan_copy(
+            path_dir, trg_path, incremental=True, delete_orphans=True
+        )
+        assert plan.totals[copyplan.DELETE] == 1
+        assert copyplan.execute(plan) is True
+        assert not os.path.exists(os.path.join(trg_path, "orphan.txt"))
+
+    @trg_dir
+    def test_serialize_and_split(self, datafiles):
+        src_path = os.path.join(str(datafiles), "src")
+        os.makedirs(os.path.join(src_path, "sub"))
+        for index in range(6):
+            with open(os.path.join(src_path, "sub", "file{}".format(index)), "wb") as fp:
+                fp.write(b"x" * (index + 1) * 100)
+        trg_path = os.path.join(str(datafiles), "trg")
+        os.mkdir(trg_path)
+        plan = copyplan.plan_copy(src_path, trg_path)
+        loaded = copyplan.CopyPlan.from_json(plan.to_json())
+        assert loaded.operations == plan.operations
+        assert loaded.totals == plan.totals
+
+        parts = plan.split(2)
+        assert [each.totals["bytes"] for each in parts] == [1100, 1000]
+        assert all(each.totals[copyplan.MKDIR] == 1 for each in parts)
+        for each in parts:
+            assert copyplan.execute(copyplan.CopyPlan.from_json(each.to_json()))
+        assert len(os.listdir(os.path.join(trg_path, "sub"))) == 6
+
+    def test_unsupported_version(self):
+        with pytest.raises(ValueError):
+            copyplan.CopyPlan.from_dict({"version": 0, "operations": []})
+
+    def test_interleave_by_size(self):
+        operations = [
+            copyplan.Operation(copyplan.COPY, str(size), str(size), size)
+            for size in (5, 1, 4, 2, 3)
+        ]
+        ordered = copyplan._interleave_by_size(operations)
+        assert [each.size for each in ordered] == [5, 1, 4, 2, 3]
@@ -0,0 +1,255 @@
+# coding=utf-8
+from __future__ import absolute_import, print_function
+
+from synchronizer import engine, syncstatus, hashing, logger
+
+import os
+import errno
+import pytest
+
+# Empty directory to use for testing
+try:
+    trg_empty_dir = os.path.join(
+            os.path.split(__file__)[0], "data", "trg_path"
+        )
+    if not os.path.exists(trg_empty_dir):
+        os.mkdir(trg_empty_dir)
+except (IOError, OSError) as why:
+    raise why
+
+# Debug logging
+logger.init_logger()
+# logger.init_file_logger()
+
+
+# --------------------------------------------------------
+#  TESTING DATA
+# --------------------------------------------------------
+path_root = os.path.join(
+                os.path.normcase(
+                    os.path.abspath(os.path.split(__file__)[0])
+                ),
+                "data"
+            )
+trg_path_dir = os.path.join(path_root, "trg_path")
+path_single_file = os.path.join(
+                    path_root, "singlefile",
+                    "src_path", "C_cresta_02__MSH-BUMP.1001.png"
+                )
+# Fixtures
+trg_dir = pytest.mark.datafiles(trg_path_dir)
+
+
+class Test_CopyFile:
+    @trg_dir
+    def test_copy_file(self, datafiles):
+        src_path = path_single_file
+        trg_file_path = os.path.join(
+            str(datafiles), "C_cresta_02__MSH-BUMP.1001.png"
+        )
+        strategy = engine.copy_file(src_path, trg_file_path)
+        assert strategy in engine.get_strategies() + ["userspace"]
+        with open(src_path, "rb") as fsrc, open(trg_file_path, "rb") as ftrg:
+            assert fsrc.read() == ftrg.read()
+        status = syncstatus.get_sync_status(src_path, trg_file_path)
+        assert status[0] == 1, "File is not in sync"
+
+    @trg_dir
+    def test_copy_file_fallback(self, datafiles, monkeypatch):
+        def unsupported(src_fd, trg_fd, size):
+            os.write(trg_fd, b"garbage")
+            raise OSError(errno.ENOSYS, "Not supported")
+
+        monkeypatch.setattr(
+            engine, "_strategies", [("unsupported", unsupported)]
+        )
+        src_path = path_single_file
+        trg_file_path = os.path.join(
+            str(datafiles), "C_cresta_02__MSH-BUMP.1001.png"
+        )
+        strategy = engine.copy_file(src_path, trg_file_path)
+        assert strategy == "userspace"
+        with open(src_path, "rb") as fsrc, open(trg_file_path, "rb") as ftrg:
+            assert fsrc.read() == ftrg.read()
+
+    @trg_dir
+    def test_copy_file_short(self, datafiles, monkeypatch):
+        calls = list()
+
+        def short_copy_file_range(src_fd, trg_fd, count):
+            # Stops after the first block, like a filesystem giving up
+            if calls:
+                return 0
+            calls.append(count)
+            return os.write(trg_fd, os.read(src_fd, 16))
+
+        monkeypatch.setattr(
+            os, "copy_file_range", short_copy_file_range, raising=False
+        )
+        monkeypatch.setattr(
+            engine, "_strategies",
+            [("copy_file_range", engine._copy_file_range)]
+        )
+        src_path = path_single_file
+        trg_file_path = os.path.join(
+            str(datafiles), "C_cresta_02__MSH-BUMP.1001.png"
+        )
+        strategy = engine.copy_file(src_path, trg_file_path)
+        assert strategy == "userspace"
+        with open(src_path, "rb") as fsrc, open(trg_file_path, "rb") as ftrg:
+            assert fsrc.read() == ftrg.read()
+
+    @trg_dir
+    def test_copy_file_error(self, datafiles, monkeypatch):
+        def broken(src_fd, trg_fd, size):
+            raise OSError(errno.EIO, "I/O error")
+
+        monkeypatch.setattr(engine, "_strategies", [("broken", broken)])
+        src_path = path_single_file
+        trg_file_path = os.path.join(
+            str(datafiles), "C_cresta_02__MSH-BUMP.1001.png"
+        )
+        with pytest.raises(OSError):
+            engine.copy_file(src_path, trg_file_path)
+
+    @trg_dir
+    def test_copy_file_same_file(self, datafiles):
+        trg_file_path = os.path.join(
+            str(datafiles), "C_cresta_02__MSH-BUMP.1001.png"
+        )
+        engine.copy_file(path_single_file, trg_file_path)
+        size = os.path.getsize(trg_file_path)
+        for copy_func in (
+                engine.copy_file, engine.copy_file_resumable,
+                engine.copy_file_verified):
+            with pytest.raises(engine.SameFileError):
+                copy_func(trg_file_path, trg_file_path)
+        assert os.path.getsize(trg_file_path) == size
+
+
+class Test_CopyFileVerified:
+    @trg_dir
+    @pytest.mark.parametrize("verify", ["stream", "readback"])
+    def test_copy_file_verified(self, datafiles, verify):
+        trg_file_path = os.path.join(str(datafiles), "copy.png")
+        strategy, digest = engine.copy_file_verified(
+            path_single_file, trg_file_path, verify
+        )
+        assert strategy == "userspace"
+        assert digest == hashing.get_file_hash(path_single_file)
+        assert digest == hashing.get_file_hash(trg_file_path)
+        status = syncstatus.get_sync_status(path_single_file, trg_file_path, True)
+        assert status[0] == 1
+
+    @trg_dir
+    def test_readback_mismatch(self, datafiles, monkeypatch):
+        trg_file_path = os.path.join(str(datafiles), "copy.png")
+        monkeypatch.setattr(
+            hashing, "get_file_hash", lambda *args, **kwargs: "corrupted"
+        )
+        with pytest.raises(IOError):
+            engine.copy_file_verified(path_single_file, trg_file_path, "readback")
+        assert os.path.exists(trg_file_path) is False
+
+    def test_invalid_verify(self):
+        with pytest.raises(ValueError):
+            engine.copy_file_verified(path_single_file, "unused", "always")
+
+
+class Test_CopyFileResumable:
+    @trg_dir
+    def test_small_file(self, datafiles):
+        src_path = path_single_file
+        trg_file_path = os.path.join(
+            str(datafiles), "C_cresta_02__MSH-BUMP.1001.png"
+        )
+        strategy = engine.copy_file_resumable(src_path, trg_file_path)
+        assert strategy not in ("resumable", "resumed")
+        status = syncstatus.get_sync_status(src_path, trg_file_path)
+        assert status[0] == 1, "File is not in sync"
+
+    @trg_dir
+    def test_resume_interrupted_copy(self, datafiles, monkeypatch):
+        src_path = os.path.join(str(datafiles), "big_cache.abc")
+        with open(src_path, "wb") as fp:
+            fp.write(os.urandom(10 * 1024 + 100))
+        trg_file_path = os.path.join(str(datafiles), "big_cache_copy.abc")
+        partial_path = trg_file_path + engine.PARTIAL_SUFFIX
+        record_path = trg_file_path + engine.PARTIAL_RECORD_SUFFIX
+
+        write_record = engine._write_record
+        calls = list()
+
+        def interrupted_write_record(record_path, record):
+            calls.append(record_path)
+            if len(calls) > 3:
+                raise IOError(errno.EIO, "Interrupted")
+            write_record(record_path, record)
+
+        monkeypatch.setattr(engine, "_write_record", interrupted_write_record)
+        with pytest.raises(IOError):
+            engine.copy_file_resumable(src_path, trg_file_path, chunk_size=1024)
+        assert os.path.exists(partial_path) is True
+        assert os.path.exists(trg_file_path) is False
+
+        monkeypatch.setattr(engine, "_write_record", write_record)
+        strategy = engine.copy_file_resumable(
+            src_path, trg_file_path, chunk_size=1024
+        )
+        assert strategy == "resumed"
+        assert os.path.exists(partial_path) is False
+        assert os.path.exists(record_path) is False
+        with open(src_path, "rb") as fsrc, open(trg_file_path, "rb") as ftrg:
+            assert fsrc.read() == ftrg.read()
+        status = syncstatus.get_sync_status(
+            src_path, trg_file_path, ignore_name=True
+        )
+        assert status[0] == 1, "File is not in sync"
+
+    @trg_dir
+    def test_corrupted_partial(self, datafiles, monkeypatch):
+        src_path = os.path.join(str(datafiles), "big_cache.abc")
+        with open(src_path, "wb") as fp:
+            fp.write(os.urandom(4 * 1024))
+        trg_file_path = os.path.join(str(datafiles), "big_cache_copy.abc")
+        partial_path = trg_file_path + engine.PARTIAL_SUFFIX
+
+        write_record = engine._write_record
+        calls = list()
+
+        def interrupted_write_record(record_path, record):
+            calls.append(record_path)
+            if len(calls) > 3:
+                raise IOError(errno.EIO, "Interrupted")
+            write_record(record_path, record)
+
+        monkeypatch.setattr(engine, "_write_record", interrupted_write_record)
+        with pytest.raises(IOError):
+            engine.copy_file_resumable(src_path, trg_file_path, chunk_size=1024)
+        monkeypatch.setattr(engine, "_write_record", write_record)
+        # Corrupt the second chunk, copy must resume from there
+        with open(partial_path, "r+b") as fp:
+            fp.seek(1024 + 10)
+            fp.write(b"corrupted")
+        strategy = engine.copy_file_resumable(
+            src_path, trg_file_path, chunk_size=1024
+        )
+        assert strategy == "resumed"
+        with open(src_path, "rb") as fsrc, open(trg_file_path, "rb") as ftrg:
+            assert fsrc.read() == ftrg.read()
+
+    @trg_dir
+    def test_empty_file_stale_partial(self, datafiles):
+        src_path = os.path.join(str(datafiles), "empty.abc")
+        open(src_path, "wb").close()
+        trg_file_path = os.path.join(str(datafiles), "empty_copy.abc")
+        partial_path = trg_file_path + engine.PARTIAL_SUFFIX
+        with open(partial_path, "wb") as fp:
+            fp.write(b"stale")
+        strategy = engine.copy_file_resumable(src_path, trg_file_path)
+        assert strategy == "resumable"
+        assert os.path.getsize(trg_file_path) == 0
+        assert not os.path.exists(partial_path)
+        assert not os.path.exists(
+            trg_file_path + engine.PARTIAL_RECORD_SUFFIX
+        )
@@ -0,0 +1,212 @@
+# coding=utf-8
+from __future__ import absolute_import, print_function
+
+from synchronizer import hashing, syncstatus, logger
+
+import os
+import shutil
+import hashlib
+import pytest
+
+# Empty directory to use for testing
+try:
+    trg_empty_dir = os.path.join(
+            os.path.split(__file__)[0], "data", "trg_path"
+        )
+    if not os.path.exists(trg_empty_dir):
+        os.mkdir(trg_empty_dir)
+except (IOError, OSError) as why:
+    raise why
+
+# Debug logging
+logger.init_logger()
+# logger.init_file_logger()
+
+
+# --------------------------------------------------------
+#  TESTING DATA
+# --------------------------------------------------------
+path_root = os.path.join(
+                os.path.normcase(
+                    os.path.abspath(os.path.split(__file__)[0])
+                ),
+                "data"
+            )
+trg_path_dir = os.path.join(path_root, "trg_path")
+path_single_file = os.path.join(
+                    path_root, "singlefile",
+                    "src_path", "C_cresta_02__MSH-BUMP.1001.png"
+                )
+# Fixtures
+trg_dir = pytest.mark.datafiles(trg_path_dir)
+
+
+class Test_GetFileHash:
+    def test_get_file_hash(self):
+        digest = hashing.get_file_hash(path_single_file, "sha1")
+        with open(path_single_file, "rb") as fp:
+            assert digest == hashlib.sha1(fp.read()).hexdigest()
+
+    def test_invalid_algorithm(self):
+        with pytest.raises(ValueError):
+            hashing.get_file_hash(path_single_file, "not_an_algorithm")
+
+    @trg_dir
+    def test_cache_avoids_reading(self, datafiles, monkeypatch):
+        cache = hashing.HashCache(os.path.join(str(datafiles), "hashes.db"))
+        digest = hashing.get_file_hash(path_single_file, cache=cache)
+
+        def no_hasher(algorithm=None):
+            raise AssertionError("File was read again")
+
+        monkeypatch.setattr(hashing, "new_hasher", no_hasher)
+        assert hashing.get_file_hash(path_single_file, cache=cache) == digest
+        cache.close()
+
+    @trg_dir
+    def test_cache_misses_modified_file(self, datafiles):
+        file_path = os.path.join(str(datafiles), "file.txt")
+        with open(file_path, "w") as fp:
+            fp.write("first")
+        cache = hashing.HashCache(":memory:")
+        first = hashing.get_file_hash(file_path, cache=cache)
+        with open(file_path, "w") as fp:
+            fp.write("second")
+        os.utime(file_path, (2000000000, 2000000000))
+        assert hashing.get_file_hash(file_path, cache=cache) != first
+        cache.close()
+
+    @trg_dir
+    def test_hash_files(self, datafiles):
+        missing = os.path.join(str(datafiles), "missing.txt")
+        result = hashing.hash_files([path_single_file, missing])
+        assert list(result) == [path_single_file]
+        assert result[path_single_file] == \
+            hashing.get_file_hash(path_single_file)
+
+
+class Test_CompareContent:
+    @trg_dir
+    def test_same_content_different_mtime(self, datafiles):
+        trg_file = os.path.join(str(datafiles), "C_cresta_02__MSH-BUMP.1001.png")
+        shutil.copy2(path_single_file, trg_file)
+        os.utime(trg_file, (2000000000, 2000000000))
+        status = syncstatus.get_sync_status(path_single_file, trg_file)
+        assert status[0] == 2
+        status = syncstatus.get_sync_status(
+            path_single_file, trg_file, compare_content="full"
+        )
+        assert status[0] == 1, "File is not in sync"
+
+    @trg_dir
+    def test_different_content(self, datafiles):
+        trg_file = os.path.join(str(datafiles), "C_cresta_02__MSH-BUMP.1001.png")
+        shutil.copy2(path_single_file, trg_file)
+        with open(trg_file, "r+b") as fp:
+            fp.seek(100)
+            fp.write(b"x")
+        shutil.copystat(path_single_file, trg_file)
+        result = syncstatus.compare_stats(
+            path_single_file, trg_file, compare_content="full"
+        )
+        assert result["Content"] is False
+
+    def test_invalid_mode(self):
+        with pytest.raises(ValueError):
+            syncstatus.compare_stats(
+                path_single_file, path_single_file, compare_content="wrong"
+            )
+
+    @trg_dir
+    def test_diff_trees_content(self, datafiles):
+        src_tree = os.path.join(str(datafiles), "src")
+        trg_tree = os.path.join(str(datafiles), "trg")
+        os.makedirs(src_tree)
+        os.makedirs(trg_tree)
+        for name, src_data, trg_data in (
+                ("same.txt", b"same", b"same"),
+                ("changed.txt", b"aaaa", b"bbbb")):
+            for tree, data in ((src_tree, src_data), (trg_tree, trg_data)):
+                with open(os.path.join(tree, name), "wb") as fp:
+                    fp.write(data)
+            os.utime(os.path.join(trg_tree, name), (2000000000, 2000000000))
+        cache = hashing.HashCache(":memory:")
+        result = dict(syncstatus.diff_trees(
+            src_tree, trg_tree, compare_content="full", hash_cache=cache
+        ))
+        assert result == {
+            "same.txt": syncstatus.DIFF_SAME,
+            "changed.txt": syncstatus.DIFF_CHANGED
+        }
+        cache.close()
+
+
+class Test_GetSampleHash:
+    @trg_dir
+    def test_small_file_is_hashed_whole(self, datafiles):
+        file_path = os.path.join(str(datafiles), "small.txt")
+        with open(file_path, "wb") as fp:
+            fp.write(b"small")
+        blocks = hashing._get_sample_blocks(5, 8, 1024)
+        assert blocks == [(0, 5)]
+        assert hashing.get_sample_hash(file_path) != \
+            hashing.get_file_hash(file_path)
+
+    def test_sample_blocks(self):
+        size = 100 * 1024
+        blocks = hashing._get_sample_blocks(size, 3, 1024)
+        assert len(blocks) == 5
+        assert blocks[0] == (0, 1024)
+        assert blocks[-1] == (size - 1024, 1024)
+        offsets = [each[0] for each in blocks]
+        assert offsets == sorted(offsets)
+
+    @trg_dir
+    def test_quick_compare(self, datafiles, monkeypatch):
+        data = bytearray(os.urandom(100 * 1024))
+        src_file = os.path.join(str(datafiles), "src.exr")
+        trg_file = os.path.join(str(datafiles), "trg.exr")
+        with open(src_file, "wb") as fp:
+            fp.write(data)
+        # Change a byte outside every sampled block
+        data[1500] = (data[1500] + 1) % 256
+        with open(trg_file, "wb") as fp:
+            fp.write(data)
+        shutil.copystat(src_file, trg_file)
+
+        get_sample_hash = hashing.get_sample_hash
+
+        def sample_hash(file_path, **kwargs):
+            return get_sample_hash(
+                file_path, samples=3, block_size=1024, **kwargs
+            )
+
+        assert sample_hash(src_file) == sample_hash(trg_file)
+        monkeypatch.setattr(hashing, "get_sample_hash", sample_hash)
+        result = syncstatus.compare_stats(
+            src_file, trg_file, ignore_name=True, compare_content="quick"
+        )
+        assert result["Content"] is True
+        result = syncstatus.compare_stats(
+            src_file, trg_file, ignore_name=True, compare_content="quick",
+            escalate_content=True
+        )
+        assert result["Content"] is False
+
+    @trg_dir
+    def test_quick_compare_skips_full_hash(self, datafiles, monkeypatch):
+        trg_file = os.path.join(str(datafiles), "C_cresta_02__MSH-BUMP.1001.png")
+        shutil.copy2(path_single_file, trg_file)
+        with open(trg_file, "r+b") as fp:
+            fp.write(b"x")
+        shutil.copystat(path_single_file, trg_file)
+
+        def no_full_hash(file_path, algorithm=None, cache=None):
+            raise AssertionError("File was hashed whole")
+
+        monkeypatch.setattr(hashing, "get_file_hash", no_full_hash)
+        status = syncstatus.get_sync_status(
+            path_single_file, trg_file, compare_content="quick",
+            escalate_content=True
+        )
+        assert status[0] == 2
@@ -0,0 +1,165 @@
+# coding=utf-8
+from __future__ import absolute_import, print_function
+
+from synchronizer import manifest, copier, syncstatus, hashing, merkle, logger
+
+import os
+import shutil
+import pytest
+
+# Empty directory to use for testing
+try:
+    trg_empty_dir = os.path.join(
+            os.path.split(__file__)[0], "data", "trg_path"
+        )
+    if not os.path.exists(trg_empty_dir):
+        os.mkdir(trg_empty_dir)
+except (IOError, OSError) as why:
+    raise why
+
+# Debug logging
+logger.init_logger()
+# logger.init_file_logger()
+
+
+# --------------------------------------------------------
+#  TESTING DATA
+# --------------------------------------------------------
+path_root = os.path.join(
+                os.path.normcase(
+                    os.path.abspath(os.path.split(__file__)[0])
+                ),
+                "data"
+            )
+trg_path_dir = os.path.join(path_root, "trg_path")
+path_dir = os.path.join(path_root, "directory", "src_path")
+path_sequence_tx = os.path.join(
+        path_root, "sequence_with_tx", "src_path",
+        "C_cresta_02__MSH-BUMP.1001.png"
+    )
+# Fixtures
+trg_dir = pytest.mark.datafiles(trg_path_dir)
+
+
+class Test_Manifest:
+    @trg_dir
+    def test_write_read(self, datafiles):
+        root = str(datafiles)
+        entries = [
+            manifest.ManifestEntry(
+                os.path.join("sub", "a.exr"), 10, 1500000000123456789,
+                "00ff" * 8
+            ),
+            manifest.ManifestEntry("b.json", 0, -1, None)
+        ]
+        manifest.write_manifest(root, entries, "blake2b")
+        algorithm, result = manifest.read_manifest(root)
+        assert algorithm == "blake2b"
+        assert result == dict((each.rel_path, each) for each in entries)
+
+        manifest.update_manifest(
+            root, [manifest.ManifestEntry("b.json", 5, 1, None)]
+        )
+        algorithm, result = manifest.read_manifest(root)
+        assert algorithm == "blake2b"
+        assert len(result) == 2
+        assert result["b.json"].size == 5
+
+        with open(manifest.get_manifest_path(root), "r+b") as fp:
+            fp.truncate(20)
+        with pytest.raises(ValueError):
+            manifest.read_manifest(root)
+
+    @trg_dir
+    def test_dir_status_from_manifest(self, datafiles, monkeypatch):
+        src_path = os.path.join(str(datafiles), "src")
+        trg_path = os.path.join(str(datafiles), "trg")
+        shutil.copytree(path_dir, os.path.join(src_path, "sub"))
+        os.mkdir(trg_path)
+        assert copier.process_paths(src_path, trg_path, write_manifest=True)
+        _, entries = manifest.read_manifest(trg_path)
+        assert len(entries) == 2
+
+        def fail_compare(*args, **kwargs):
+            raise AssertionError("Target must not be compared by stats")
+
+        monkeypatch.setattr(syncstatus, "compare_stats", fail_compare)
+        status = syncstatus.get_sync_status(
+            src_path, trg_path, use_manifest=True
+        )
+        assert status[0] == 1
+
+        # Target file changed since the manifest was written
+        trg_file_path = os.path.join(
+            trg_path, "sub", "C_cresta_02__MSH-BUMP.1001.tx"
+        )
+        with open(trg_file_path, "ab") as fp:
+            fp.write(b"drift")
+        result = manifest.validate(src_path, trg_path)
+        assert result["drifted"] == [
+            os.path.join("sub", "C_cresta_02__MSH-BUMP.1001.tx")
+        ]
+        assert syncstatus.get_sync_status(
+            src_path, trg_path, use_manifest=True
+        )[0] == 2
+
+        # New source file
+        with open(os.path.join(src_path, "new.txt"), "w") as fp:
+            fp.write("new")
+        result = manifest.validate(src_path, trg_path, check_target=False)
+        assert result["missing"] == ["new.txt"]
+        assert result["drifted"] == []
+
+    @trg_dir
+    def test_manifest_is_not_compared(self, datafiles):
+        src_path = os.path.join(str(datafiles), "src")
+        trg_path = os.path.join(str(datafiles), "trg")
+        shutil.copytree(path_dir, os.path.join(src_path, "sub"))
+        os.mkdir(trg_path)
+        assert copier.process_paths(src_path, trg_path, write_manifest=True)
+        assert os.path.exists(manifest.get_manifest_path(trg_path))
+
+        assert syncstatus.get_sync_status(
+            src_path, trg_path, ignore_name=True
+        )[0] == 1
+        assert syncstatus.get_dir_size(src_path) == \
+            syncstatus.get_dir_size(trg_path)
+        diffs = list(syncstatus.diff_trees(src_path, trg_path))
+        assert set(status for _, status in diffs) == set([syncstatus.DIFF_SAME])
+        assert merkle.get_tree_digests(src_path)[""] == \
+            merkle.get_tree_digests(trg_path)[""]
+        assert syncstatus.get_most_recent(
+            src_path, trg_path, recursive=True
+        ) is None
+
+        assert copier.process_paths(
+            src_path, trg_path, incremental=True, delete_orphans=True
+        )
+        assert os.path.exists(manifest.get_manifest_path(trg_path))
+
+    @trg_dir
+    def test_sequence_manifest(self, datafiles):
+        trg_path = str(datafiles)
+        assert copier.process_paths(
+            path_sequence_tx, trg_path, include_tx=True,
+            verify="stream", write_manifest=True
+        )
+        algorithm, entries = manifest.read_manifest(trg_path)
+        assert algorithm == hashing.DEFAULT_ALGORITHM
+        assert len(entries) == 10
+        entry = entries["C_cresta_02__MSH-BUMP.1001.png"]
+        assert entry.digest == hashing.get_file_hash(path_sequence_tx)
+
+        trg_file_path = os.path.join(
+            trg_path, os.path.split(path_sequence_tx)[1]
+        )
+        assert syncstatus.get_sync_status(
+            path_sequence_tx, trg_file_path, use_manifest=True
+        )[0] == 1
+
+        # Unreadable manifests fall back to comparing stats
+        with open(manifest.get_manifest_path(trg_path), "wb") as fp:
+            fp.write(b"garbage")
+        assert syncstatus.get_sync_status(
+            path_sequence_tx, trg_file_path, use_manifest=True
+        )[0] == 1
@@ -0,0 +1,150 @@
+# coding=utf-8
+from __future__ import absolute_import, print_function
+
+from synchronizer import merkle, snapshot, syncstatus, logger
+
+import os
+import shutil
+import pytest
+
+# Empty directory to use for testing
+try:
+    trg_empty_dir = os.path.join(
+            os.path.split(__file__)[0], "data", "trg_path"
+        )
+    if not os.path.exists(trg_empty_dir):
+        os.mkdir(trg_empty_dir)
+except (IOError, OSError) as why:
+    raise why
+
+# Debug logging
+logger.init_logger()
+# logger.init_file_logger()
+
+
+# --------------------------------------------------------
+#  TESTING DATA
+# --------------------------------------------------------
+path_root = os.path.join(
+                os.path.normcase(
+                    os.path.abspath(os.path.split(__file__)[0])
+                ),
+                "data"
+            )
+trg_path_dir = os.path.join(path_root, "trg_path")
+path_dir = os.path.join(path_root, "directory", "src_path")
+# Fixtures
+trg_dir = pytest.mark.datafiles(trg_path_dir)
+
+
+def build_tree(root):
+    """Copies test data in two levels, keeping file stats."""
+    tree_path = os.path.join(root, "tree")
+    shutil.copytree(path_dir, os.path.join(tree_path, "a"))
+    shutil.copytree(path_dir, os.path.join(tree_path, "b", "c"))
+    return tree_path
+
+
+class Test_TreeDigests:
+    @trg_dir
+    def test_same_trees(self, datafiles):
+        src_tree = build_tree(os.path.join(str(datafiles), "src"))
+        trg_tree = build_tree(os.path.join(str(datafiles), "trg"))
+        src_digests = merkle.get_tree_digests(src_tree)
+        assert sorted(src_digests) == ["", "a", "b", os.path.join("b", "c")]
+        assert src_digests == merkle.get_tree_digests(trg_tree)
+        assert list(merkle.diff_digests(src_tree, trg_tree)) == []
+
+    @trg_dir
+    def test_change_propagates_up(self, datafiles):
+        tree_path = build_tree(str(datafiles))
+        before = merkle.get_tree_digests(tree_path)
+        with open(os.path.join(tree_path, "b", "c", "new.txt"), "w") as fp:
+            fp.write("new")
+        after = merkle.get_tree_digests(tree_path)
+        assert after["a"] == before["a"]
+        for each in ("", "b", os.path.join("b", "c")):
+            assert after[each] != before[each]
+
+    @trg_dir
+    def test_digests_are_reused(self, datafiles, monkeypatch):
+        tree_path = build_tree(str(datafiles))
+        for dirpath, dirnames, filenames in os.walk(tree_path):
+            os.utime(dirpath, (1000000000, 1000000000))
+        db = snapshot.StatSnapshot(":memory:")
+        before = merkle.get_tree_digests(tree_path, db)
+
+        def fail_file_key(*args, **kwargs):
+            raise AssertionError("Unchanged files must not be digested again")
+
+        get_file_key = merkle._get_file_key
+        monkeypatch.setattr(merkle, "_get_file_key", fail_file_key)
+        assert merkle.get_tree_digests(tree_path, db) == before
+
+        monkeypatch.setattr(merkle, "_get_file_key", get_file_key)
+        with open(os.path.join(tree_path, "a", "new.txt"), "w") as fp:
+            fp.write("new")
+        os.utime(os.path.join(tree_path, "a"), (1100000000, 1100000000))
+        after = merkle.get_tree_digests(tree_path, db)
+        assert after["a"] != before["a"]
+        assert after["b"] == before["b"]
+        db.close()
+
+    @trg_dir
+    def test_diff_digests(self, datafiles):
+        src_tree = build_tree(os.path.join(str(datafiles), "src"))
+        trg_tree = build_tree(os.path.join(str(datafiles), "trg"))
+        os.remove(os.path.join(trg_tree, "a", "C_cresta_02__MSH-BUMP.1001.png"))
+        with open(os.path.join(trg_tree, "b", "c", "extra.txt"), "w") as fp:
+            fp.write("extra")
+        os.utime(
+            os.path.join(trg_tree, "b", "c", "C_cresta_02__MSH-BUMP.1001.tx"),
+            (2000000000, 2000000000)
+        )
+        shutil.copytree(path_dir, os.path.join(src_tree, "d"))
+        result = dict(merkle.diff_digests(src_tree, trg_tree))
+        expected = dict(
+            (rel_path, status)
+            for rel_path, status in syncstatus.diff_trees(src_tree, trg_tree)
+            if status != syncstatus.DIFF_SAME
+        )
+        assert result == expected
+        assert len(result) == 5
+
+    @trg_dir
+    def test_only_descends_into_changes(self, datafiles, monkeypatch):
+        src_tree = build_tree(os.path.join(str(datafiles), "src"))
+        trg_tree = build_tree(os.path.join(str(datafiles), "trg"))
+        with open(os.path.join(trg_tree, "a", "extra.txt"), "w") as fp:
+            fp.write("extra")
+        db = snapshot.StatSnapshot(":memory:")
+        listed = list()
+        list_dir = db.list_dir
+
+        def counting_list_dir(root, rel_dir="", refresh=False):
+            listed.append(rel_dir)
+            return list_dir(root, rel_dir, refresh)
+
+        monkeypatch.setattr(db, "list_dir", counting_list_dir)
+        result = list(merkle.diff_digests(src_tree, trg_tree, snapshot=db))
+        assert result == [(os.path.join("a", "extra.txt"), syncstatus.DIFF_REMOVED)]
+        # Four directories per tree for digests, then only root and 'a'
+        # are listed again on both sides
+        assert len(listed) == 8 + 4
+        assert sorted(listed[8:]) == ["", "", "a", "a"]
+        db.close()
+
+    @trg_dir
+    def test_compare_content(self, datafiles):
+        src_tree = build_tree(os.path.join(str(datafiles), "src"))
+        trg_tree = build_tree(os.path.join(str(datafiles), "trg"))
+        for dirpath, dirnames, filenames in os.walk(trg_tree):
+            for each in filenames:
+                os.utime(os.path.join(dirpath, each), (2000000000, 2000000000))
+        assert len(list(merkle.diff_digests(src_tree, trg_tree))) == 4
+        assert list(merkle.diff_digests(
+            src_tree, trg_tree, compare_content="full")) == []
+
+    def test_invalid_mode(self):
+        with pytest.raises(ValueError):
+            merkle.get_tree_digests(path_dir, compare_content="wrong")
@@ -0,0 +1,116 @@
+# coding=utf-8
+from __future__ import absolute_import, print_function
+
+from synchronizer import snapshot, syncstatus, logger
+
+import os
+import shutil
+import pytest
+
+# Empty directory to use for testing
+try:
+    trg_empty_dir = os.path.join(
+            os.path.split(__file__)[0], "data", "trg_path"
+        )
+    if not os.path.exists(trg_empty_dir):
+        os.mkdir(trg_empty_dir)
+except (IOError, OSError) as why:
+    raise why
+
+# Debug logging
+logger.init_logger()
+# logger.init_file_logger()
+
+
+# --------------------------------------------------------
+#  TESTING DATA
+# --------------------------------------------------------
+path_root = os.path.join(
+                os.path.normcase(
+                    os.path.abspath(os.path.split(__file__)[0])
+                ),
+                "data"
+            )
+trg_path_dir = os.path.join(path_root, "trg_path")
+path_dir = os.path.join(path_root, "directory", "src_path")
+# Fixtures
+trg_dir = pytest.mark.datafiles(trg_path_dir)
+
+
+def build_tree(root):
+    """Copies test data in two levels and sets directory mtimes in the past,
+    so the snapshot trusts them."""
+    tree_path = os.path.join(root, "tree")
+    shutil.copytree(path_dir, os.path.join(tree_path, "a"))
+    shutil.copytree(path_dir, os.path.join(tree_path, "b", "c"))
+    age_dirs(tree_path)
+    return tree_path
+
+
+def age_dirs(tree_path):
+    for dirpath, dirnames, filenames in os.walk(tree_path):
+        os.utime(dirpath, (1000000000, 1000000000))
+
+
+class Test_StatSnapshot:
+    @trg_dir
+    def test_walk_only_restats_changed_dirs(self, datafiles, monkeypatch):
+        root = str(datafiles)
+        tree_path = build_tree(root)
+        db = snapshot.StatSnapshot(os.path.join(root, "snapshot.db"))
+        first = dict(db.walk(tree_path))
+        assert len(first) == 4
+
+        stat_calls = list()
+        stat_dir = snapshot._stat_dir
+
+        def counting_stat_dir(dir_path):
+            stat_calls.append(dir_path)
+            return stat_dir(dir_path)
+
+        monkeypatch.setattr(snapshot, "_stat_dir", counting_stat_dir)
+        second = dict(db.walk(tree_path))
+        assert second == first
+        assert stat_calls == []
+
+        new_file = os.path.join(tree_path, "b", "c", "new.txt")
+        with open(new_file, "w") as fp:
+            fp.write("new")
+        age_dirs(tree_path)
+        os.utime(os.path.join(tree_path, "b", "c"), (2000000000, 2000000000))
+        third = dict(db.walk(tree_path))
+        assert len(third) == 5
+        assert stat_calls == [os.path.join(tree_path, "b", "c")]
+        db.close()
+
+    @trg_dir
+    def test_removed_dir_is_forgotten(self, datafiles):
+        root = str(datafiles)
+        tree_path = build_tree(root)
+        db = snapshot.StatSnapshot(os.path.join(root, "snapshot.db"))
+        assert len(list(db.walk(tree_path))) == 4
+        shutil.rmtree(os.path.join(tree_path, "b"))
+        os.utime(tree_path, (2000000000, 2000000000))
+        assert len(list(db.walk(tree_path))) == 2
+        rows = db._connection.execute(
+            "SELECT COUNT(*) FROM dirs WHERE rel_dir LIKE 'b%'"
+        ).fetchone()
+        assert rows[0] == 0
+        db.close()
+
+    @trg_dir
+    def test_diff_trees_with_snapshot(self, datafiles):
+        root = str(datafiles)
+        src_tree = build_tree(os.path.join(root, "src"))
+        trg_tree = build_tree(os.path.join(root, "trg"))
+        os.remove(os.path.join(trg_tree, "a", "C_cresta_02__MSH-BUMP.1001.png"))
+        shutil.rmtree(os.path.join(trg_tree, "b"))
+        age_dirs(trg_tree)
+        db = snapshot.StatSnapshot(os.path.join(root, "snapshot.db"))
+        expected = dict(syncstatus.diff_trees(src_tree, trg_tree))
+        for _ in range(2):
+            result = dict(syncstatus.diff_trees(src_tree, trg_tree, snapshot=db))
+            assert result == expected
+        assert syncstatus.get_dir_size(src_tree, snapshot=db) == \
+            syncstatus.get_dir_size(src_tree)
+        db.close()
@@ -5,6 +5,7 @@ from synchronizer import syncstatus, logger
 
 import pytest
 import os
+import shutil
 
 # Empty directory to use for testing
 try:
@@ -35,9 +36,13 @@ path_single_file = os.path.join(
                     path_root, "singlefile",
                     "src_path", "C_cresta_02__MSH-BUMP.1001.png"
                 )
+dif_path_dir = os.path.join(path_root, "directory", "dif_trg_path")
+path_sequence_tx = os.path.join(path_root, "sequence_with_tx", "src_path")
+trg_path_dir = os.path.join(path_root, "trg_path")
 # Fixtures
 data_dir = pytest.mark.datafiles(path_dir)
 data_single_file = pytest.mark.datafiles(path_single_file)
+trg_dir = pytest.mark.datafiles(trg_path_dir)
 
 
 class Test_SyncStatus:
@@ -165,6 +170,58 @@ class Test_SyncStatus:
         result = syncstatus.get_dir_size(dir_path)
         assert result is None
 
+    @trg_dir
+    def test_get_dir_size(self, datafiles):
+        tree_path = os.path.join(str(datafiles), "tree")
+        shutil.copytree(path_dir, os.path.join(tree_path, "a"))
+        shutil.copytree(path_dir, os.path.join(tree_path, "b", "c"))
+        expected = 0
+        for dirpath, dirnames, filenames in os.walk(tree_path):
+            for each in filenames:
+                expected += os.path.getsize(os.path.join(dirpath, each))
+        assert syncstatus.get_dir_size(tree_path) == expected
+        assert syncstatus.get_dir_size(tree_path, workers=1) == expected
+
+    @trg_dir
+    def test_get_dir_size_no_pool(self, datafiles, monkeypatch):
+        tree_path = os.path.join(str(datafiles), "tree")
+        shutil.copytree(path_dir, os.path.join(tree_path, "a"))
+        expected = syncstatus.get_dir_size(tree_path)
+
+        def no_pool(*args, **kwargs):
+            raise AssertionError("Thread pool created for single dir levels")
+
+        monkeypatch.setattr(syncstatus, "ThreadPool", no_pool)
+        assert syncstatus.get_dir_size(tree_path) == expected
+
+    @trg_dir
+    def test_get_dir_size_cache(self, datafiles, monkeypatch):
+        tree_path = os.path.join(str(datafiles), "tree")
+        shutil.copytree(path_dir, os.path.join(tree_path, "a"))
+        for dirpath, dirnames, filenames in os.walk(tree_path):
+            os.utime(dirpath, (1000000000, 1000000000))
+        size_cache = dict()
+        expected = syncstatus.get_dir_size(tree_path, size_cache=size_cache)
+        assert len(size_cache) == 2
+
+        scanned = list()
+        scan_dir_size = syncstatus._scan_dir_size
+
+        def counting_scan_dir_size(dir_path):
+            scanned.append(dir_path)
+            return scan_dir_size(dir_path)
+
+        monkeypatch.setattr(syncstatus, "_scan_dir_size", counting_scan_dir_size)
+        assert syncstatus.get_dir_size(tree_path, size_cache=size_cache) == expected
+        assert scanned == []
+
+        with open(os.path.join(tree_path, "a", "new.txt"), "w") as fp:
+            fp.write("new")
+        os.utime(os.path.join(tree_path, "a"), (2000000000, 2000000000))
+        result = syncstatus.get_dir_size(tree_path, size_cache=size_cache)
+        assert result == expected + 3
+        assert scanned == [os.path.join(tree_path, "a")]
+
     @data_single_file
     def test_get_most_recent(self, datafiles):
         src_path = path_single_file
@@ -182,3 +239,287 @@ class Test_SyncStatus:
         src_path = path_single_file
         result = syncstatus.get_most_recent(src_path, src_path, 'st_size')
         assert result is None
+
+    def build_old_tree(self, root, name):
+        tree_path = os.path.join(root, name)
+        shutil.copytree(path_dir, os.path.join(tree_path, "a", "b"))
+        for dirpath, dirnames, filenames in os.walk(tree_path):
+            for each in filenames:
+                os.utime(os.path.join(dirpath, each), (1000000000, 1000000000))
+            os.utime(dirpath, (1000000000, 1000000000))
+        return tree_path
+
+    @trg_dir
+    def test_get_most_recent_recursive(self, datafiles):
+        src_tree = self.build_old_tree(str(datafiles), "src")
+        trg_tree = self.build_old_tree(str(datafiles), "trg")
+        # Newer directory, older files
+        os.utime(trg_tree, (1500000000, 1500000000))
+        new_file = os.path.join(src_tree, "a", "b", "C_cresta_02__MSH-BUMP.1001.png")
+        os.utime(new_file, (2000000000, 2000000000))
+        assert syncstatus.get_most_recent(src_tree, trg_tree) == trg_tree
+        for workers in (1, 8):
+            result = syncstatus.get_most_recent(
+                src_tree, trg_tree, recursive=True, workers=workers
+            )
+            assert result == src_tree
+
+    @trg_dir
+    def test_get_most_recent_prune(self, datafiles):
+        src_tree = self.build_old_tree(str(datafiles), "src")
+        trg_tree = self.build_old_tree(str(datafiles), "trg")
+        os.utime(trg_tree, (1500000000, 1500000000))
+        # Modified in place, its folder doesn't change so it's missed
+        new_file = os.path.join(src_tree, "a", "b", "C_cresta_02__MSH-BUMP.1001.png")
+        os.utime(new_file, (1600000000, 1600000000))
+        result = syncstatus.get_most_recent(
+            src_tree, trg_tree, recursive=True, prune=True
+        )
+        assert result == trg_tree
+        result = syncstatus.get_most_recent(src_tree, trg_tree, recursive=True)
+        assert result == src_tree
+        # Renamed into place, its folder is updated
+        os.utime(os.path.join(src_tree, "a", "b"), (1600000000, 1600000000))
+        result = syncstatus.get_most_recent(
+            src_tree, trg_tree, recursive=True, prune=True
+        )
+        assert result == src_tree
+
+    @trg_dir
+    def test_get_most_recent_prune_root_files(self, datafiles):
+        src_tree = self.build_old_tree(str(datafiles), "src")
+        trg_tree = self.build_old_tree(str(datafiles), "trg")
+        os.utime(trg_tree, (1500000000, 1500000000))
+        # Files right in the compared folders are always stat'ed
+        new_file = os.path.join(src_tree, "new.txt")
+        with open(new_file, "w") as fp:
+            fp.write("new")
+        os.utime(new_file, (1600000000, 1600000000))
+        os.utime(src_tree, (1000000000, 1000000000))
+        result = syncstatus.get_most_recent(
+            src_tree, trg_tree, recursive=True, prune=True
+        )
+        assert result == src_tree
+
+    @trg_dir
+    def test_get_most_recent_cache(self, datafiles, monkeypatch):
+        src_tree = self.build_old_tree(str(datafiles), "src")
+        trg_tree = self.build_old_tree(str(datafiles), "trg")
+        os.utime(trg_tree, (1500000000, 1500000000))
+        recent_cache = dict()
+        result = syncstatus.get_most_recent(
+            src_tree, trg_tree, recursive=True, recent_cache=recent_cache
+        )
+        assert result == trg_tree
+        assert len(recent_cache) == 6
+
+        def no_listing(dir_path):
+            raise AssertionError("Directory was listed again")
+
+        monkeypatch.setattr(syncstatus.os, "listdir", no_listing)
+        monkeypatch.setattr(syncstatus.utils, "scandir", no_listing)
+        result = syncstatus.get_most_recent(
+            src_tree, trg_tree, recursive=True, recent_cache=recent_cache
+        )
+        assert result == trg_tree
+
+
+class Test_DiffTrees:
+    @data_dir
+    def test_diff_trees(self, datafiles):
+        trg_path = str(datafiles)
+        sub_dir = os.path.join(trg_path, "sub")
+        os.mkdir(sub_dir)
+        with open(os.path.join(sub_dir, "extra.txt"), "w") as fp:
+            fp.write("extra")
+        os.remove(os.path.join(trg_path, "C_cresta_02__MSH-BUMP.1001.png"))
+        shutil.copy2(
+            os.path.join(dif_path_dir, "C_cresta_02__MSH-BUMP.1001.tx"),
+            trg_path
+        )
+        result = dict(syncstatus.diff_trees(path_dir, trg_path, workers=2))
+        assert result == {
+            "C_cresta_02__MSH-BUMP.1001.png": syncstatus.DIFF_ADDED,
+            os.path.join("sub", "extra.txt"): syncstatus.DIFF_REMOVED,
+            "C_cresta_02__MSH-BUMP.1001.tx": syncstatus.DIFF_CHANGED
+        }
+
+    @data_dir
+    def test_diff_trees_same(self, datafiles):
+        trg_path = str(datafiles)
+        result = list(syncstatus.diff_trees(
+            path_dir, trg_path,
+            ignore_stats=[
+                'st_uid', 'st_gid', 'st_atime',
+                'st_ctime', 'st_mtime', 'st_ino', 'st_dev'
+                ]
+            ))
+        assert len(result) == 2
+        for rel_path, status in result:
+            assert status == syncstatus.DIFF_SAME
+
+    @data_dir
+    def test_diff_trees_nested(self, datafiles):
+        trg_path = str(datafiles)
+        src_path = os.path.join(trg_path, "src")
+        shutil.copytree(path_dir, os.path.join(src_path, "a", "b"))
+        shutil.copytree(path_dir, os.path.join(trg_path, "a", "b"))
+        os.makedirs(os.path.join(src_path, "only_src", "deep"))
+        with open(os.path.join(src_path, "only_src", "deep", "x.txt"), "w") as fp:
+            fp.write("x")
+        result = dict(syncstatus.diff_trees(src_path, trg_path, batch_size=1))
+        assert result[os.path.join("only_src", "deep", "x.txt")] == \
+            syncstatus.DIFF_ADDED
+        assert result[os.path.join("src", "a", "b", "C_cresta_02__MSH-BUMP.1001.tx")] == \
+            syncstatus.DIFF_REMOVED
+        assert result[os.path.join("a", "b", "C_cresta_02__MSH-BUMP.1001.tx")] == \
+            syncstatus.DIFF_SAME
+        assert len(result) == 8
+
+    def test_diff_trees_stop_at_first_difference(self):
+        result = list(syncstatus.diff_trees(
+            path_dir, dif_path_dir,
+            stop_at_first_difference=True
+            ))
+        assert len(result) == 2
+        assert result[0][1] == syncstatus.DIFF_SAME
+        assert result[-1] == (
+            "C_cresta_02__MSH-BUMP.1001.tx", syncstatus.DIFF_CHANGED
+        )
+
+
+class Test_SequenceSyncStatus:
+    def copy_sequence(self, root):
+        src_path = os.path.join(root, "src")
+        trg_path = os.path.join(root, "trg")
+        shutil.copytree(path_sequence_tx, src_path)
+        shutil.copytree(path_sequence_tx, trg_path)
+        return src_path, trg_path
+
+    @trg_dir
+    def test_in_sync(self, datafiles):
+        src_path, trg_path = self.copy_sequence(str(datafiles))
+        src_frame = os.path.join(src_path, "C_cresta_02__MSH-BUMP.1001.png")
+        result = syncstatus.get_sequence_sync_status(
+            src_frame, trg_path, include_tx=True
+        )
+        assert result["status"][0] == 1
+        assert len(result["missing"]) == 0
+        assert len(result["missing_tx"]) == 0
+
+    @trg_dir
+    def test_differences(self, datafiles):
+        src_path, trg_path = self.copy_sequence(str(datafiles))
+        src_frame = os.path.join(src_path, "C_cresta_02__MSH-BUMP.1001.png")
+        os.remove(os.path.join(trg_path, "C_cresta_02__MSH-BUMP.1002.png"))
+        os.remove(os.path.join(trg_path, "C_cresta_02__MSH-BUMP.1001.tx"))
+        with open(os.path.join(trg_path, "C_cresta_02__MSH-BUMP.1003.png"), "ab") as fp:
+            fp.write(b"changed")
+        shutil.copy2(
+            os.path.join(trg_path, "C_cresta_02__MSH-BUMP.1004.png"),
+            os.path.join(trg_path, "C_cresta_02__MSH-BUMP.1010.png")
+        )
+        result = syncstatus.get_sequence_sync_status(
+            src_frame, trg_path, include_tx=True
+        )
+        assert result["status"][0] == 2
+        assert list(result["missing"].frames) == [1002]
+        assert list(result["extra"].frames) == [1010]
+        assert list(result["changed"].frames) == [1003]
+        assert list(result["missing_tx"].frames) == [1001]
+        assert list(result["missing_tx"].paths()) == [
+            os.path.join(trg_path, "C_cresta_02__MSH-BUMP.1001.tx")
+        ]
+
+        # Frames without a source tx file aren't missing their tx
+        os.remove(os.path.join(src_path, "C_cresta_02__MSH-BUMP.1001.tx"))
+        result = syncstatus.get_sequence_sync_status(
+            src_frame, trg_path, include_tx=True
+        )
+        assert len(result["missing_tx"]) == 0
+
+        result = syncstatus.get_sequence_sync_status(src_frame, trg_path)
+        assert len(result["missing_tx"]) == 0
+
+    @trg_dir
+    def test_paths_missing(self, datafiles):
+        src_frame = os.path.join(path_sequence_tx, "C_cresta_02__MSH-BUMP.1001.png")
+        missing = os.path.join(str(datafiles), "missing")
+        result = syncstatus.get_sequence_sync_status(src_frame, missing)
+        assert result["status"][0] == 5
+        assert result["missing"] is None
+        result = syncstatus.get_sequence_sync_status(
+            os.path.join(missing, "C_cresta_02__MSH-BUMP.1001.png"),
+            str(datafiles)
+        )
+        assert result["status"][0] == 4
+        trg_file = os.path.join(str(datafiles), "file.txt")
+        with open(trg_file, "w") as fp:
+            fp.write("file")
+        result = syncstatus.get_sequence_sync_status(src_frame, trg_file)
+        assert result["status"][0] == 6
+
+    def test_not_a_sequence(self):
+        src_file = os.path.join(
+            path_root, "singlefile", "no_pattern", "C_cresta_01__MSH-BUMP.png"
+        )
+        assert syncstatus.get_sequence_sync_status(src_file, path_dir) is None
+        # A lone numbered file is not a sequence either
+        assert syncstatus.get_sequence_sync_status(
+            path_single_file, path_dir
+        ) is None
+
+
+class Test_CompareStatsBatch:
+    def build_pairs(self, root):
+        src_path = os.path.join(root, "src")
+        trg_path = os.path.join(root, "trg")
+        shutil.copytree(path_sequence_tx, src_path)
+        shutil.copytree(path_sequence_tx, trg_path)
+        names = sorted(os.listdir(src_path))
+        with open(os.path.join(trg_path, names[0]), "ab") as fp:
+            fp.write(b"changed")
+        os.utime(os.path.join(trg_path, names[1]), (2000000000, 2000000000))
+        os.remove(os.path.join(trg_path, names[2]))
+        src_paths = [os.path.join(src_path, each) for each in names]
+        trg_paths = [os.path.join(trg_path, each) for each in names]
+        return src_paths, trg_paths
+
+    @pytest.mark.parametrize("use_numpy", [True, False])
+    @trg_dir
+    def test_compare_stats_batch(self, datafiles, monkeypatch, use_numpy):
+        if not use_numpy:
+            monkeypatch.setattr(syncstatus, "numpy", None)
+        elif syncstatus.numpy is None:
+            pytest.skip("NumPy is not installed")
+        src_paths, trg_paths = self.build_pairs(str(datafiles))
+        result = syncstatus.compare_stats_batch(src_paths, trg_paths)
+        counts = result["counts"]
+        assert counts["pairs"] == len(src_paths)
+        assert counts["errors"] == 1
+        assert counts["out_of_sync"] == 3
+        assert counts["in_sync"] == len(src_paths) - 3
+        assert counts["mismatches"]["st_size"] == 1
+        assert counts["mismatches"]["st_mtime"] == 2
+        assert result["stats"] == [
+            'st_mode', 'st_nlink', 'st_size', 'st_mtime'
+        ]
+        for index, (src_path, trg_path) in enumerate(zip(src_paths, trg_paths)):
+            if index == 2:
+                assert not any(result["matrix"][index])
+                continue
+            expected = syncstatus.compare_stats(src_path, trg_path)
+            assert bool(result["in_sync"][index]) == all(expected.values())
+            row = [bool(each) for each in result["matrix"][index]]
+            assert row == [
+                expected[syncstatus.stats_dict[each]] for each in result["stats"]
+            ]
+
+    def test_compare_stats_batch_empty(self):
+        result = syncstatus.compare_stats_batch([], [])
+        assert result["counts"]["pairs"] == 0
+        assert len(result["matrix"]) == 0
+
+    def test_compare_stats_batch_lengths(self):
+        with pytest.raises(ValueError):
+            syncstatus.compare_stats_batch([path_single_file], [])
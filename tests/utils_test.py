@@ -47,3 +47,154 @@ class Test_Utils:
         dir_path = ""
         result = utils.create_dir(dir_path)
         assert result is False
+
+    def test_scan_sequences(self):
+        dir_path = os.path.join(path_root, "missingframes", "src_path")
+        sequences = utils.scan_sequences(dir_path)
+        assert len(sequences) == 2
+        file_path = os.path.join(dir_path, "C_cresta_02__MSH-BUMP.1001.png")
+        key = utils.get_sequence_key(file_path)
+        assert len(sequences[key]) == 8
+        assert utils.is_sequence(file_path, sequences) is True
+        single_path = os.path.join(dir_path, "C_cresta_01__MSH-BUMP.1001.png")
+        assert utils.is_sequence(single_path, sequences) is False
+        assert utils.get_sequence_files(file_path, sequences) == \
+            utils.get_sequence_files(file_path)
+
+    def test_get_tx_files(self, monkeypatch):
+        dir_path = os.path.join(path_root, "sequence_with_tx", "src_path")
+        sequences = utils.scan_sequences(dir_path)
+        file_path = os.path.join(dir_path, "C_cresta_02__MSH-BUMP.1001.png")
+        files = utils.get_sequence_files(file_path, sequences)
+        single_path = os.path.join(dir_path, "C_cresta_01__MSH-BUMP.1001.png")
+
+        def fail_exists(path):
+            raise AssertionError("Tx files must not be checked one by one")
+
+        monkeypatch.setattr(os.path, "exists", fail_exists)
+        result = utils.get_tx_files(files + [single_path], sequences)
+        assert sorted(result["present"]) == \
+            sorted(utils.get_tx_path(each) for each in files)
+        assert result["missing"] == [utils.get_tx_path(single_path)]
+        # Without sequences, the folder is listed instead
+        result = utils.get_tx_files([file_path, single_path])
+        assert result["present"] == [utils.get_tx_path(file_path)]
+        assert result["missing"] == [utils.get_tx_path(single_path)]
+
+    def test_get_tx_files_upper_case(self, tmpdir):
+        dir_path = str(tmpdir)
+        names = (
+            "shot.1001.png", "shot.1002.png", "shot.1003.png",
+            "shot.1001.TX", "shot.1002.TX", "single.png", "single.TX"
+        )
+        for each in names:
+            with open(os.path.join(dir_path, each), "w") as fp:
+                fp.write(each)
+        sequences = utils.scan_sequences(dir_path)
+        files = utils.get_sequence_files(
+            os.path.join(dir_path, "shot.1001.png"), sequences
+        )
+        single_path = os.path.join(dir_path, "single.png")
+        for each_sequences in (sequences, None):
+            result = utils.get_tx_files(files + [single_path], each_sequences)
+            assert sorted(result["present"]) == [
+                os.path.join(dir_path, each)
+                for each in ("shot.1001.TX", "shot.1002.TX", "single.TX")
+            ]
+            assert all(os.path.exists(each) for each in result["present"])
+            assert result["missing"] == [
+                os.path.join(dir_path, "shot.1003.tx")
+            ]
+
+    def test_get_missing_frames(self):
+        file_path = os.path.join(
+                path_root, "missingframes", "src_path",
+                "C_cresta_02__MSH-BUMP.1001.png"
+            )
+        result = utils.get_missing_frames(file_path)
+        expected = list(range(1006, 1011)) + list(range(1013, 1020))
+        assert result == expected
+        file_path = os.path.join(
+                path_root, "sequence", "src_path",
+                "C_cresta_02__MSH-BUMP.1001.png"
+            )
+        assert utils.get_missing_frames(file_path) == []
+        file_path = os.path.join(
+                path_root, "singlefile", "src_path",
+                "C_cresta_02__MSH-BUMP.1001.png"
+            )
+        assert utils.get_missing_frames(file_path) is None
+
+    def test_iter_dir_files_without_scandir(self, monkeypatch):
+        dir_path = os.path.join(path_root, "sequence_with_tx", "src_path")
+        result = sorted(utils.iter_dir_files(dir_path))
+        monkeypatch.setattr(utils, "scandir", None)
+        assert sorted(utils.iter_dir_files(dir_path)) == result
+        assert len(result) == 11
+
+    def test_iter_dir_files_symlink(self):
+        dir_path = os.path.join(path_root, "TEMP_DIR_DELETE")
+        os.mkdir(dir_path)
+        try:
+            src_path = os.path.join(
+                path_root, "singlefile", "src_path",
+                "C_cresta_02__MSH-BUMP.1001.png"
+            )
+            try:
+                os.symlink(src_path, os.path.join(dir_path, "link.1001.png"))
+            except (AttributeError, NotImplementedError, OSError):
+                return
+            os.mkdir(os.path.join(dir_path, "subdir.1002.png"))
+            result = list(utils.iter_dir_files(dir_path))
+            assert result == [
+                ("link.1001.png", os.path.realpath(os.path.normcase(src_path)))
+            ]
+        finally:
+            shutil.rmtree(dir_path)
+
+
+class Test_FrameSet:
+    def test_get_frame_set(self):
+        file_path = os.path.join(
+                path_root, "missingframes", "src_path",
+                "C_cresta_02__MSH-BUMP.1001.png"
+            )
+        frame_set = utils.get_frame_set(file_path)
+        assert len(frame_set) == 8
+        assert frame_set.padding == 4
+        assert frame_set.to_ranges() == "1001-1005,1011-1012,1020"
+        assert frame_set.missing().to_ranges() == "1006-1010,1013-1019"
+        assert frame_set.is_complete() is False
+        assert 1011 in frame_set
+        assert 1006 not in frame_set
+        assert list(frame_set) == utils.get_sequence_files(file_path)
+
+    def test_get_frame_set_no_pattern(self):
+        file_path = os.path.join(
+                path_root, "singlefile",
+                "no_pattern", "C_cresta_01__MSH-BUMP.png"
+            )
+        assert utils.get_frame_set(file_path) is None
+
+    def test_from_ranges(self):
+        frame_set = utils.FrameSet.from_ranges(
+            "renders", "shot.", "exr", "1-3, 8,10-11", padding=4
+        )
+        assert list(frame_set.frames) == [1, 2, 3, 8, 10, 11]
+        assert frame_set.to_ranges() == "1-3,8,10-11"
+        assert frame_set.get_frame_path(8) == os.path.join(
+            "renders", "shot.0008.exr"
+        )
+        assert frame_set.first == 1
+        assert frame_set.last == 11
+
+    def test_set_operations(self):
+        src = utils.FrameSet.from_ranges("src", "shot.", "exr", "1001-1010")
+        trg = utils.FrameSet.from_ranges("trg", "shot.", "exr", "1005-1015")
+        assert (src - trg).to_ranges() == "1001-1004"
+        assert (trg - src).to_ranges() == "1011-1015"
+        assert (src & trg).to_ranges() == "1005-1010"
+        assert (src | trg).to_ranges() == "1001-1015"
+        assert (src | trg).dir_path == "src"
+        assert src != trg
+        assert src == utils.FrameSet.from_ranges("trg", "SHOT.", "EXR", "1001-1010")